@@ -0,0 +1,117 @@
+"""
+Cost of the access log on the request path: `GatewayMiddleware` driven at the
+ASGI level by `--concurrency` clients with the access log disabled, enabled
+(records queued for the background writer, written in batches to a file), and
+written synchronously per request (the same records, formatted and written
+inline, as the baseline the writer thread replaces). Both are run again with a
+sink taking `--slow-write-ms` per write, as a busy disk or a blocked pipe does.
+
+Also reports how many records a `--queue-size` queue dropped, and how long the
+writer took to catch up once the load stopped.
+
+    python benchmarks/bench_access_log.py --requests 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi import FastAPI
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.core.access_log import AccessLog, AccessLogRecord, AccessLogSink
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+
+class SlowSink:
+    def __init__(self, sink: AccessLogSink, delay: float):
+        self.sink = sink
+        self.delay = delay
+
+    def write(self, data: bytes) -> None:
+        time.sleep(self.delay)
+        self.sink.write(data)
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+class SyncAccessLog(AccessLog):
+    """Formats and writes each record in `log()`, on the request path."""
+
+    def log(self, record: AccessLogRecord) -> bool:
+        self._write([record])
+        return True
+
+
+def build_app(access_log: dict) -> GatewayMiddleware:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"message": "Hello World"}
+
+    config = GatewayConfig(
+        globalPolicies={"inbound": [{"rate_limit": {"requests_per_minute": 10**9}}]},
+        accessLog=access_log,
+    )
+    return GatewayMiddleware(app, Gateway(config, default_policy_registry()))
+
+
+async def run(app, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await asgi_request(app, http_scope())
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start), latencies
+
+
+async def main(requests: int, concurrency: int, queue_size: int, slow_write_ms: float) -> None:
+    directory = tempfile.mkdtemp()
+    print(f"{'scenario':<20} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'dropped':>8} {'drain ms':>9}")
+    for mode, slow in (("disabled", False), ("async", False), ("sync", False), ("async", True), ("sync", True)):
+        scenario = f"{mode}, slow sink" if slow else mode
+        path = os.path.join(directory, f"{mode}{'-slow' if slow else ''}.log")
+        app = build_app({"enabled": mode != "disabled", "path": path, "queueSize": queue_size})
+        access_log = app.gateway.access_log
+        if access_log is not None and (slow or mode == "sync"):
+            access_log.close()
+            sink = SlowSink(access_log.sink, slow_write_ms / 1000) if slow else access_log.sink
+            access_log_class = SyncAccessLog if mode == "sync" else AccessLog
+            access_log = app.gateway.access_log = access_log_class(sink, queue_size=queue_size)
+        await run(app, min(requests, 1_000), concurrency)  # warm up
+        rps, latencies = await run(app, requests, concurrency)
+        drain = 0.0
+        if access_log is not None:
+            start = time.perf_counter()
+            access_log.flush()
+            drain = time.perf_counter() - start
+            access_log.close()
+        quantiles = statistics.quantiles(latencies, n=100)
+        dropped = access_log.stats().dropped if access_log is not None else 0
+        print(
+            f"{scenario:<20} {rps:>8,.0f} {quantiles[49] * 1e3:>8.3f} {quantiles[98] * 1e3:>8.3f}"
+            f" {dropped:>8,} {drain * 1e3:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    parser.add_argument("--slow-write-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.queue_size, args.slow_write_ms))
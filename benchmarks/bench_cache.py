@@ -0,0 +1,82 @@
+"""
+Response cache under a Zipfian key distribution.
+
+Drives GETs over `--keys` URLs, picked with a Zipf(s) distribution, through
+the gateway with and without the `cache` policy, against an endpoint taking
+`--backend-ms` per call. Reports throughput, backend calls and the cache
+counters (hits, misses, coalesced misses, evictions).
+
+    python benchmarks/bench_cache.py --keys 10000 --s 1.1 --max-bytes 1048576
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import time
+
+import httpx
+from fastapi import FastAPI, Response
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+
+
+def zipf_sampler(keys: int, s: float, seed: int = 1):
+    weights = [1.0 / (rank ** s) for rank in range(1, keys + 1)]
+    cumulative = list(itertools.accumulate(weights))
+    rng = random.Random(seed)
+    return lambda: bisect.bisect_left(cumulative, rng.random() * cumulative[-1])
+
+
+def build_app(cache_config, backend_ms: float):
+    policies = {"inbound": [{"cache": cache_config}], "outbound": [{"cache": cache_config}]} if cache_config else {}
+    gateway = Gateway(GatewayConfig(globalPolicies=policies), default_policy_registry())
+    app = FastAPI()
+    app.add_middleware(GatewayMiddleware, gateway=gateway)
+    calls = {"backend": 0}
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        calls["backend"] += 1
+        await asyncio.sleep(backend_ms / 1000)
+        return Response(f'{{"id": {item_id}, "payload": "{"x" * 512}"}}', headers={"cache-control": "max-age=300"})
+
+    return app, gateway, calls
+
+
+async def run(app, sample, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(f"/items/{sample()}")
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main(keys: int, s: float, requests: int, concurrency: int, max_bytes: int, backend_ms: float) -> None:
+    print(f"Zipf(s={s}) over {keys} keys, {requests} requests, concurrency {concurrency}, cache {max_bytes} bytes")
+    for cache_config in (None, {"max_bytes": max_bytes}):
+        app, gateway, calls = build_app(cache_config, backend_ms)
+        rps = await run(app, zipf_sampler(keys, s), requests, concurrency)
+        print(f"  {'cache' if cache_config else 'no cache':<9} {rps:>8,.0f} req/s  backend calls {calls['backend']}")
+        if cache_config:
+            stats = gateway._pipeline.inbound[0].stats
+            lookups = stats.hits + stats.misses
+            print(f"            hit ratio {stats.hits / lookups:.1%}  {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--s", type=float, default=1.1)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-bytes", type=int, default=1024 * 1024)
+    parser.add_argument("--backend-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.keys, args.s, args.requests, args.concurrency, args.max_bytes, args.backend_ms))
@@ -0,0 +1,100 @@
+"""
+The `compression` outbound policy on large JSON responses: throughput, wire
+size, and how long the event loop stalls, with compression run inline on the
+loop and offloaded to its thread pool (`thread_offload_bytes`).
+
+`--concurrency` clients request a `--body-kb` JSON body while a probe task
+sleeps 1 ms in a loop; its worst overshoot is the longest stall other requests
+on the loop would have seen.
+
+    python benchmarks/bench_compression.py --requests 200 --body-kb 1024
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Optional
+
+from fastapi import FastAPI, Response
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+
+def build_app(body: bytes, compression: Optional[dict]) -> GatewayMiddleware:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return Response(body, media_type="application/json")
+
+    config = GatewayConfig(globalPolicies={"outbound": [{"compression": compression}] if compression is not None else []})
+    return GatewayMiddleware(app, Gateway(config, default_policy_registry()))
+
+
+async def call(app) -> int:
+    """The size of the response body sent."""
+    response = await asgi_request(app, http_scope(headers={"accept-encoding": "gzip, deflate"}))
+    return len(response.body)
+
+
+async def run(app, requests: int, concurrency: int) -> tuple[float, list[float], int, float]:
+    latencies: list[float] = []
+    remaining = requests
+    size = 0
+    stall = 0.0
+    running = True
+
+    async def probe() -> None:
+        nonlocal stall
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - start - 0.001)
+
+    async def client() -> None:
+        nonlocal remaining, size
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            size = await call(app)
+            latencies.append(time.perf_counter() - start)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    running = False
+    await probe_task
+    return requests / elapsed, latencies, size, stall
+
+
+async def main(requests: int, concurrency: int, body_kb: int, level: int) -> None:
+    items = [{"id": index, "name": f"item {index}", "tags": ["a", "b"], "price": index * 1.5} for index in range(body_kb * 16)]
+    body = json.dumps({"items": items}).encode()[: body_kb * 1024]
+    print(f"{'scenario':<22} {'rps':>7} {'p50 ms':>8} {'p99 ms':>8} {'wire KiB':>9} {'max stall ms':>13}")
+    for name, compression in (
+        ("uncompressed", None),
+        ("gzip, inline", {"level": level, "thread_offload_bytes": 2**62}),
+        ("gzip, thread pool", {"level": level}),
+    ):
+        app = build_app(body, compression)
+        await run(app, concurrency, concurrency)  # warm up
+        rps, latencies, size, stall = await run(app, requests, concurrency)
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{name:<22} {rps:>7,.0f} {quantiles[49] * 1e3:>8.2f} {quantiles[98] * 1e3:>8.2f}"
+            f" {size / 1024:>9,.1f} {stall * 1e3:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--body-kb", type=int, default=1024)
+    parser.add_argument("--level", type=int, default=6)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.body_kb, args.level))
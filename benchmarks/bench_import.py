@@ -0,0 +1,88 @@
+"""
+Import time and cold start of the package, each measured in fresh interpreters.
+
+Scenarios: `import fastapigate`, importing the middleware, and a cold start
+(imports + `Gateway` built from a config) for a config using one policy and
+for the example config, the latter also with FastAPI and every shipped policy
+imported eagerly, as the package used to. Also lists the slowest imports of
+the example cold start (`python -X importtime`).
+
+    python benchmarks/bench_import.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+EXAMPLE_CONFIG = Path(__file__).resolve().parent.parent / "examples" / "gate_config.yaml"
+
+TIMED = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+SCENARIOS = {
+    "import fastapigate": "import fastapigate",
+    "import GatewayMiddleware": "from fastapigate import GatewayMiddleware",
+    "cold start, rate_limit only": (
+        "from fastapigate import Gateway, GatewayConfig\n"
+        "from fastapigate.default_policy_registry import default_policy_registry\n"
+        "Gateway(GatewayConfig(globalPolicies={'inbound': [{'rate_limit': {'requests_per_minute': 10}}]}),"
+        " default_policy_registry())"
+    ),
+    "cold start, example config": (
+        "from fastapigate import Gateway, GatewayConfig\n"
+        "from fastapigate.default_policy_registry import default_policy_registry\n"
+        f"Gateway(GatewayConfig.from_file({str(EXAMPLE_CONFIG)!r}), default_policy_registry())"
+    ),
+    "cold start, eager imports": (
+        "import importlib\n"
+        "import fastapi\n"
+        "from fastapigate import Gateway, GatewayConfig\n"
+        "from fastapigate.default_policy_registry import DEFAULT_POLICIES, default_policy_registry\n"
+        "for path in DEFAULT_POLICIES.values(): importlib.import_module(path.partition(':')[0])\n"
+        f"Gateway(GatewayConfig.from_file({str(EXAMPLE_CONFIG)!r}), default_policy_registry())"
+    ),
+}
+
+
+def run_python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True, env=os.environ.copy()
+    )
+
+
+def slowest_imports(code: str, count: int) -> list[tuple[int, str]]:
+    """(cumulative microseconds, module) of the top-level imports taking longest."""
+    stderr = run_python(code, "-X", "importtime").stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if not module[1:].startswith(" "):  # top-level imports only
+            imports.append((int(cumulative), module.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(runs: int, top: int) -> None:
+    print(f"{'scenario':<34} {'median ms':>10} {'min ms':>8}")
+    for name, code in SCENARIOS.items():
+        timings = [float(run_python(TIMED.format(code=code)).stdout) * 1e3 for _ in range(runs)]
+        print(f"{name:<34} {statistics.median(timings):>10.1f} {min(timings):>8.1f}")
+
+    print("\nslowest imports of the example cold start (cumulative ms):")
+    for cumulative, module in slowest_imports(SCENARIOS["cold start, example config"], top):
+        print(f"  {cumulative / 1e3:>8.1f}  {module}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    main(args.runs, args.top)
@@ -0,0 +1,76 @@
+"""
+Microbenchmark of the IP filter tables (`fastapigate.ipfilter`).
+
+Builds a table of random IPv4 and IPv6 networks and reports the build time,
+the memory it holds, and lookups per second of random addresses, against a
+linear scan of `ipaddress` networks (over `--scan-networks` of them only, the
+scan is extrapolated to the full list).
+
+    python benchmarks/bench_ip_filter.py --networks 50000
+"""
+import argparse
+import ipaddress
+import random
+import time
+import tracemalloc
+
+from fastapigate.ipfilter import IPTable
+
+
+def random_networks(count: int, rng: random.Random) -> list[str]:
+    networks = []
+    for _ in range(count):
+        if rng.random() < 0.8:
+            network = ipaddress.IPv4Network((rng.getrandbits(32), rng.randint(8, 32)), strict=False)
+        else:
+            network = ipaddress.IPv6Network((rng.getrandbits(128), rng.randint(16, 128)), strict=False)
+        networks.append(str(network))
+    return networks
+
+
+def random_addresses(count: int, rng: random.Random) -> list[str]:
+    return [
+        str(ipaddress.IPv4Address(rng.getrandbits(32)) if rng.random() < 0.8 else ipaddress.IPv6Address(rng.getrandbits(128)))
+        for _ in range(count)
+    ]
+
+
+def main(networks: int, lookups: int, scan_networks: int, seed: int) -> None:
+    rng = random.Random(seed)
+    cidrs = random_networks(networks, rng)
+    addresses = random_addresses(lookups, rng)
+
+    start = time.perf_counter()
+    table = IPTable((cidr, True) for cidr in cidrs)
+    build = time.perf_counter() - start
+    tracemalloc.start()
+    copy = IPTable((cidr, True) for cidr in cidrs)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copy
+
+    start = time.perf_counter()
+    matches = sum(table.get(address) is not None for address in addresses)
+    trie_rate = lookups / (time.perf_counter() - start)
+
+    parsed = [ipaddress.ip_network(cidr) for cidr in cidrs[:scan_networks]]
+    scanned = [ipaddress.ip_address(address) for address in addresses[:1000]]
+    start = time.perf_counter()
+    for address in scanned:
+        any(address in network for network in parsed)
+    scan_rate = len(scanned) / (time.perf_counter() - start) * len(parsed) / networks
+
+    print(f"networks:       {networks:,} ({len(table):,} distinct)")
+    print(f"build:          {build * 1e3:,.0f} ms, {size / networks:,.0f} bytes/network")
+    print(f"trie lookups/s: {trie_rate:,.0f} ({matches:,} of {lookups:,} matched)")
+    print(f"scan lookups/s: {scan_rate:,.1f} (extrapolated from {len(parsed):,} networks)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--networks", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--scan-networks", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.networks, args.lookups, args.scan_networks, args.seed)
@@ -0,0 +1,114 @@
+"""
+Simulated comparison of upstream selection strategies (`fastapigate.proxy.LoadBalancer`
+against round-robin and random) on upstreams of uneven latency.
+
+Requests arrive as a Poisson process at `--rps`; each upstream serves up to
+`--capacity` requests at once with exponentially distributed service times
+(means from `--latencies-ms`), queueing the rest. The simulation runs on a
+virtual clock, so results are deterministic for a `--seed` and instant.
+Reports latency percentiles and each upstream's share of the requests.
+
+    python benchmarks/bench_load_balancer.py --latencies-ms 5 5 5 50 --rps 1500
+"""
+import argparse
+import heapq
+import itertools
+import random
+import statistics
+from collections import deque
+from dataclasses import dataclass, field
+
+from fastapigate.proxy import LoadBalancer, Upstream
+
+
+@dataclass
+class SimulatedUpstream:
+    mean_latency: float
+    capacity: int
+    busy: int = 0
+    queue: deque = field(default_factory=deque)
+    served: int = 0
+
+
+class Simulation:
+    def __init__(self, latencies: list[float], capacity: int, rps: float, requests: int, seed: int):
+        self.rng = random.Random(seed)
+        self.upstreams = [SimulatedUpstream(latency, capacity) for latency in latencies]
+        self.rps = rps
+        self.requests = requests
+        self.now = 0.0
+
+    def run(self, strategy: str) -> list[float]:
+        balancer = LoadBalancer(
+            [Upstream(f"http://upstream-{index}") for index in range(len(self.upstreams))],
+            clock=lambda: self.now,
+            rng=random.Random(self.rng.random()),
+        )
+        round_robin = itertools.cycle(range(len(self.upstreams)))
+        events: list[tuple[float, int, str, object]] = []
+        sequence = itertools.count()
+        latencies: list[float] = []
+
+        def start(index: int, request: tuple) -> None:
+            upstream = self.upstreams[index]
+            upstream.busy += 1
+            service = self.rng.expovariate(1 / upstream.mean_latency)
+            heapq.heappush(events, (self.now + service, next(sequence), "done", (index, request)))
+
+        arrival = 0.0
+        for _ in range(self.requests):
+            arrival += self.rng.expovariate(self.rps)
+            heapq.heappush(events, (arrival, next(sequence), "arrival", None))
+        while events:
+            self.now, _, kind, payload = heapq.heappop(events)
+            if kind == "arrival":
+                call = None
+                if strategy == "p2c_ewma":
+                    call = balancer.pick()
+                    index = balancer.upstreams.index(call.upstream)
+                elif strategy == "round_robin":
+                    index = next(round_robin)
+                else:
+                    index = self.rng.randrange(len(self.upstreams))
+                upstream = self.upstreams[index]
+                upstream.served += 1
+                request = (self.now, call)
+                if upstream.busy < upstream.capacity:
+                    start(index, request)
+                else:
+                    upstream.queue.append(request)
+            else:
+                index, (arrived_at, call) = payload
+                latencies.append(self.now - arrived_at)
+                if call is not None:
+                    call.observe(failed=False)
+                    call.done()
+                upstream = self.upstreams[index]
+                upstream.busy -= 1
+                if upstream.queue:
+                    start(index, upstream.queue.popleft())
+        return latencies
+
+
+def main(latencies_ms: list[float], capacity: int, rps: float, requests: int, seed: int) -> None:
+    print(f"{'strategy':<12} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>9}  share per upstream")
+    for strategy in ("round_robin", "random", "p2c_ewma"):
+        simulation = Simulation([latency / 1000 for latency in latencies_ms], capacity, rps, requests, seed)
+        latencies = simulation.run(strategy)
+        quantiles = statistics.quantiles(latencies, n=100)
+        shares = " ".join(f"{upstream.served / requests:>5.0%}" for upstream in simulation.upstreams)
+        print(
+            f"{strategy:<12} {statistics.fmean(latencies) * 1e3:>8.2f} {quantiles[49] * 1e3:>8.2f}"
+            f" {quantiles[98] * 1e3:>9.2f}  {shares}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latencies-ms", type=float, nargs="+", default=[5.0, 5.0, 5.0, 50.0])
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--rps", type=float, default=1500.0)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    main(args.latencies_ms, args.capacity, args.rps, args.requests, args.seed)
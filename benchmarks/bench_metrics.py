@@ -0,0 +1,84 @@
+"""
+Overhead of the per-policy instrumentation (`MetricsConfig.enabled`).
+
+Runs the inbound phase of a pipeline of no-op policies through
+`GatewayContext.call_before`, with metrics enabled and disabled, and reports
+the difference per policy call. No HTTP is involved, so the difference is
+all instrumentation.
+
+    python benchmarks/bench_metrics.py --iterations 200000 --policies 5
+"""
+import argparse
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from fastapigate import Gateway, GatewayConfig, PolicyRegistry
+from fastapigate.core.types import BasePolicy
+
+
+class NoopPolicyConfig(BaseModel):
+    pass
+
+
+@dataclass
+class NoopPolicy(BasePolicy[NoopPolicyConfig]):
+    async def inbound(self, request: Request) -> Optional[Response]:
+        return None
+
+
+def build_gateway(policies: int, enabled: bool) -> Gateway:
+    registry = PolicyRegistry()
+    for index in range(policies):
+        registry.register(f"noop{index}", NoopPolicy)
+    config = GatewayConfig(
+        globalPolicies={"inbound": [{f"noop{index}": {}} for index in range(policies)]},
+        metrics={"enabled": enabled},
+    )
+    return Gateway(config, registry)
+
+
+async def call_next(request: Request) -> Response:
+    return Response()
+
+
+async def measure(gateway: Gateway, iterations: int) -> float:
+    request = Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"host", b"bench")]})
+    async with gateway(call_next) as ctx:
+        for _ in range(min(iterations, 10_000)):
+            await ctx.call_before(request)  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await ctx.call_before(request)
+        return time.perf_counter() - start
+
+
+async def main(iterations: int, policies: int, rounds: int) -> None:
+    gateways = {enabled: build_gateway(policies, enabled) for enabled in (False, True)}
+    best = {False: float("inf"), True: float("inf")}
+    for _ in range(rounds):
+        for enabled, gateway in gateways.items():
+            best[enabled] = min(best[enabled], await measure(gateway, iterations))
+
+    calls = iterations * policies
+    off_ns = best[False] / calls * 1e9
+    on_ns = best[True] / calls * 1e9
+    print(f"policies per request: {policies}, requests: {iterations}, best of {rounds} rounds")
+    print(f"{'metrics disabled':<20} {off_ns:>8.0f} ns / policy call")
+    print(f"{'metrics enabled':<20} {on_ns:>8.0f} ns / policy call")
+    print(f"{'overhead':<20} {on_ns - off_ns:>8.0f} ns / policy call")
+    recorded = gateways[True].metrics.policy("noop0", "inbound").calls
+    print(f"calls recorded for noop0: {recorded}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--policies", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.policies, args.rounds))
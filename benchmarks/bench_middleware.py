@@ -0,0 +1,135 @@
+"""
+Side-by-side comparison of the pure ASGI `GatewayMiddleware` against the
+previous `BaseHTTPMiddleware` based implementation.
+
+Requests are driven in-process straight through the ASGI interface, so the
+numbers only reflect middleware + app overhead (no sockets, no server).
+
+    python benchmarks/bench_middleware.py --requests 20000 --concurrency 64
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware, PolicyRegistry
+from fastapigate.core.types import BasePolicy
+from fastapigate.testing import asgi_request, http_scope
+
+
+class NoopPolicyConfig(BaseModel):
+    pass
+
+
+@dataclass
+class NoopPolicy(BasePolicy[NoopPolicyConfig]):
+    async def inbound(self, request: Request) -> Optional[Response]:
+        return None
+
+    async def outbound(self, request: Request, response: Response) -> Optional[Response]:
+        return None
+
+
+class BaseHTTPGatewayMiddleware(BaseHTTPMiddleware):
+    """
+    The previous middleware implementation, kept here as the baseline: the
+    phases of `GatewayMiddleware`, run on `Response` objects only.
+    """
+
+    def __init__(self, app, gateway: Gateway):
+        super().__init__(app)
+        self.gateway = gateway
+
+    async def dispatch(self, request, call_next):
+        async with self.gateway(call_next) as ctx:
+            try:
+                response = await ctx.call_before(request)
+                if response:
+                    return response
+                backend_response = await ctx.call_backend(request)
+                return await ctx.call_after(request, backend_response) or backend_response
+            except Exception as exc:
+                response = await ctx.call_on_error(request, exc, ctx.context)
+                if response:
+                    return response
+                raise
+
+
+def build_app(middleware_cls, outbound: bool) -> FastAPI:
+    registry = PolicyRegistry()
+    registry.register("noop", NoopPolicy)
+    config = GatewayConfig(
+        globalPolicies={
+            "inbound": [{"noop": {}}],
+            "outbound": [{"noop": {}}] if outbound else [],
+        }
+    )
+    app = FastAPI()
+    app.add_middleware(middleware_cls, gateway=Gateway(config, registry))
+
+    @app.get("/")
+    async def root():
+        return {"message": "Hello World"}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(64):
+                yield b"x" * 4096
+        return StreamingResponse(chunks())
+
+    return app
+
+
+async def request(app, path: str) -> int:
+    """The number of response body bytes sent."""
+    return len((await asgi_request(app, http_scope(path=path))).body)
+
+
+async def run(app, path: str, requests: int, concurrency: int) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await request(app, path)
+            latencies.append(time.perf_counter() - start)
+
+    for _ in range(min(requests, 500)):
+        await request(app, path)  # warm-up
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+    }
+
+
+async def main(requests: int, concurrency: int) -> None:
+    print(f"{'scenario':<34} {'middleware':<12} {'rps':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for path in ("/", "/stream"):
+        for outbound in (False, True):
+            scenario = f"GET {path} ({'inbound+outbound' if outbound else 'inbound only'})"
+            for name, middleware_cls in (("basehttp", BaseHTTPGatewayMiddleware), ("asgi", GatewayMiddleware)):
+                result = await run(build_app(middleware_cls, outbound), path, requests, concurrency)
+                print(f"{scenario:<34} {name:<12} {result['rps']:>10.0f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,90 @@
+"""
+Throughput of the `proxy` policy against an in-process upstream
+(`fastapigate.testing.UpstreamServer`), driven at the ASGI level by
+`--concurrency` clients.
+
+Each scenario reports requests per second, latency percentiles and the
+upstream connections opened: with the keep-alive pool, and with it disabled
+(`max_idle_connections: 0`, a new connection per request); for small GETs and
+for `--body-kb` POST bodies streamed both ways.
+
+    python benchmarks/bench_proxy.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import UpstreamServer, asgi_request, http_scope
+
+
+def upstream_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id, "name": f"item {item_id}"}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return StreamingResponse(request.stream())
+
+    return app
+
+
+async def call(app, method: str, path: str, body: bytes) -> None:
+    headers = {"content-length": str(len(body))} if body else {}
+    await asgi_request(app, http_scope(method, path, headers), body)
+
+
+async def run(app, method: str, path: str, body: bytes, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await call(app, method, path, body)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start), latencies
+
+
+async def main(requests: int, concurrency: int, body_kb: int) -> None:
+    async with UpstreamServer(upstream_app()) as server:
+        print(f"{'scenario':<28} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'connects':>9}")
+        for pooled in (True, False):
+            proxy = {"url": server.url, "max_idle_connections": 20 if pooled else 0}
+            gateway = Gateway(GatewayConfig(globalPolicies={"backend": [{"proxy": proxy}]}), default_policy_registry())
+            app = GatewayMiddleware(FastAPI(), gateway)
+            for name, method, path, body in (
+                ("GET", "GET", "/items/1", b""),
+                (f"POST {body_kb} KiB", "POST", "/echo", b"x" * (body_kb * 1024)),
+            ):
+                await run(app, method, path, body, concurrency, concurrency)  # warm up
+                connections = server.connections
+                rps, latencies = await run(app, method, path, body, requests, concurrency)
+                quantiles = statistics.quantiles(latencies, n=100)
+                label = f"{name}, {'pooled' if pooled else 'no keep-alive'}"
+                print(
+                    f"{label:<28} {rps:>8,.0f} {quantiles[49] * 1e3:>8.2f} {quantiles[98] * 1e3:>8.2f}"
+                    f" {server.connections - connections:>9,}"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--body-kb", type=int, default=256)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.body_kb))
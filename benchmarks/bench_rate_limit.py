@@ -0,0 +1,57 @@
+"""
+Microbenchmark of the rate limiter core (`fastapigate.ratelimit`).
+
+For every algorithm it reports hits per second for a hot key set and for a
+scan over distinct keys, and the bytes of memory held per tracked key.
+
+    python benchmarks/bench_rate_limit.py --keys 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+from fastapigate.ratelimit import ALGORITHMS, MemoryStore, RateLimiter, create_algorithm
+
+
+def hits_per_second(limiter: RateLimiter, keys: list[str], rounds: int) -> float:
+    now = 1_000.0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            now += 1e-6
+            limiter.hit(key, now)
+    return rounds * len(keys) / (time.perf_counter() - start)
+
+
+def bytes_per_key(algorithm_name: str, limit: int, keys: list[str]) -> float:
+    limiter = RateLimiter(create_algorithm(algorithm_name, limit, 60.0), MemoryStore(max_keys=len(keys)))
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    now = 1_000.0
+    for key in keys:
+        limiter.hit(key, now)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return allocated / len(keys)
+
+
+def main(keys: int, limit: int) -> None:
+    scan_keys = [f"ip:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(keys)]
+    hot_keys = scan_keys[:100]
+    print(f"{'algorithm':<24} {'hot hits/s':>12} {'scan keys/s':>12} {'bytes/key':>10}")
+    for name in ALGORITHMS:
+        hot = hits_per_second(RateLimiter(create_algorithm(name, limit, 60.0)), hot_keys, rounds=1_000)
+        scan = hits_per_second(
+            RateLimiter(create_algorithm(name, limit, 60.0), MemoryStore(max_keys=keys // 2)), scan_keys, rounds=1
+        )
+        size = bytes_per_key(name, limit, scan_keys)
+        print(f"{name:<24} {hot:>12,.0f} {scan:>12,.0f} {size:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    main(args.keys, args.limit)
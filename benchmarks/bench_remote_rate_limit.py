@@ -0,0 +1,65 @@
+"""
+Remote rate limiting with token leasing against the in-process fake store.
+
+Several nodes (`LeasingRateLimiter` instances, each with its own connection)
+share one limit. Reports how many store round trips each admitted request
+cost, whether the combined admitted count stays within the limit plus the
+leasing slack, and that requests fall back to local limits during an outage.
+
+    python benchmarks/bench_remote_rate_limit.py --nodes 4 --lease-tokens 20
+"""
+import argparse
+import asyncio
+import time
+
+from fastapigate.ratelimit import LeasingRateLimiter, MemoryStore, RateLimiter, RespConnection, create_algorithm
+from fastapigate.testing import FakeRespServer
+
+
+class CountingConnection(RespConnection):
+    round_trips: int = 0
+
+    async def pipeline(self, commands):
+        CountingConnection.round_trips += 1
+        return await super().pipeline(commands)
+
+
+def node(url: str, limit: int, lease_tokens: int) -> LeasingRateLimiter:
+    fallback = RateLimiter(create_algorithm("sliding_window_counter", limit, 3600.0), MemoryStore())
+    return LeasingRateLimiter(
+        CountingConnection(url, timeout=0.5), limit, 3600.0, fallback, lease_tokens=lease_tokens, retry_interval=60.0
+    )
+
+
+async def main(nodes: int, limit: int, keys: int, requests: int, lease_tokens: int) -> None:
+    async with FakeRespServer() as server:
+        limiters = [node(server.url, limit, lease_tokens) for _ in range(nodes)]
+
+        async def drive(limiter: LeasingRateLimiter) -> int:
+            admitted = 0
+            for i in range(requests):
+                decision = await limiter.acquire(f"key:{i % keys}")
+                admitted += decision.allowed
+            return admitted
+
+        start = time.perf_counter()
+        admitted = sum(await asyncio.gather(*(drive(limiter) for limiter in limiters)))
+        elapsed = time.perf_counter() - start
+        print(f"{nodes} nodes x {requests} requests over {keys} keys, limit {limit}, lease {lease_tokens}")
+        print(f"  admitted {admitted} (limit {limit * keys}, max slack {nodes * lease_tokens * keys})")
+        print(f"  {CountingConnection.round_trips} round trips, {nodes * requests / elapsed:,.0f} decisions/s")
+
+        await server.stop()
+        outage = [await limiters[0].acquire("outage") for _ in range(3)]
+        print(f"  during outage: {[decision.allowed for decision in outage]} (local fallback)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=1_000)
+    parser.add_argument("--keys", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--lease-tokens", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.nodes, args.limit, args.keys, args.requests, args.lease_tokens))
@@ -0,0 +1,68 @@
+"""
+Multi-process check and benchmark of the shared memory rate limit store.
+
+Forks `--processes` workers that all hit the same keys through their own
+`SharedMemoryStore` mapping of one table. The combined admitted count must
+equal the configured limit (exit status 1 otherwise), and the achieved hits/s
+across processes is reported.
+
+    python benchmarks/bench_shm_rate_limit.py --processes 8 --limit 1000
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from fastapigate.ratelimit import RateLimiter, SharedMemoryStore, create_algorithm
+
+
+def worker(path: str, algorithm: str, limit: int, keys: int, hits: int, start, results) -> None:
+    algorithm = create_algorithm(algorithm, limit, 3600.0)
+    limiter = RateLimiter(algorithm, SharedMemoryStore(path, algorithm))
+    start.wait()
+    admitted = 0
+    for i in range(hits):
+        if limiter.hit(f"key:{i % keys}").allowed:
+            admitted += 1
+    results.put(admitted)
+
+
+def main(processes: int, algorithm: str, limit: int, keys: int, hits: int) -> bool:
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as directory:
+        path = os.path.join(directory, "ratelimit")
+        SharedMemoryStore(path, create_algorithm(algorithm, limit, 3600.0)).close()
+        start, results = context.Event(), context.Queue()
+        workers = [
+            context.Process(target=worker, args=(path, algorithm, limit, keys, hits, start, results))
+            for _ in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        began = time.perf_counter()
+        start.set()
+        admitted = sum(results.get() for _ in workers)
+        elapsed = time.perf_counter() - began
+        for process in workers:
+            process.join()
+
+    expected = min(limit * keys, processes * hits)
+    print(f"{algorithm}: {processes} processes x {hits} hits over {keys} keys")
+    print(f"  admitted {admitted} (expected {expected}), {processes * hits / elapsed:,.0f} hits/s combined")
+    return admitted == expected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=1_000)
+    parser.add_argument("--keys", type=int, default=10)
+    parser.add_argument("--hits", type=int, default=20_000)
+    args = parser.parse_args()
+    ok = all(
+        main(args.processes, algorithm, args.limit, args.keys, args.hits)
+        for algorithm in ("gcra", "sliding_window_counter")
+    )
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,304 @@
+"""
+Benchmark suite to catch performance regressions, with results as JSON.
+
+Two parts, both in-process:
+  - micro: `Gateway` construction, then requests run one at a time through
+    `GatewayMiddleware` (called at the ASGI level, around a bare ASGI app) with
+    0, 1, 5 and 20 policies, and with the shipped `rate_limit`, `jwt_auth`
+    (against a local JWKS file) and `retry` policies;
+  - load: the `examples/gateway.py` app served over loopback sockets by
+    `fastapigate.testing.UpstreamServer` to `--concurrency` keep-alive client
+    connections (`fastapigate.proxy.UpstreamClient`, on the same event loop),
+    reporting RPS and latency percentiles. Its config (`--config`, by default
+    `gate_config.yaml` next to this file) gets the local JWKS and a valid
+    token if it uses `jwt_auth`.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --threshold 10
+
+With `--baseline`, every result is compared against the stored one and the
+exit status is 1 if any got more than `--threshold` percent worse.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+import jwt
+import yaml
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware, PolicyRegistry
+from fastapigate.core.types import BasePolicy
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.proxy import Origin, UpstreamClient
+from fastapigate.testing import UpstreamServer, asgi_request, http_scope
+
+BENCHMARKS = Path(__file__).resolve().parent
+EXAMPLES = BENCHMARKS.parent / "examples"
+
+# Metrics where a higher value is better; for all others lower is better.
+HIGHER_IS_BETTER = {"ops_per_second", "rps"}
+
+
+class NoopPolicyConfig(BaseModel):
+    pass
+
+
+@dataclass
+class NoopPolicy(BasePolicy[NoopPolicyConfig]):
+    async def inbound(self, request: Request) -> Optional[Response]:
+        return None
+
+
+@dataclass
+class JWKSFixture:
+    """An RSA key, its JWKS in a local file, and tokens signed with it."""
+    directory: Path
+    issuer: str = "https://issuer.bench/"
+    audience: str = "bench-api"
+
+    def __post_init__(self):
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self._private_key.public_key()))
+        jwk.update(kid="bench", use="sig", alg="RS256")
+        self.path = self.directory / "jwks.json"
+        self.path.write_text(json.dumps({"keys": [jwk]}))
+
+    @property
+    def url(self) -> str:
+        return self.path.as_uri()
+
+    def token(self, subject: str = "bench") -> str:
+        claims = {"sub": subject, "iss": self.issuer, "aud": self.audience, "exp": int(time.time()) + 3600}
+        return jwt.encode(claims, self._private_key, algorithm="RS256", headers={"kid": "bench"})
+
+    def policy_config(self, **overrides: Any) -> dict[str, Any]:
+        return {"jwk_url": self.url, "issuer": self.issuer, "audience": self.audience, **overrides}
+
+
+async def ok_app(scope: dict[str, Any], receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def time_async(operation: Callable[[], Awaitable[Any]], iterations: int) -> dict[str, float]:
+    for _ in range(min(iterations, 1_000)):
+        await operation()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await operation()
+    elapsed = time.perf_counter() - start
+    return {"ops_per_second": iterations / elapsed, "us_per_op": elapsed / iterations * 1e6}
+
+
+def noop_gateway(policies: int) -> Gateway:
+    registry = PolicyRegistry()
+    registry.register("noop", NoopPolicy)
+    inbound = [{"noop": {}} for _ in range(policies)]
+    return Gateway(GatewayConfig(globalPolicies={"inbound": inbound}), registry)
+
+
+def middleware_request(app, scope: dict[str, Any]) -> Callable[[], Awaitable[int]]:
+    async def request() -> int:
+        return (await asgi_request(app, dict(scope))).status
+    return request
+
+
+def policy_call(policy_id: str, config: dict[str, Any], phase: str, scope: dict[str, Any]) -> Callable[[], Awaitable[int]]:
+    gateway = Gateway(GatewayConfig(globalPolicies={phase: [{policy_id: config}]}), default_policy_registry())
+    return middleware_request(GatewayMiddleware(ok_app, gateway), scope)
+
+
+async def micro(iterations: int, fixture: JWKSFixture) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+
+    config = GatewayConfig(globalPolicies={
+        "inbound": [{"rate_limit": {"requests_per_minute": 1_000}}, {"jwt_auth": fixture.policy_config()}],
+        "onError": [{"retry": {}}],
+    }, apis=[{"pathPrefix": f"/api{index}", "operations": [{"path": "/items"}]} for index in range(20)])
+    registry = default_policy_registry()
+    start = time.perf_counter()
+    constructions = max(1, iterations // 100)
+    for _ in range(constructions):
+        Gateway(config, registry)
+    elapsed = time.perf_counter() - start
+    results["gateway_construction"] = {"ops_per_second": constructions / elapsed, "us_per_op": elapsed / constructions * 1e6}
+
+    scope = http_scope()
+    for policies in (0, 1, 5, 20):
+        app = GatewayMiddleware(ok_app, noop_gateway(policies))
+        results[f"middleware_{policies}_policies"] = await time_async(middleware_request(app, scope), iterations)
+
+    results["rate_limit"] = await time_async(
+        policy_call("rate_limit", {"requests_per_minute": 10**9}, "inbound", scope), iterations
+    )
+
+    authorized = http_scope(headers={"authorization": f"Bearer {fixture.token()}"})
+    results["jwt_auth_cached"] = await time_async(
+        policy_call("jwt_auth", fixture.policy_config(), "inbound", authorized), iterations
+    )
+    results["jwt_auth_verify"] = await time_async(
+        policy_call("jwt_auth", fixture.policy_config(token_cache_size=0), "inbound", authorized),
+        max(1, iterations // 10),
+    )
+
+    results["retry_no_retry"] = await time_async(policy_call("retry", {}, "backend", scope), iterations)
+    failing = {"calls": 0}
+
+    async def fail_once(scope: dict[str, Any], receive, send) -> None:
+        failing["calls"] += 1
+        if failing["calls"] % 2:
+            raise ConnectionError("backend down")
+        await ok_app(scope, receive, send)
+
+    retry_gateway = Gateway(
+        GatewayConfig(globalPolicies={"backend": [{"retry": {"backoff_seconds": 0.0, "budget_capacity": 10**9}}]}),
+        default_policy_registry(),
+    )
+    retry_app = GatewayMiddleware(fail_once, retry_gateway)
+    results["retry_one_retry"] = await time_async(middleware_request(retry_app, scope), iterations)
+    return results
+
+
+def load_example_app(config_path: Path, fixture: JWKSFixture, directory: Path) -> tuple[Any, tuple]:
+    """The `examples/gateway.py` app on `config_path`, pointed at the local JWKS."""
+    config = yaml.safe_load(config_path.read_text())
+    headers: tuple = ()
+    phases = [config.get("globalPolicies", {})]
+    for api in config.get("apis", []):
+        phases += [api.get("policies", {})] + [operation.get("policies", {}) for operation in api.get("operations", [])]
+    for phase_policies in phases:
+        for entries in phase_policies.values():
+            for entry in entries or []:
+                if "jwt_auth" in entry:
+                    entry["jwt_auth"].update(fixture.policy_config())
+                    headers = ((b"authorization", f"Bearer {fixture.token()}".encode()),)
+    bench_config = directory / "gate_config.yaml"
+    bench_config.write_text(yaml.safe_dump(config))
+
+    os.environ["FASTAPIGATE_CONFIG"] = str(bench_config)
+    spec = importlib.util.spec_from_file_location("bench_example_gateway", EXAMPLES / "gateway.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app, headers
+
+
+async def http_request(client: UpstreamClient, origin: Origin, path: str, headers: tuple) -> int:
+    response = await client.request(origin, "GET", path, list(headers))
+    async for _ in response.body():
+        pass
+    return response.status_code
+
+
+async def load(app, headers: tuple, path: str, requests: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    remaining = requests
+
+    async with UpstreamServer(app) as server:
+        origin = Origin.from_url(server.url)
+        client = UpstreamClient(max_connections=concurrency, max_idle_connections=concurrency)
+
+        async def client_connection() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                status = await http_request(client, origin, path, headers)
+                latencies.append(time.perf_counter() - start)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        for _ in range(min(requests, 200)):
+            await http_request(client, origin, path, headers)  # warm-up
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_connection() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        client.close()
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p90_ms": latencies[int(len(latencies) * 0.90) - 1] * 1e3,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1e3,
+        "statuses": statuses,
+    }
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> bool:
+    """Print the change of every numeric result against `baseline`; False if any regressed."""
+    ok = True
+    print(f"\n{'benchmark':<34} {'metric':<16} {'baseline':>12} {'current':>12} {'change':>9}")
+    for part, benchmarks in results["results"].items():
+        for name, metrics in benchmarks.items():
+            previous = baseline.get("results", {}).get(part, {}).get(name, {})
+            for metric, value in metrics.items():
+                before = previous.get(metric)
+                if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+                    continue
+                change = (value - before) / before * 100
+                worse = -change if metric in HIGHER_IS_BETTER else change
+                flag = ""
+                if worse > threshold:
+                    flag, ok = "  REGRESSION", False
+                print(f"{part + '.' + name:<34} {metric:<16} {before:>12.2f} {value:>12.2f} {change:>+8.1f}%{flag}")
+    return ok
+
+
+async def main(args: argparse.Namespace) -> int:
+    results: dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        fixture = JWKSFixture(Path(directory))
+        if args.only in (None, "micro"):
+            results["results"]["micro"] = await micro(args.iterations, fixture)
+        if args.only in (None, "load"):
+            app, headers = load_example_app(Path(args.config), fixture, Path(directory))
+            results["results"]["load"] = {
+                "example_app": await load(app, headers, args.path, args.requests, args.concurrency)
+            }
+
+    for part, benchmarks in results["results"].items():
+        for name, metrics in benchmarks.items():
+            summary = ", ".join(f"{metric}={value:.2f}" for metric, value in metrics.items() if isinstance(value, float))
+            extra = f" {metrics['statuses']}" if "statuses" in metrics else ""
+            print(f"{part + '.' + name:<34} {summary}{extra}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        return 0 if compare(results, baseline, args.threshold) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", choices=("micro", "load"))
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--config", default=str(BENCHMARKS / "gate_config.yaml"))
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold, in percent")
+    sys.exit(asyncio.run(main(parser.parse_args())))
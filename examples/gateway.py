@@ -1,13 +1,14 @@
-from fastapigate import GatewayMiddleware, GatewayConfig
+import os
+
+from fastapigate import GatewayMiddleware
 from fastapi import FastAPI
 
 app = FastAPI()
 
-config = GatewayConfig.from_file("./gate_config.yaml")
-
+# Edits to the config file (or SIGHUP) are picked up without a restart.
 app.add_middleware(
-    GatewayMiddleware.from_gateway_config, 
-    gateway_config=config,
+    GatewayMiddleware.from_config_file,
+    path=os.environ.get("FASTAPIGATE_CONFIG", "./gate_config.yaml"),
 )
 
 @app.get("/")
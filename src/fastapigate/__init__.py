@@ -1,7 +1,19 @@
-from fastapigate.gateway_middleware import GatewayMiddleware
-from fastapigate.core.gateway import Gateway
-from fastapigate.core.config import GatewayConfig
-from fastapigate.core.policy import PolicyRegistry
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from fastapigate.gateway_middleware import GatewayMiddleware
+    from fastapigate.core.gateway import Gateway
+    from fastapigate.core.config import GatewayConfig
+    from fastapigate.core.policy import PolicyRegistry
+
+# Imported on first access, so `import fastapigate` (or importing one of its
+# submodules) doesn't load the whole package.
+_EXPORTS = {
+    "GatewayMiddleware": "fastapigate.gateway_middleware",
+    "Gateway": "fastapigate.core.gateway",
+    "GatewayConfig": "fastapigate.core.config",
+    "PolicyRegistry": "fastapigate.core.policy",
+}
 
 __all__ = [
     "GatewayMiddleware",
@@ -9,3 +21,13 @@ __all__ = [
     "GatewayConfig",
     "PolicyRegistry",
 ]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'fastapigate' has no attribute {name!r}")
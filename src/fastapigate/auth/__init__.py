@@ -0,0 +1,7 @@
+from fastapigate.auth.jwks import AsyncJWKSClient
+from fastapigate.auth.token_cache import VerifiedTokenCache
+
+__all__ = [
+    "AsyncJWKSClient",
+    "VerifiedTokenCache",
+]
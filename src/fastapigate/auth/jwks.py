@@ -0,0 +1,74 @@
+import asyncio
+import json
+import logging
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from jwt import PyJWK, PyJWKClientError, PyJWKSet
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AsyncJWKSClient:
+    """
+    Fetches a JWKS without ever blocking the event loop.
+
+    The HTTP request runs in a worker thread and concurrent callers share a
+    single in-flight fetch. Known keys are served from memory; once they are
+    older than `refresh_interval` they are still served (stale-while-revalidate)
+    while a refresh runs in the background. An unknown `kid` triggers a fetch,
+    at most once per `min_refetch_interval` so bogus kids can't cause a storm.
+    """
+    url: str
+    refresh_interval: float = 300.0
+    min_refetch_interval: float = 30.0
+    timeout: float = 5.0
+    _keys: dict[Optional[str], PyJWK] = field(default_factory=dict, init=False)
+    _fetched_at: float = field(default=float("-inf"), init=False)
+    _refresh_task: Optional[asyncio.Task] = field(default=None, init=False)
+
+    def _fetch(self) -> dict[str, Any]:
+        request = urllib.request.Request(self.url, headers={"User-Agent": "fastapigate"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    async def _refresh_keys(self) -> None:
+        try:
+            jwk_set = PyJWKSet.from_dict(await asyncio.to_thread(self._fetch))
+        except Exception as exc:
+            logger.warning(f"Fetching JWKS from {self.url} failed: {exc!r}")
+            raise
+        finally:
+            # Failures count too, they must not be retried on every request.
+            self._fetched_at = time.monotonic()
+        self._keys = {key.key_id: key for key in jwk_set.keys}
+
+    def refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is already running, and return it."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_keys())
+            # Background refreshes nobody awaits must not log "exception was never retrieved".
+            self._refresh_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._refresh_task
+
+    async def get_signing_key(self, kid: Optional[str]) -> PyJWK:
+        age = time.monotonic() - self._fetched_at
+        key = self._lookup(kid)
+        if key is not None:
+            if age > self.refresh_interval:
+                self.refresh()
+            return key
+        if age > self.min_refetch_interval:
+            await asyncio.shield(self.refresh())
+            key = self._lookup(kid)
+            if key is not None:
+                return key
+        raise PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+
+    def _lookup(self, kid: Optional[str]) -> Optional[PyJWK]:
+        if kid is None and len(self._keys) == 1:
+            return next(iter(self._keys.values()))
+        return self._keys.get(kid)
@@ -0,0 +1,53 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+@dataclass
+class VerifiedTokenCache:
+    """
+    Remembers the payloads of tokens whose signature and claims were verified,
+    so a token seen again skips the (expensive) signature check.
+
+    Entries are keyed by the SHA-256 digest of the token, bounded to
+    `max_entries` (least recently used first out) and kept no longer than the
+    token's `exp` or `ttl` seconds. A token is not served before its `nbf`.
+    """
+    max_entries: int = 10_000
+    ttl: float = 300.0
+    leeway: float = 0.0
+    # digest -> (payload, not before, expires at)
+    _entries: OrderedDict[bytes, tuple[dict[str, Any], float, float]] = field(default_factory=OrderedDict, init=False)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, digest: bytes) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        payload, not_before, expires_at = entry
+        now = time.time()
+        if now >= expires_at:
+            del self._entries[digest]
+            return None
+        if now < not_before:
+            return None
+        self._entries.move_to_end(digest)
+        return payload
+
+    def put(self, digest: bytes, payload: dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        expires_at = now + self.ttl
+        if "exp" in payload:
+            expires_at = min(expires_at, float(payload["exp"]) + self.leeway)
+        not_before = float(payload["nbf"]) - self.leeway if "nbf" in payload else float("-inf")
+        self._entries[digest] = (payload, not_before, expires_at)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,7 @@
+from fastapigate.cache.store import CachedResponse, CacheStats, ResponseCacheStore
+
+__all__ = [
+    "CachedResponse",
+    "CacheStats",
+    "ResponseCacheStore",
+]
@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Hashable, Optional
+
+
+@dataclass
+class CachedResponse:
+    status_code: int
+    raw_headers: list[tuple[bytes, bytes]]
+    body: bytes
+    stored_at: float
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[float] = None
+    # Whether Cache-Control lets a shared cache serve it to requests with Authorization.
+    serves_authorized: bool = False
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(name) + len(value) for name, value in self.raw_headers)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+    not_modified: int = 0
+
+
+@dataclass
+class ResponseCacheStore:
+    """
+    An in-memory response store bounded to `max_bytes` of bodies and headers.
+
+    Entries expire at their `expires_at` and the least recently used ones are
+    evicted first when room is needed. Responses varying on request headers
+    (`Vary`) are stored per combination of those header values: the store
+    remembers which headers a URL varies on and folds their values into the key.
+    """
+    max_bytes: int = 64 * 1024 * 1024
+    clock: Callable[[], float] = time.time
+    stats: CacheStats = field(default_factory=CacheStats)
+    _entries: OrderedDict[tuple[Hashable, tuple], CachedResponse] = field(default_factory=OrderedDict, init=False)
+    # primary key -> (lower-cased Vary header names, number of stored variants)
+    _vary: dict[Hashable, tuple[tuple[str, ...], int]] = field(default_factory=dict, init=False)
+    _bytes: int = field(default=0, init=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    def _key(self, primary: Hashable, header: Callable[[str], Optional[str]]) -> tuple[Hashable, tuple]:
+        vary, _ = self._vary.get(primary, ((), 0))
+        return primary, tuple(header(name) for name in vary)
+
+    def get(self, primary: Hashable, header: Callable[[str], Optional[str]]) -> Optional[CachedResponse]:
+        key = self._key(primary, header)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(
+        self, primary: Hashable, vary: tuple[str, ...], header: Callable[[str], Optional[str]], entry: CachedResponse
+    ) -> bool:
+        """Store `entry`; False if it can never fit."""
+        size = entry.size
+        if size > self.max_bytes:
+            return False
+        known = self._vary.get(primary)
+        if known is not None and known[0] != vary:
+            # The resource changed what it varies on, the stored variants are unreachable.
+            for key in [key for key in self._entries if key[0] == primary]:
+                self._remove(key)
+        key = (primary, tuple(header(name) for name in vary))
+        if key in self._entries:
+            self._remove(key)
+        while self._bytes + size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+        self._entries[key] = entry
+        _, variants = self._vary.get(primary, (vary, 0))
+        self._vary[primary] = (vary, variants + 1)
+        self._bytes += size
+        self.stats.stores += 1
+        return True
+
+    def _remove(self, key: tuple[Hashable, tuple]) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        primary = key[0]
+        vary, variants = self._vary[primary]
+        if variants <= 1:
+            del self._vary[primary]
+        else:
+            self._vary[primary] = (vary, variants - 1)
@@ -0,0 +1,235 @@
+import atexit
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Any, Optional, Protocol
+
+from fastapigate.core.config import AccessLogConfig
+
+logger = logging.getLogger(__name__)
+
+AccessLogRecord = dict[str, Any]
+
+
+class AccessLogSink(Protocol):
+    def write(self, data: bytes) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+@dataclass
+class StreamSink:
+    """Writes to a binary stream, stdout's by default."""
+    stream: IO[bytes] = field(default_factory=lambda: sys.stdout.buffer)
+
+    def write(self, data: bytes) -> None:
+        self.stream.write(data)
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+@dataclass
+class RotatingFileSink:
+    """
+    Appends to the file at `path`. A write that would take it past `max_bytes`
+    first rotates it: `path` becomes `path.1`, `path.1` becomes `path.2` and so
+    on, keeping `backup_count` of them (none: the file is truncated).
+    """
+    path: str
+    max_bytes: int = 100 * 1024 * 1024
+    backup_count: int = 5
+    _file: Optional[IO[bytes]] = field(default=None, init=False)
+    _size: int = field(default=0, init=False)
+
+    def _open(self) -> IO[bytes]:
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        return self._file
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{index}"):
+                    os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+            if os.path.exists(self.path):
+                os.replace(self.path, f"{self.path}.1")
+        elif os.path.exists(self.path):
+            os.truncate(self.path, 0)
+
+    def write(self, data: bytes) -> None:
+        file = self._file or self._open()
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+            file = self._open()
+        file.write(data)
+        file.flush()
+        self._size += len(data)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+@dataclass
+class AccessLogStats:
+    # Records handed to the writer, and those dropped because its queue was full.
+    queued: int = 0
+    dropped: int = 0
+    # Requests not logged because of `sample_rate`.
+    sampled_out: int = 0
+    written: int = 0
+    batches: int = 0
+    write_errors: int = 0
+
+
+def _format(record: AccessLogRecord) -> str:
+    record["time"] = datetime.fromtimestamp(record["time"], timezone.utc).isoformat(timespec="milliseconds")
+    return json.dumps(record, separators=(",", ":"), default=str)
+
+
+@dataclass
+class AccessLog:
+    """
+    Writes one JSON line per request to `sink`, off the request path: `log()`
+    only appends the record to a queue of `queue_size` (dropping it, counted in
+    `stats().dropped`, rather than waiting when the queue is full). A writer
+    thread serializes the queued records and writes them in batches of up to
+    `batch_size`, woken when a batch (or half the queue) is waiting, else
+    after `flush_interval`.
+
+    `sample_rate` is the share of requests logged; with `always_log_errors`,
+    failed requests (5xx responses, exceptions) are logged regardless.
+    """
+    sink: AccessLogSink = field(default_factory=StreamSink)
+    queue_size: int = 10_000
+    batch_size: int = 500
+    flush_interval: float = 1.0
+    sample_rate: float = 1.0
+    always_log_errors: bool = True
+    rng: random.Random = field(default_factory=random.Random)
+    # A deque rather than a `queue.Queue`: appending takes no lock and doesn't
+    # wake the writer, which only wakes up for a full batch.
+    _queue: deque[AccessLogRecord] = field(default_factory=deque, init=False)
+    _flushes: deque[threading.Event] = field(default_factory=deque, init=False)
+    _wake: threading.Event = field(default_factory=threading.Event, init=False)
+    _wake_at: int = field(init=False)
+    _thread: threading.Thread = field(init=False)
+    _closed: bool = field(default=False, init=False)
+    _stats: AccessLogStats = field(default_factory=AccessLogStats, init=False)
+
+    def __post_init__(self):
+        if not 0.0 <= self.sample_rate <= 1.0:
+            raise ValueError("The access log sample rate must be between 0 and 1")
+        if self.queue_size < 1 or self.batch_size < 1 or self.flush_interval <= 0:
+            raise ValueError("The access log queue size, batch size and flush interval must be positive")
+        self._wake_at = min(self.batch_size, max(self.queue_size // 2, 1))
+        self._thread = threading.Thread(target=self._run, name="fastapigate-access-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, config: AccessLogConfig) -> "AccessLog":
+        sink = RotatingFileSink(config.path, config.max_bytes, config.backup_count) if config.path else StreamSink()
+        return cls(
+            sink,
+            queue_size=config.queue_size,
+            batch_size=config.batch_size,
+            flush_interval=config.flush_interval_seconds,
+            sample_rate=config.sample_rate,
+            always_log_errors=config.always_log_errors,
+        )
+
+    def sampled(self, failed: bool) -> bool:
+        """Whether to log a request, decided before its record is built."""
+        if self.sample_rate >= 1.0 or (failed and self.always_log_errors) or self.rng.random() < self.sample_rate:
+            return True
+        self._stats.sampled_out += 1
+        return False
+
+    def log(self, record: AccessLogRecord) -> bool:
+        """Queue `record` (its "time" a Unix timestamp) for writing; False if it was dropped."""
+        queue = self._queue
+        if self._closed or len(queue) >= self.queue_size:
+            self._stats.dropped += 1
+            return False
+        queue.append(record)
+        self._stats.queued += 1
+        if len(queue) == self._wake_at:
+            self._wake.set()
+        return True
+
+    def stats(self) -> AccessLogStats:
+        return self._stats
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the records queued so far are written; False on timeout."""
+        if self._closed:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        flushed = threading.Event()
+        self._flushes.append(flushed)
+        self._wake.set()
+        return flushed.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Write the queued records and stop the writer (see `Gateway.reload`)."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            # Taken before draining, so they cover the records queued before them.
+            flushes = [self._flushes.popleft() for _ in range(len(self._flushes))]
+            closing = self._closed
+            queue = self._queue
+            while queue:
+                self._write([queue.popleft() for _ in range(min(len(queue), self.batch_size))])
+            for flushed in flushes:
+                flushed.set()
+            if closing:
+                break
+        try:
+            self.sink.close()
+        except Exception:
+            logger.exception("Closing the access log failed")
+
+    def _write(self, batch: list[AccessLogRecord]) -> None:
+        try:
+            data = "".join(_format(record) + "\n" for record in batch).encode()
+            self.sink.write(data)
+        except Exception:
+            self._stats.write_errors += 1
+            logger.exception(f"Writing {len(batch)} access log records failed")
+            return
+        self._stats.written += len(batch)
+        self._stats.batches += 1
+
+    def render_prometheus(self) -> str:
+        stats = self._stats
+        return (
+            "# HELP fastapigate_access_log_records_total Access log records, by outcome.\n"
+            "# TYPE fastapigate_access_log_records_total counter\n"
+            f'fastapigate_access_log_records_total{{outcome="written"}} {stats.written}\n'
+            f'fastapigate_access_log_records_total{{outcome="dropped"}} {stats.dropped}\n'
+            f'fastapigate_access_log_records_total{{outcome="sampled_out"}} {stats.sampled_out}\n'
+        )
@@ -1,4 +1,3 @@
-import yaml
 from typing import Any, Optional, Protocol, TypeVar, Generic, TypeAlias
 from pydantic import BaseModel, Field, ConfigDict, TypeAdapter
 from pydantic.alias_generators import to_camel
@@ -6,7 +5,10 @@ from pydantic.alias_generators import to_camel
 
 PolicyId: TypeAlias = str
 PolicyConfig: TypeAlias = dict[str, Any]
-RawPolicyEntry: TypeAlias = dict[PolicyId, PolicyConfig]
+# `{policy_id: config}`, plus for inbound policies the scheduling options
+# `id`, `independent` and `dependsOn` (see `Gateway._inbound_stages`).
+RawPolicyEntry: TypeAlias = dict[str, Any]
+POLICY_ENTRY_OPTIONS = frozenset(("id", "independent", "dependsOn"))
 
 class PhasePolicies(BaseModel):
     inbound: list[RawPolicyEntry] = Field(default_factory=list)
@@ -17,17 +19,82 @@ class PhasePolicies(BaseModel):
     model_config = ConfigDict(alias_generator=to_camel)
 
 def load_config():
+    import yaml  # Only needed for config files; a cold start without one doesn't pay for it.
+
     with open("config.yaml", "r") as f:
         config_dict = yaml.safe_load(f)
     return config_dict
 
+class OperationConfig(BaseModel):
+    """
+    Policies for a single operation of an API, matched on method and exactly on
+    a path relative to the API's `path_prefix` (e.g. `/items/{item_id}`).
+    """
+    method: Optional[str] = None
+    path: str = ""
+    inherit_policies: bool = True
+    policies: PhasePolicies = Field(default_factory=PhasePolicies)
+
+    model_config = ConfigDict(alias_generator=to_camel)
+
+class ApiConfig(BaseModel):
+    """
+    Policies for every request under `path_prefix` (optionally restricted to `hosts`).
+    With `inherit_policies` the API's policies run after the global ones,
+    otherwise they replace them. Operations inherit from their API the same way.
+    """
+    path_prefix: str = "/"
+    hosts: list[str] = Field(default_factory=list)
+    inherit_policies: bool = True
+    policies: PhasePolicies = Field(default_factory=PhasePolicies)
+    operations: list[OperationConfig] = Field(default_factory=list)
+
+    model_config = ConfigDict(alias_generator=to_camel)
+
+class MetricsConfig(BaseModel):
+    """
+    Per-policy, per-phase latency histograms and counters (see `Gateway.metrics`).
+    With `enabled: false` policies are called without any instrumentation.
+    `path` (none by default) serves them in the Prometheus text format, to
+    the requests the inbound policies of the path's route let through.
+    """
+    enabled: bool = True
+    path: Optional[str] = None
+
+    model_config = ConfigDict(alias_generator=to_camel)
+
+class AccessLogConfig(BaseModel):
+    """
+    One JSON line per request (see `fastapigate.core.access_log.AccessLog`),
+    written by a background thread to `path`, or to stdout without one.
+    """
+    enabled: bool = False
+    path: Optional[str] = None
+    # Size at which the file is rotated (0: never), and rotated files kept.
+    max_bytes: int = 100 * 1024 * 1024
+    backup_count: int = 5
+    # Share of the requests logged; failed ones are with `always_log_errors`.
+    sample_rate: float = 1.0
+    always_log_errors: bool = True
+    # Records waiting to be written; more are dropped (and counted).
+    queue_size: int = 10_000
+    batch_size: int = 500
+    flush_interval_seconds: float = 1.0
+
+    model_config = ConfigDict(alias_generator=to_camel)
+
 class GatewayConfig(BaseModel):
-    global_policies: PhasePolicies 
+    global_policies: PhasePolicies = Field(default_factory=PhasePolicies)
+    apis: list[ApiConfig] = Field(default_factory=list)
+    metrics: MetricsConfig = Field(default_factory=MetricsConfig)
+    access_log: AccessLogConfig = Field(default_factory=AccessLogConfig)
 
     model_config = ConfigDict(alias_generator=to_camel)
 
     @classmethod
     def from_file(cls, path: str):
+        import yaml
+
         with open(path, "r") as f:
             config_dict = yaml.safe_load(f)
         return cls(**config_dict)
@@ -1,22 +1,69 @@
+import asyncio
+import json
 import logging 
-from contextvars import ContextVar
+import time
+from contextvars import ContextVar, Token
+from functools import cache, partial
 from types import TracebackType
-from typing import AsyncIterable, Awaitable, Callable, Iterable, Optional, Type, get_args, cast, Any
+from typing import TYPE_CHECKING, AsyncIterable, Awaitable, Callable, Iterable, Optional, Type, get_args, cast, Any
 from typing import AsyncIterable, Iterable, Optional, Type, get_args, cast, Any
 
 from fastapigate.core.policy import PolicyRegistry
 from fastapigate.core.types import BackendPolicy, BasePolicy, InboundPolicy, OnErrorPolicy, OutboundPolicy, Policy
-from fastapigate.core.config import GatewayConfig
+from fastapigate.core.config import POLICY_ENTRY_OPTIONS, AccessLogConfig, GatewayConfig, PhasePolicies, RawPolicyEntry
+from fastapigate.core.metrics import GatewayMetrics, InstrumentedPolicy
+from fastapigate.core.routing import Pipeline, RouteIndex
 from dataclasses import dataclass, field
 
-from fastapi import Request
-from fastapi.responses import Response
+from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from fastapigate.core.access_log import AccessLog
+
 logger = logging.getLogger(__name__)
 
 gateway_context: ContextVar[dict[str, Any]] = ContextVar("GatewayContextVar")
 
+def call_on_exit(callback: Callable[[], Any]) -> None:
+    """
+    Run `callback` when the current request leaves the gateway, however it leaves
+    (response sent, exception, cancellation). Callbacks run in reverse order.
+    """
+    gateway_context.get()["exit_callbacks"].append(callback)
+
+def add_access_log_fields(**fields: Any) -> None:
+    """Add `fields` (JSON-serializable) to the current request's access log record, if it is logged."""
+    context = gateway_context.get()
+    if "access_log_fields" in context:
+        context["access_log_fields"].update(fields)
+    else:
+        context["access_log_fields"] = fields
+
+_PHASES: dict[str, tuple[str, type]] = {
+    "inbound": ("Inbound", InboundPolicy),
+    "backend": ("Backend", BackendPolicy),
+    "outbound": ("Outbound", OutboundPolicy),
+    "on_error": ("On Error", OnErrorPolicy),
+}
+
+def _parse_policy_entry(raw_policy_entry: RawPolicyEntry) -> tuple[str, dict[str, Any], dict[str, Any]]:
+    """Split a raw policy entry into its policy id, policy config and scheduling options."""
+    policy_ids = [key for key in raw_policy_entry if key not in POLICY_ENTRY_OPTIONS]
+    if len(policy_ids) != 1:
+        raise ValueError(f"A policy entry must name exactly one policy, got {policy_ids}")
+    policy_id = policy_ids[0]
+    options = {key: value for key, value in raw_policy_entry.items() if key in POLICY_ENTRY_OPTIONS}
+    return policy_id, raw_policy_entry[policy_id] or {}, options
+
+async def _settle(awaitable: Awaitable[Optional[Response]]) -> tuple[Optional[Response], Optional[Exception]]:
+    try:
+        return await awaitable, None
+    except Exception as exc:
+        return None, exc
+
+@cache
 def _get_policy_config_class_from_generic(policy: Type[Policy]) -> Type[BaseModel]:
     policy_class = cast(Type[BaseModel], get_args(policy.__orig_bases__[0])[0])
     return policy_class
@@ -24,113 +71,518 @@ def _get_policy_config_class_from_generic(policy: Type[Policy]) -> Type[BaseMode
 
 @dataclass
 class GatewayContext:
+    """
+    Runs the phases of one request. `context` is shared with the policies (it is
+    the `context` argument of `on_error` and the value of `gateway_context`):
+      - "phase": the phase currently running ("inbound", "backend", "outbound")
+      - "call_backend_fn": a coroutine function (re-)invoking the backend; to
+        a running backend policy, the backend policies listed after it
+      - "attempt_count": backend invocations so far, maintained by retrying policies
+      - "exit_callbacks": see `call_on_exit`
+      - "short_circuit": the inbound policy that answered the request
+      - "error", "error_handler": the exception handed to the onError policies,
+        and the one of them that answered it
+      - "status", "bytes_sent", "response_started_at": the response as sent,
+        maintained by `GatewayMiddleware`
+      - "access_log_fields": see `add_access_log_fields`
+    """
     gateway: "Gateway"
     call_next: Callable[[Request], Awaitable[Response]]
+    _pipeline: Optional[Pipeline] = None
+    _generation: Optional["PipelineGeneration"] = None
+    _request: Optional[Request] = None
+    context: dict[str, Any] = field(default_factory=dict)
+    _context_token: Optional[Token] = None
+    _started_at: float = 0.0
 
     async def __aenter__(self):
+        self.context["exit_callbacks"] = []
+        self._context_token = gateway_context.set(self.context)
+        self._started_at = time.perf_counter()
         return self
 
     async def __aexit__(self, exc_type: Type[BaseException], exc_val: BaseException, exc_tb: Optional[TracebackType]):
-        ...
+        exit_callbacks = self.context["exit_callbacks"]
+        while exit_callbacks:
+            try:
+                exit_callbacks.pop()()
+            except Exception:
+                logger.exception("Gateway exit callback failed")
+        access_log = self.gateway.access_log
+        if access_log is not None and self._request is not None:
+            try:
+                self._log_access(access_log, exc_val)
+            except Exception:
+                logger.exception("Building the access log record failed")
+        if self._context_token is not None:
+            gateway_context.reset(self._context_token)
+            self._context_token = None
+        if self._generation is not None:
+            self.gateway.release(self._generation)
+            self._generation = None
+
+    def _policy_id(self, policy: Any) -> str:
+        policy_ids = self._generation.policy_ids if self._generation is not None else {}
+        return policy_ids.get(id(policy)) or type(getattr(policy, "policy", policy)).__name__
+
+    def _log_access(self, access_log: "AccessLog", exc: Optional[BaseException]) -> None:
+        context = self.context
+        error = exc or context.get("error")
+        status = context.get("status")
+        if status is None and isinstance(exc, Exception):
+            status = 500
+        if not access_log.sampled(error is not None or (status or 0) >= 500):
+            return
+        now = time.perf_counter()
+        scope = self._request.scope
+        record: dict[str, Any] = {
+            "time": time.time() - (now - self._started_at),
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "bytes_sent": context.get("bytes_sent", 0),
+            "duration_ms": round((now - self._started_at) * 1e3, 3),
+        }
+        client = scope.get("client")
+        if client:
+            record["client"] = client[0]
+        host = self._request.headers.get("host")
+        if host:
+            record["host"] = host
+        response_started_at = context.get("response_started_at")
+        if response_started_at is not None:
+            record["ttfb_ms"] = round((response_started_at - self._started_at) * 1e3, 3)
+            if "backend_at" in context:
+                record["backend_ms"] = round((response_started_at - context["backend_at"]) * 1e3, 3)
+        if "short_circuit" in context:
+            record["short_circuit"] = self._policy_id(context["short_circuit"])
+        if context.get("attempt_count", 1) > 1:
+            record["attempts"] = context["attempt_count"]
+        if error is not None:
+            record["error"] = type(error).__name__
+        if "error_handler" in context:
+            record["error_handler"] = self._policy_id(context["error_handler"])
+        if "access_log_fields" in context:
+            record.update(context["access_log_fields"])
+        access_log.log(record)
 
+    def pipeline(self, request: Request) -> Pipeline:
+        """
+        The policy pipeline of the route matching `request`, resolved once per
+        context: a request runs to completion on the config it started on, even
+        if the gateway is reloaded meanwhile.
+        """
+        if self._pipeline is None:
+            self._request = request
+            self._generation = self.gateway.acquire()
+            self._pipeline = self._generation.resolve(request)
+        return self._pipeline
     
     async def call_before(self, request: Request) -> Optional[Response]:
-        for policy in self.gateway._inbound_policies:
-            response = await policy.inbound(request)
-            if response:
-                return response
-        for policy in self.gateway._backend_policies:
-            response = await policy.backend(request)
-            if response:
-                return response
+        pipeline = self.pipeline(request)
+        self.context["phase"] = "inbound"
+        for stage in pipeline.inbound_stages:
+            if len(stage) == 1:
+                response = await stage[0].inbound(request)
+                if response:
+                    self.context["short_circuit"] = stage[0]
+                    return response
+            else:
+                response = await self._call_stage(request, stage)
+                if response:
+                    return response
         return None
+
+    async def _call_stage(self, request: Request, stage: tuple[InboundPolicy, ...]) -> Optional[Response]:
+        """
+        Run the inbound policies of a stage concurrently. The outcome (a response
+        or an exception) of the policy listed first wins, whatever finished first:
+        once a policy rejects, the policies listed after it are cancelled and
+        those before it are awaited.
+        """
+        outcome: tuple[Optional[Response], Optional[Exception]] = (None, None)
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(_settle(policy.inbound(request))) for policy in stage]
+
+            def short_circuit(index: int, task: asyncio.Task) -> None:
+                if not task.cancelled() and any(task.result()):
+                    for later in tasks[index + 1:]:
+                        later.cancel()
+
+            for index, task in enumerate(tasks):
+                task.add_done_callback(partial(short_circuit, index))
+            for index, task in enumerate(tasks):
+                outcome = await task
+                if any(outcome):
+                    break
+        response, exc = outcome
+        if exc is not None:
+            raise exc
+        if response:
+            self.context["short_circuit"] = stage[index]
+        return response
+
+    async def enter_backend(self, request: Request) -> None:
+        """Switch to the backend phase, making the backend callable (again) through the context."""
+        context = self.context
+        pipeline = self.pipeline(request)
+        context["phase"] = "backend"
+        context["backend_at"] = time.perf_counter()
+        context["attempt_count"] = 1
+        upstream = pipeline.upstream
+        context["call_backend_fn"] = partial(upstream.forward if upstream else self.call_next, request)
+        if pipeline.buffers_request_body:
+            # Read once so every backend invocation can replay it.
+            await request.body()
+
+    async def call_backend(self, request: Request) -> Response:
+        """
+        Run the backend policies, each wrapping the ones listed after it: the
+        `call_backend_fn` a policy invokes runs the next policy, the last one
+        invoking the backend (the pipeline's upstream if it has one, else
+        `call_next`'s). A policy returning None hands the request on to the next
+        one; the first response returned is the backend response.
+        """
+        await self.enter_backend(request)
+        context = self.context
+        pipeline = self.pipeline(request)
+        if not pipeline.backend:
+            return await context["call_backend_fn"]()
+        call_backend_fn = partial(self._call_backend_policy, request, pipeline.backend, context["call_backend_fn"])
+        try:
+            return await call_backend_fn()
+        finally:
+            # On-error policies re-invoking the backend go through the backend policies too.
+            context["call_backend_fn"] = call_backend_fn
+
+    async def _call_backend_policy(
+        self, request: Request, policies: tuple[BackendPolicy, ...], backend: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Run `policies[0]`, its backend being the rest of `policies` in front of `backend`."""
+        policy, rest = policies[0], policies[1:]
+        call_next = partial(self._call_backend_policy, request, rest, backend) if rest else backend
+        # Read by the policy as it starts, so concurrent (e.g. hedged) calls don't mix them up.
+        self.context["call_backend_fn"] = call_next
+        response = await policy.backend(request)
+        return response or await call_next()
     
     async def call_after(self, request: Request, backend_response: Response) -> Optional[Response]:
-        for policy in self.gateway._outbound_policies:
-            response = await policy.outbound(request, backend_response)
-            return response
-        return None
+        """
+        Run the outbound policies in order, each on the response the previous one
+        returned (or was given, if it returned None). The final response, or None
+        if every policy returned None.
+        """
+        self.context["phase"] = "outbound"
+        response: Optional[Response] = None
+        for policy in self.pipeline(request).outbound:
+            response = await policy.outbound(request, response or backend_response) or response
+        return response
 
     async def call_on_error(self, request: Request, exc: Exception, context: dict[str, Any]) -> Optional[Response]:
-        for policy in self.gateway._on_error_policies:
+        self.context["error"] = exc
+        for policy in self.pipeline(request).on_error:
             response = await policy.on_error(request, exc, context)
-            return response
-        return None
-    
-    async def run(self, request: Request) -> Response:
-        try: 
-            response = await self.call_before(request)
             if response:
+                self.context["error_handler"] = policy
                 return response
-            backend_response = await self.call_next(request)
-            response = await self.call_after(request, backend_response)
-            if response:
-                return response
-            return backend_response
-        except Exception as exc:
-            response = await self.call_on_error(request, exc, dict())
-            if response:
-                return response
-            raise exc
+        return None
+
+PolicyKey = tuple[str, str, str]  # (scope, policy id, config as JSON)
+
+def _close_policies(policies: Iterable[BasePolicy]) -> None:
+    """Call the optional `close()` of policies that are no longer used."""
+    for policy in policies:
+        close = getattr(policy, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                logger.exception(f"Closing policy {type(policy).__name__} failed")
+
+@dataclass
+class PipelineGeneration:
+    """
+    The routes compiled from one config, and the number of requests running
+    on them. `policies` are the policy instances of the config by `PolicyKey`.
+    Once replaced by a reload, the generation closes the policies it doesn't
+    share with its successor (`retired`) when its last request is done.
+    """
+    gateway_config: GatewayConfig
+    routes: RouteIndex
+    policies: dict[PolicyKey, list[BasePolicy]]
+    # Policy ids of the pipelines' entries (policies or their wrappers), by object id.
+    policy_ids: dict[int, str] = field(default_factory=dict)
+    in_flight: int = 0
+    retired: Optional[list[BasePolicy]] = None
+
+    def resolve(self, request: Request) -> Pipeline:
+        host = request.headers.get("host", "").split(":", 1)[0].lower()
+        return self.routes.resolve(request.url.path, host, request.method)
+
+@dataclass
+class _Compilation:
+    """Bookkeeping while compiling a config into a `PipelineGeneration`."""
+    metrics: Optional[GatewayMetrics]
+    # Instances of the previous generation not claimed yet.
+    previous: dict[PolicyKey, list[BasePolicy]]
+    policies: dict[PolicyKey, list[BasePolicy]] = field(default_factory=dict)
+    created: list[BasePolicy] = field(default_factory=list)
+    policy_ids: dict[int, str] = field(default_factory=dict)
+
+@dataclass
+class GatewayBuild:
+    """A config compiled by `Gateway.build`, ready for `Gateway.install`."""
+    gateway_config: GatewayConfig
+    generation: PipelineGeneration
+    metrics: Optional[GatewayMetrics]
+    access_log: Optional["AccessLog"]
+    # The generation it succeeds, and shares unchanged policies with.
+    previous: PipelineGeneration
 
 @dataclass
 class Gateway:
+    """
+    Compiles a `GatewayConfig` into per-route policy pipelines. `reload`
+    swaps in a new config atomically: requests already running finish on the
+    old pipelines, and policies whose scope, id and config didn't change carry
+    over with their state (rate limit counters, caches, circuits).
+    """
     gateway_config: GatewayConfig
     policy_registry: PolicyRegistry
 
-    _inbound_policies: list[InboundPolicy] = field(default_factory=list)
-    _backend_policies: list[BackendPolicy] = field(default_factory=list)
-    _outbound_policies: list[OutboundPolicy] = field(default_factory=list)
-    _on_error_policies: list[OnErrorPolicy] = field(default_factory=list)
+    # Policy latencies and outcomes, None when disabled in the config.
+    metrics: Optional[GatewayMetrics] = field(default=None, init=False)
+    access_log: Optional["AccessLog"] = field(default=None, init=False)
+    _generation: PipelineGeneration = field(init=False)
+
+    @property
+    def _pipeline(self) -> Pipeline:
+        return self._generation.routes.default
+
+    @property
+    def _routes(self) -> RouteIndex:
+        return self._generation.routes
 
     def _setup_policies(self, policy_id: str, policy_config: dict[str, Any]) -> BasePolicy:
         PolicyClass = self.policy_registry.get(policy_id)
         PolicyConfig = _get_policy_config_class_from_generic(PolicyClass)
         policy_config_instance = PolicyConfig(**policy_config)
         return PolicyClass(config=policy_config_instance)
+
+    def _policy(self, compilation: _Compilation, scope: str, policy_id: str, policy_config: dict[str, Any]) -> BasePolicy:
+        """The previous generation's instance for the same scope, id and config, else a new one."""
+        key = (scope, policy_id, json.dumps(policy_config, sort_keys=True, default=str))
+        previous = compilation.previous.get(key)
+        if previous:
+            policy = previous.pop(0)
+        else:
+            policy = self._setup_policies(policy_id, policy_config)
+            compilation.created.append(policy)
+        compilation.policies.setdefault(key, []).append(policy)
+        return policy
+
+    def _build_pipeline(self, phase_policies: PhasePolicies, scope: str, compilation: _Compilation) -> Pipeline:
+        """
+        Instantiate the policies of one scope. A policy configured identically in
+        several phases of the scope (e.g. a cache in inbound and outbound) is a
+        single instance, so its phases share state. With metrics enabled, each
+        policy of each phase is wrapped in an `InstrumentedPolicy`.
+        """
+        metrics = compilation.metrics
+        phases: dict[str, list[Any]] = {phase: [] for phase in _PHASES}
+        inbound_options: list[dict[str, Any]] = []
+        shared: dict[tuple[str, str], BasePolicy] = {}
+        for phase, (label, policy_type) in _PHASES.items():
+            logger.debug(f"{label} policies")
+            for raw_policy_entry in getattr(phase_policies, phase):
+                policy_id, policy_config, options = _parse_policy_entry(raw_policy_entry)
+                if phase == "inbound":
+                    inbound_options.append({"id": policy_id, **options})
+                elif options:
+                    raise ValueError(f"{label} policy {policy_id}: {', '.join(options)} only apply to inbound policies")
+                key = (policy_id, json.dumps(policy_config, sort_keys=True, default=str))
+                base_policy = shared.get(key)
+                if base_policy is None or any(getattr(policy, "policy", policy) is base_policy for policy in phases[phase]):
+                    base_policy = shared[key] = self._policy(compilation, scope, policy_id, policy_config)
+                if not isinstance(base_policy, policy_type):
+                    raise ValueError(f"{label} policy {policy_id} is not an {policy_type.__name__}")
+                if metrics is not None:
+                    entry = InstrumentedPolicy(base_policy, metrics.policy(policy_id, phase))
+                else:
+                    entry = base_policy
+                phases[phase].append(entry)
+                compilation.policy_ids[id(entry)] = policy_id
+        return Pipeline(
+            **{phase: tuple(policies) for phase, policies in phases.items()},
+            inbound_stages=self._inbound_stages(phases["inbound"], inbound_options),
+        )
+
+    @staticmethod
+    def _inbound_stages(
+        policies: list[InboundPolicy], options: list[dict[str, Any]]
+    ) -> tuple[tuple[InboundPolicy, ...], ...]:
+        """
+        Group inbound policies into stages run one after another, the policies
+        of a stage concurrently. Policies run in config order unless marked
+        `independent: true` or given `dependsOn: [ids]` (ids default to the
+        policy id). Consecutive such policies share stages: each goes in the
+        first stage after the ones holding its dependencies, so it still sees
+        their effects. Policies whose class sets `mutates_request_state` always
+        run alone, as later policies may read what they write.
+        """
+        stages: list[tuple[InboundPolicy, ...]] = []
+        run: list[tuple[InboundPolicy, int]] = []  # consecutive concurrent policies and their stage offset
+        run_levels: dict[str, int] = {}
+        seen: set[str] = set()
+
+        def flush() -> None:
+            levels: dict[int, list[InboundPolicy]] = {}
+            for policy, level in run:
+                levels.setdefault(level, []).append(policy)
+            stages.extend(tuple(levels[level]) for level in sorted(levels))
+            run.clear()
+            run_levels.clear()
+
+        for policy, entry in zip(policies, options):
+            depends_on = entry.get("dependsOn") or []
+            unknown = [dependency for dependency in depends_on if dependency not in seen]
+            if unknown:
+                raise ValueError(f"Inbound policy {entry['id']} depends on {unknown}, which must be listed before it")
+            concurrent = entry.get("independent", False) or bool(depends_on)
+            if not concurrent or getattr(policy, "mutates_request_state", False):
+                flush()
+                stages.append((policy,))
+            else:
+                level = max((run_levels[dependency] + 1 for dependency in depends_on if dependency in run_levels), default=0)
+                run.append((policy, level))
+                run_levels[entry["id"]] = max(level, run_levels.get(entry["id"], 0))
+            seen.add(entry["id"])
+        flush()
+        return tuple(stages)
     
+    def _compile(self, gateway_config: GatewayConfig, metrics: Optional[GatewayMetrics]) -> PipelineGeneration:
+        previous = getattr(self, "_generation", None)
+        compilation = _Compilation(
+            metrics=metrics,
+            previous={key: list(policies) for key, policies in previous.policies.items()} if previous else {},
+        )
+        try:
+            logger.debug("Initializing global policies")
+            global_pipeline = self._build_pipeline(gateway_config.global_policies, "global", compilation)
+            routes = RouteIndex(default=global_pipeline)
+
+            for api in gateway_config.apis:
+                logger.debug(f"Initializing policies of API {api.path_prefix}")
+                hosts = api.hosts or [None]
+                api_scope = f"api {','.join(api.hosts)} {api.path_prefix}"
+                api_pipeline = self._build_pipeline(api.policies, api_scope, compilation)
+                if api.inherit_policies:
+                    api_pipeline = global_pipeline.extend(api_pipeline)
+                for host in hosts:
+                    routes.add(api.path_prefix, api_pipeline, host=host)
+
+                for operation in api.operations:
+                    path = api.path_prefix.rstrip("/") + "/" + operation.path.lstrip("/")
+                    logger.debug(f"Initializing policies of operation {operation.method or '*'} {path}")
+                    operation_scope = f"{api_scope} {operation.method or '*'} {path}"
+                    operation_pipeline = self._build_pipeline(operation.policies, operation_scope, compilation)
+                    if operation.inherit_policies:
+                        operation_pipeline = api_pipeline.extend(operation_pipeline)
+                    for host in hosts:
+                        routes.add(path, operation_pipeline, host=host, method=operation.method, exact=True)
+        except BaseException:
+            _close_policies(compilation.created)
+            raise
+        return PipelineGeneration(gateway_config, routes, compilation.policies, compilation.policy_ids)
+
     def __post_init__(self):
         logger.info("Initializing Gateway")
         logger.debug(f"Gateway config: {self.gateway_config.model_dump_json(indent=2)}")
-        global_policies = self.gateway_config.global_policies
-        logger.debug("Initializing global policies")
-        logger.debug("Inbound policies")
-        for inbound_policy_config in global_policies.inbound:
-            policy_id = list(inbound_policy_config.keys())[0]
-            policy_config = inbound_policy_config[policy_id]
-            base_policy = self._setup_policies(policy_id, policy_config)
-            if not isinstance(base_policy, InboundPolicy):
-                raise ValueError(f"Inbound policy {policy_id} is not an InboundPolicy")
-            self._inbound_policies.append(base_policy)
-
-        logger.debug("Backend policies")
-        for backend_policy_config in global_policies.backend:
-            policy_id = list(backend_policy_config.keys())[0]
-            policy_config = backend_policy_config[policy_id]
-            base_policy = self._setup_policies(policy_id, policy_config)
-            if not isinstance(base_policy, BackendPolicy):
-                raise ValueError(f"Backend policy {policy_id} is not a BackendPolicy")
-            self._backend_policies.append(base_policy)
-
-        logger.debug("Outbound policies")
-        for outbound_policy_config in global_policies.outbound:
-            policy_id = list(outbound_policy_config.keys())[0]
-            policy_config = outbound_policy_config[policy_id]
-            base_policy = self._setup_policies(policy_id, policy_config)
-            if not isinstance(base_policy, OutboundPolicy):
-                raise ValueError(f"Outbound policy {policy_id} is not an OutboundPolicy")
-            self._outbound_policies.append(base_policy)
-
-        logger.debug("On Error policies")
-        for on_error_policy_config in global_policies.on_error:
-            policy_id = list(on_error_policy_config.keys())[0]
-            policy_config = on_error_policy_config[policy_id]
-            base_policy = self._setup_policies(policy_id, policy_config)
-            if not isinstance(base_policy, OnErrorPolicy):
-                raise ValueError(f"On Error policy {policy_id} is not an OnErrorPolicy")
-            self._on_error_policies.append(base_policy)
+        if self.gateway_config.metrics.enabled:
+            self.metrics = GatewayMetrics()
+        self._generation = self._compile(self.gateway_config, self.metrics)
+        self.access_log = self._access_log(self.gateway_config.access_log)
+
+    @staticmethod
+    def _access_log(config: AccessLogConfig) -> Optional["AccessLog"]:
+        if not config.enabled:
+            return None
+        from fastapigate.core.access_log import AccessLog
+
+        return AccessLog.from_config(config)
+
+    def reload(self, gateway_config: GatewayConfig) -> None:
+        """
+        Compile `gateway_config` and swap it in. Raises (keeping the running
+        config) if any policy fails to build.
+        """
+        self.install(self.build(gateway_config))
+
+    def build(self, gateway_config: GatewayConfig) -> GatewayBuild:
+        """
+        Compile `gateway_config` into the successor of the running config, for
+        `install`. Leaves the running config alone, so it may run in a worker
+        thread, off the event loop. Raises if any policy fails to build.
+        """
+        logger.info("Reloading Gateway")
+        logger.debug(f"Gateway config: {gateway_config.model_dump_json(indent=2)}")
+        metrics = None
+        if gateway_config.metrics.enabled:
+            metrics = self.metrics or GatewayMetrics()
+        previous = self._generation
+        generation = self._compile(gateway_config, metrics)
+        access_log = self.access_log
+        if gateway_config.access_log != self.gateway_config.access_log:
+            access_log = self._access_log(gateway_config.access_log)
+        return GatewayBuild(gateway_config, generation, metrics, access_log, previous)
+
+    def install(self, build: GatewayBuild) -> None:
+        """
+        Swap in a config compiled by `build`, on the event loop. Raises if
+        another config was swapped in since it was built.
+        """
+        previous, previous_access_log = self._generation, self.access_log
+        if build.previous is not previous:
+            # Discarded: close what the build created.
+            kept = {id(policy) for policies in build.previous.policies.values() for policy in policies}
+            _close_policies(
+                policy for policies in build.generation.policies.values() for policy in policies if id(policy) not in kept
+            )
+            if build.access_log is not previous_access_log and build.access_log is not None:
+                build.access_log.close()
+            raise RuntimeError("The gateway config changed while the new one was built")
+        generation, access_log = build.generation, build.access_log
+        # The swap itself: requests resolving their pipeline from now on get the new one.
+        self._generation, self.gateway_config, self.metrics = generation, build.gateway_config, build.metrics
+        self.access_log = access_log
+        if previous_access_log is not None and previous_access_log is not access_log:
+            previous_access_log.close()
+        kept = {id(policy) for policies in generation.policies.values() for policy in policies}
+        previous.retired = [
+            policy for policies in previous.policies.values() for policy in policies if id(policy) not in kept
+        ]
+        if not previous.in_flight:
+            self._retire(previous)
+
+    def acquire(self) -> PipelineGeneration:
+        """The current generation, counting one more request running on it (see `release`)."""
+        generation = self._generation
+        generation.in_flight += 1
+        return generation
+
+    def release(self, generation: PipelineGeneration) -> None:
+        generation.in_flight -= 1
+        if not generation.in_flight and generation.retired is not None:
+            self._retire(generation)
+
+    @staticmethod
+    def _retire(generation: PipelineGeneration) -> None:
+        retired, generation.retired = generation.retired or [], []
+        _close_policies(retired)
+
+    def resolve(self, request: Request) -> Pipeline:
+        return self._generation.resolve(request)
 
     def __call__(self, call_next: Callable[[Request], Awaitable[Response]]) -> GatewayContext:
         return GatewayContext(self, call_next)
 
-
@@ -0,0 +1,117 @@
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+# Every power of two is split into 2 ** SUB_BUCKET_BITS linear buckets, so any
+# recorded value is known to within 1 / 2 ** SUB_BUCKET_BITS (~6%).
+SUB_BUCKET_BITS = 4
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+# Values are clamped to 2 ** MAX_VALUE_BITS - 1 (~19 hours in microseconds).
+MAX_VALUE_BITS = 36
+MAX_VALUE = (1 << MAX_VALUE_BITS) - 1
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKET_COUNT
+
+
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value if value > 0 else 0
+    if value > MAX_VALUE:
+        value = MAX_VALUE
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - SUB_BUCKET_COUNT
+
+
+def bucket_upper_bound(index: int) -> int:
+    """The largest value falling into bucket `index`."""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub_bucket = (index & (SUB_BUCKET_COUNT - 1)) + SUB_BUCKET_COUNT
+    return ((sub_bucket + 1) << shift) - 1
+
+
+@dataclass
+class LatencyHistogram:
+    """
+    A log-linear (HDR-style) histogram of non-negative integer values, usually
+    latencies in microseconds. Memory is fixed (`BUCKET_COUNT` counters) and
+    recording is a couple of integer operations.
+    """
+    counts: list[int] = field(default_factory=lambda: [0] * BUCKET_COUNT)
+    count: int = 0
+    total: int = 0
+
+    def record(self, value: int) -> None:
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self) -> None:
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+
+    def percentile(self, percentile: float) -> int:
+        """Upper bound of the bucket holding the `percentile` (0-100) value, 0 if empty."""
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * percentile / 100.0))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket_upper_bound(index)
+        return MAX_VALUE
+
+    def buckets(self) -> Iterator[tuple[int, int]]:
+        """Non-empty buckets as (upper bound, count), in ascending order."""
+        for index, count in enumerate(self.counts):
+            if count:
+                yield bucket_upper_bound(index), count
+
+
+@dataclass
+class RollingHistogram:
+    """
+    A `LatencyHistogram` over the last `window` seconds, kept as `slices`
+    histograms that are recycled in turn, so old samples age out in steps
+    of `window / slices` without any per-sample bookkeeping.
+    """
+    window: float = 60.0
+    slices: int = 6
+    clock: Callable[[], float] = time.monotonic
+    _histograms: list[LatencyHistogram] = field(init=False)
+    _slice: int = field(init=False)
+
+    def __post_init__(self):
+        self._histograms = [LatencyHistogram() for _ in range(self.slices)]
+        self._slice = self._current_slice()
+
+    def _current_slice(self) -> int:
+        return int(self.clock() * self.slices / self.window)
+
+    def _rotate(self) -> None:
+        current = self._current_slice()
+        if current != self._slice:
+            for expired in range(self._slice + 1, min(current, self._slice + self.slices) + 1):
+                self._histograms[expired % self.slices].reset()
+            self._slice = current
+
+    def record(self, value: int) -> None:
+        self._rotate()
+        self._histograms[self._slice % self.slices].record(value)
+
+    def snapshot(self) -> LatencyHistogram:
+        self._rotate()
+        merged = LatencyHistogram()
+        for histogram in self._histograms:
+            merged.merge(histogram)
+        return merged
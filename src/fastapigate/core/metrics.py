@@ -0,0 +1,248 @@
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+from typing import Any, Iterator, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fastapigate.core.histogram import SUB_BUCKET_COUNT, LatencyHistogram, bucket_index
+
+# `le` bounds (seconds) of the exported Prometheus histograms; the recorded
+# histograms are much finer, see `fastapigate.core.histogram`.
+PROMETHEUS_BUCKETS = (
+    0.000001, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass
+class PolicyMetrics:
+    """
+    What one policy did in one phase: its latency in microseconds, how often it
+    was called, raised, and returned a response (by status code). An inbound
+    policy returning a response short-circuits the request.
+    """
+    policy_id: str
+    phase: str
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    errors: int = 0
+    responses: dict[int, int] = field(default_factory=dict)
+
+    @property
+    def calls(self) -> int:
+        return self.latency.count
+
+    @property
+    def short_circuits(self) -> int:
+        return sum(self.responses.values()) if self.phase == "inbound" else 0
+
+    def record_response(self, response: Response) -> None:
+        status_code = response.status_code
+        responses = self.responses
+        responses[status_code] = responses.get(status_code, 0) + 1
+
+    def record_error(self, start_ns: int) -> None:
+        self.latency.record((perf_counter_ns() - start_ns) // 1000)
+        self.errors += 1
+
+    def summary(self) -> dict[str, Any]:
+        latency = self.latency
+        return {
+            "calls": latency.count,
+            "errors": self.errors,
+            "short_circuits": self.short_circuits,
+            "responses": dict(self.responses),
+            "latency_us": {
+                "mean": latency.total / latency.count if latency.count else 0.0,
+                "p50": latency.percentile(50),
+                "p90": latency.percentile(90),
+                "p99": latency.percentile(99),
+                "max": latency.percentile(100),
+            },
+        }
+
+
+class InstrumentedPolicy:
+    """
+    Stands in for a policy in one phase of a `Pipeline`, timing every call into
+    `metrics`. This runs around every policy call, so nothing is forwarded to
+    the policy on the hot path: its phase methods are bound once, and only the
+    attributes the gateway reads off pipeline entries (`forward`,
+    `buffers_request_body`, `mutates_request_state`) are mirrored.
+    """
+    __slots__ = (
+        "policy", "metrics", "forward", "buffers_request_body", "mutates_request_state",
+        "_latency", "_inbound", "_backend", "_outbound", "_on_error",
+    )
+
+    def __init__(self, policy: Any, metrics: PolicyMetrics):
+        self.policy = policy
+        self.metrics = metrics
+        forward = getattr(policy, "forward", None)
+        if forward is not None:
+            self.forward = forward
+        self.buffers_request_body = getattr(policy, "buffers_request_body", False)
+        self.mutates_request_state = getattr(policy, "mutates_request_state", False)
+        self._latency = metrics.latency
+        self._inbound = getattr(policy, "inbound", None)
+        self._backend = getattr(policy, "backend", None)
+        self._outbound = getattr(policy, "outbound", None)
+        self._on_error = getattr(policy, "on_error", None)
+
+    # The recording below is `LatencyHistogram.record` and `PolicyMetrics.record_response`,
+    # inlined in each phase: a function call per policy call is most of the budget.
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        start = perf_counter_ns()
+        try:
+            response = await self._inbound(request)
+        except Exception:
+            self.metrics.record_error(start)
+            raise
+        elapsed = (perf_counter_ns() - start) // 1000
+        latency = self._latency
+        latency.counts[elapsed if elapsed < SUB_BUCKET_COUNT else bucket_index(elapsed)] += 1
+        latency.count += 1
+        latency.total += elapsed
+        if response is not None:
+            self.metrics.record_response(response)
+        return response
+
+    async def backend(self, request: Request) -> Optional[Response]:
+        start = perf_counter_ns()
+        try:
+            response = await self._backend(request)
+        except Exception:
+            self.metrics.record_error(start)
+            raise
+        elapsed = (perf_counter_ns() - start) // 1000
+        latency = self._latency
+        latency.counts[elapsed if elapsed < SUB_BUCKET_COUNT else bucket_index(elapsed)] += 1
+        latency.count += 1
+        latency.total += elapsed
+        if response is not None:
+            self.metrics.record_response(response)
+        return response
+
+    async def outbound(self, request: Request, response: Response) -> Optional[Response]:
+        start = perf_counter_ns()
+        try:
+            response = await self._outbound(request, response)
+        except Exception:
+            self.metrics.record_error(start)
+            raise
+        elapsed = (perf_counter_ns() - start) // 1000
+        latency = self._latency
+        latency.counts[elapsed if elapsed < SUB_BUCKET_COUNT else bucket_index(elapsed)] += 1
+        latency.count += 1
+        latency.total += elapsed
+        if response is not None:
+            self.metrics.record_response(response)
+        return response
+
+    async def on_error(self, request: Request, exc: Exception, context: dict[str, Any]) -> Optional[Response]:
+        start = perf_counter_ns()
+        try:
+            response = await self._on_error(request, exc, context)
+        except Exception:
+            self.metrics.record_error(start)
+            raise
+        elapsed = (perf_counter_ns() - start) // 1000
+        latency = self._latency
+        latency.counts[elapsed if elapsed < SUB_BUCKET_COUNT else bucket_index(elapsed)] += 1
+        latency.count += 1
+        latency.total += elapsed
+        if response is not None:
+            self.metrics.record_response(response)
+        return response
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+@dataclass
+class GatewayMetrics:
+    """
+    The `PolicyMetrics` of a gateway, one per (policy id, phase): a policy id
+    configured in several scopes (global, APIs, operations) is aggregated.
+    """
+    _policies: dict[tuple[str, str], PolicyMetrics] = field(default_factory=dict)
+
+    def policy(self, policy_id: str, phase: str) -> PolicyMetrics:
+        key = (policy_id, phase)
+        metrics = self._policies.get(key)
+        if metrics is None:
+            metrics = self._policies[key] = PolicyMetrics(policy_id, phase)
+        return metrics
+
+    def __iter__(self) -> Iterator[PolicyMetrics]:
+        return iter(self._policies.values())
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """`{policy_id: {phase: summary}}`, see `PolicyMetrics.summary`."""
+        snapshot: dict[str, dict[str, dict[str, Any]]] = {}
+        for metrics in self:
+            snapshot.setdefault(metrics.policy_id, {})[metrics.phase] = metrics.summary()
+        return snapshot
+
+    def reset(self) -> None:
+        # In place: the pipelines' `InstrumentedPolicy`s hold on to their `PolicyMetrics` and histograms.
+        for metrics in self:
+            metrics.latency.reset()
+            metrics.errors = 0
+            metrics.responses.clear()
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP fastapigate_policy_duration_seconds Time spent in a policy call.",
+            "# TYPE fastapigate_policy_duration_seconds histogram",
+        ]
+        for metrics in self:
+            labels = f'policy="{_escape(metrics.policy_id)}",phase="{metrics.phase}"'
+            buckets = iter(metrics.latency.buckets())
+            bucket = next(buckets, None)
+            cumulative = 0
+            for bound in PROMETHEUS_BUCKETS:
+                bound_us = bound * 1e6
+                while bucket is not None and bucket[0] <= bound_us:
+                    cumulative += bucket[1]
+                    bucket = next(buckets, None)
+                lines.append(f'fastapigate_policy_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'fastapigate_policy_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.calls}')
+            lines.append(f"fastapigate_policy_duration_seconds_sum{{{labels}}} {metrics.latency.total / 1e6}")
+            lines.append(f"fastapigate_policy_duration_seconds_count{{{labels}}} {metrics.calls}")
+
+        lines += [
+            "# HELP fastapigate_policy_errors_total Policy calls that raised an exception.",
+            "# TYPE fastapigate_policy_errors_total counter",
+        ]
+        for metrics in self:
+            lines.append(
+                f'fastapigate_policy_errors_total{{policy="{_escape(metrics.policy_id)}",phase="{metrics.phase}"}} {metrics.errors}'
+            )
+
+        lines += [
+            "# HELP fastapigate_policy_responses_total Responses returned by a policy, by status code.",
+            "# TYPE fastapigate_policy_responses_total counter",
+        ]
+        for metrics in self:
+            for status_code, count in sorted(metrics.responses.items()):
+                lines.append(
+                    f'fastapigate_policy_responses_total{{policy="{_escape(metrics.policy_id)}",'
+                    f'phase="{metrics.phase}",status="{status_code}"}} {count}'
+                )
+
+        lines += [
+            "# HELP fastapigate_policy_short_circuits_total Requests answered by an inbound policy.",
+            "# TYPE fastapigate_policy_short_circuits_total counter",
+        ]
+        for metrics in self:
+            if metrics.phase == "inbound":
+                lines.append(
+                    f'fastapigate_policy_short_circuits_total{{policy="{_escape(metrics.policy_id)}"}} {metrics.short_circuits}'
+                )
+        return "\n".join(lines) + "\n"
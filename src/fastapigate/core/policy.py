@@ -1,24 +1,75 @@
-from typing import Any, Optional, Protocol, TypeVar, Generic
-from pydantic import BaseModel, Field
-from fastapi import Request, Response
+import importlib
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Optional, Type, Union
+
 from fastapigate.core.types import BasePolicy
 
+if TYPE_CHECKING:
+    # importlib.metadata is slow to import; it is only needed once entry points are scanned.
+    from importlib.metadata import EntryPoint
 
+logger = logging.getLogger(__name__)
+
+# Entry point group third-party packages register their policies under, e.g. in pyproject.toml:
+#   [project.entry-points."fastapigate.policies"]
+#   my_policy = "my_package.policies:MyPolicy"
+ENTRY_POINT_GROUP = "fastapigate.policies"
+
+PolicyTarget = Union[Type[BasePolicy], str, "EntryPoint"]
 
-from dataclasses import dataclass, field
-from typing import NamedTuple, Type
+
+def import_policy(path: str) -> Type[BasePolicy[Any]]:
+    """Import a policy class from a `"package.module:ClassName"` path."""
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(f"Policy path {path!r} is not of the form 'package.module:ClassName'")
+    return getattr(importlib.import_module(module_name), attribute)
 
 
 @dataclass
 class PolicyRegistry:
-    _registry: dict[str, Type[BasePolicy]] = field(default_factory=dict)
+    """
+    Maps policy ids to policy classes. A policy may be registered as a class, or
+    lazily as an import path (`"package.module:ClassName"`) or entry point, in
+    which case its module is only imported the first time a config uses it.
+    Ids not registered explicitly are looked up in the entry points of
+    `entry_point_group` (if set), which are scanned on the first unknown id.
+    """
+    _registry: dict[str, PolicyTarget] = field(default_factory=dict)
+    entry_point_group: Optional[str] = None
+    _entry_points_loaded: bool = field(default=False, init=False)
 
-    def register(self, id: str,  policy: Type[BasePolicy]):
+    def register(self, id: str, policy: PolicyTarget):
         self._registry[id] = policy
 
+    def _load_entry_points(self) -> None:
+        from importlib.metadata import entry_points
+
+        self._entry_points_loaded = True
+        for entry_point in entry_points(group=self.entry_point_group):
+            if entry_point.name in self._registry:
+                logger.warning(f"Ignoring entry point {entry_point.value}: policy id {entry_point.name} is already registered")
+                continue
+            self._registry[entry_point.name] = entry_point
+
     def get(self, id: str) -> Type[BasePolicy[Any]]:
+        if id not in self._registry and self.entry_point_group and not self._entry_points_loaded:
+            self._load_entry_points()
         if id not in self._registry:
             raise ValueError(f"Unknown policy id: {id}")
-        return self._registry[id]
-
+        policy = self._registry[id]
+        if isinstance(policy, type):
+            return policy
+        try:
+            loaded = import_policy(policy) if isinstance(policy, str) else policy.load()
+        except (ImportError, AttributeError) as exc:
+            # E.g. a typo in the path, or a policy's optional dependency not installed.
+            target = policy if isinstance(policy, str) else f"entry point {policy.value}"
+            raise ValueError(f"Policy {id} could not be loaded from {target}: {exc}") from exc
+        self._registry[id] = loaded
+        return loaded
 
+    def ids(self) -> list[str]:
+        """The registered policy ids, without importing anything (entry points included if scanned)."""
+        return sorted(self._registry)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import signal
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapigate.core.config import GatewayConfig
+from fastapigate.core.gateway import Gateway, GatewayBuild
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ConfigReloader:
+    """
+    Keeps `gateway` in sync with the YAML config file at `path`: the file is
+    polled every `interval` seconds (None: never) and reloaded when its content
+    changes, `reload_signal` (SIGHUP by default, None: none) reloads it, and so
+    does calling `reload()`. A config that fails to validate or build is logged
+    and the running one kept.
+
+    The file is read, parsed and compiled in a worker thread; only the swap to
+    the new config runs on the event loop, so requests aren't held up.
+    """
+    gateway: Gateway
+    path: str
+    interval: Optional[float] = 1.0
+    reload_signal: Optional[signal.Signals] = signal.SIGHUP
+    _content: Optional[bytes] = field(default=None, init=False)
+    _stamp: Optional[tuple[int, int]] = field(default=None, init=False)
+    _task: Optional[asyncio.Task] = field(default=None, init=False)
+    _started: bool = field(default=False, init=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+    # Reloads started by the signal handler, referenced until done.
+    _signaled: set[asyncio.Task] = field(default_factory=set, init=False)
+
+    def __post_init__(self):
+        # The gateway was presumably built from the file as it is now.
+        try:
+            self._stamp = self._stat()
+            with open(self.path, "rb") as f:
+                self._content = f.read()
+        except OSError:
+            pass
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def _stat(self) -> tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _build(self) -> Optional[tuple[bytes, GatewayBuild]]:
+        """The file's content and the config built from it, None if it didn't change. Blocking."""
+        self._stamp = self._stat()
+        with open(self.path, "rb") as f:
+            content = f.read()
+        if content == self._content:
+            return None
+        import yaml
+
+        return content, self.gateway.build(GatewayConfig(**(yaml.safe_load(content) or {})))
+
+    async def reload(self) -> bool:
+        """Reload the file if its content changed; whether the new config is now running."""
+        async with self._lock:
+            try:
+                built = await asyncio.to_thread(self._build)
+                if built is None:
+                    return False
+                content, build = built
+                self.gateway.install(build)
+            except Exception:
+                logger.exception(f"Reloading the gateway config from {self.path} failed, keeping the running config")
+                return False
+            self._content = content
+        logger.info(f"Reloaded the gateway config from {self.path}")
+        return True
+
+    def _on_signal(self) -> None:
+        task = asyncio.get_running_loop().create_task(self.reload())
+        self._signaled.add(task)
+        task.add_done_callback(self._signaled.discard)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                stamp = self._stat()
+            except OSError:
+                continue
+            if stamp != self._stamp:
+                await self.reload()
+
+    def start(self) -> None:
+        """Start watching; must be called from the event loop serving the gateway."""
+        if self._started:
+            return
+        self._started = True
+        loop = asyncio.get_running_loop()
+        if self.interval is not None:
+            self._task = loop.create_task(self._watch())
+        if self.reload_signal is not None:
+            try:
+                loop.add_signal_handler(self.reload_signal, self._on_signal)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not on the main thread, or not supported by the platform/loop.
+                logger.warning(f"Can't reload the gateway config on {self.reload_signal.name}")
+
+    async def stop(self) -> None:
+        """Stop watching, waiting for a reload in progress (see `GatewayMiddleware`'s lifespan handling)."""
+        if self._task is not None:
+            # Not while it reloads: the config it built would be dropped, not closed.
+            async with self._lock:
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._started and self.reload_signal is not None:
+            try:
+                asyncio.get_running_loop().remove_signal_handler(self.reload_signal)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+        if self._signaled:
+            await asyncio.gather(*self._signaled, return_exceptions=True)
+        self._started = False
@@ -0,0 +1,141 @@
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Optional
+
+from fastapigate.core.types import BackendPolicy, InboundPolicy, OnErrorPolicy, OutboundPolicy
+
+RouteKey = tuple[Optional[str], Optional[str]]  # (host, method), None matches any
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    """
+    The flattened, ready-to-run policy chain of a route, one tuple per phase.
+    An empty tuple means the phase is skipped entirely for the route.
+
+    `inbound_stages` are the inbound policies as they run: stage after stage,
+    the policies of one stage concurrently. Defaults to one stage per policy.
+    """
+    inbound: tuple[InboundPolicy, ...] = ()
+    inbound_stages: tuple[tuple[InboundPolicy, ...], ...] = ()
+    backend: tuple[BackendPolicy, ...] = ()
+    outbound: tuple[OutboundPolicy, ...] = ()
+    on_error: tuple[OnErrorPolicy, ...] = ()
+
+    def __post_init__(self):
+        if not self.inbound_stages and self.inbound:
+            object.__setattr__(self, "inbound_stages", tuple((policy,) for policy in self.inbound))
+
+    @cached_property
+    def buffers_request_body(self) -> bool:
+        """Whether a policy may invoke the backend again and so needs the request body replayable."""
+        policies = self.inbound + self.backend + self.outbound + self.on_error
+        return any(getattr(policy, "buffers_request_body", False) for policy in policies)
+
+    @cached_property
+    def upstream(self) -> Optional[BackendPolicy]:
+        """
+        The last backend policy forwarding requests elsewhere (`forward(request)`,
+        e.g. a reverse proxy), which then stands in for the app as the backend.
+        """
+        upstreams = [policy for policy in self.backend if hasattr(policy, "forward")]
+        return upstreams[-1] if upstreams else None
+
+    def extend(self, other: "Pipeline") -> "Pipeline":
+        return Pipeline(
+            inbound=self.inbound + other.inbound,
+            inbound_stages=self.inbound_stages + other.inbound_stages,
+            backend=self.backend + other.backend,
+            outbound=self.outbound + other.outbound,
+            on_error=self.on_error + other.on_error,
+        )
+
+
+def split_path(path: str) -> list[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+def _match(pipelines: dict[RouteKey, Pipeline], host: str, method: str) -> Optional[Pipeline]:
+    if not pipelines:
+        return None
+    return (
+        pipelines.get((host, method))
+        or pipelines.get((host, None))
+        or pipelines.get((None, method))
+        or pipelines.get((None, None))
+    )
+
+
+@dataclass
+class _RouteNode:
+    children: dict[str, "_RouteNode"] = field(default_factory=dict)
+    param_child: Optional["_RouteNode"] = None
+    # Routes matching every path below the node (APIs), and only the node's own path (operations).
+    prefix_pipelines: dict[RouteKey, Pipeline] = field(default_factory=dict)
+    exact_pipelines: dict[RouteKey, Pipeline] = field(default_factory=dict)
+
+
+# (exact match, matched segments, pipeline), ordered by precedence on the first two.
+_Match = tuple[bool, int, Pipeline]
+
+
+@dataclass
+class RouteIndex:
+    """
+    A path-segment trie mapping (path, host, method) to a `Pipeline`.
+
+    Prefix routes (APIs) match their path and everything below it, exact routes
+    (operations) only their path. An exact match wins, then the longest matching
+    prefix, and within a node an exact host/method match wins over a wildcard.
+    `{param}` segments match any single segment; literal segments take precedence
+    over them, but a literal branch that matches no route falls back to the
+    parameter one. Without parameters resolution walks the request path once, so
+    it costs O(path segments). Requests matching no route get `default`.
+    """
+    default: Pipeline = field(default_factory=Pipeline)
+    _root: _RouteNode = field(default_factory=_RouteNode)
+
+    def add(
+        self,
+        path: str,
+        pipeline: Pipeline,
+        host: Optional[str] = None,
+        method: Optional[str] = None,
+        exact: bool = False,
+    ) -> None:
+        node = self._root
+        for segment in split_path(path):
+            if segment.startswith("{") and segment.endswith("}"):
+                if node.param_child is None:
+                    node.param_child = _RouteNode()
+                node = node.param_child
+            else:
+                node = node.children.setdefault(segment, _RouteNode())
+        key = (host.lower() if host else None, method.upper() if method else None)
+        (node.exact_pipelines if exact else node.prefix_pipelines)[key] = pipeline
+
+    def resolve(self, path: str, host: str = "", method: str = "GET") -> Pipeline:
+        found = self._lookup(self._root, split_path(path), 0, host, method)
+        return found[2] if found else self.default
+
+    def _lookup(self, node: _RouteNode, segments: list[str], index: int, host: str, method: str) -> Optional[_Match]:
+        """The best route for `segments[index:]` below `node`, literal branches first."""
+        best: Optional[_Match] = None
+        if index == len(segments):
+            exact = _match(node.exact_pipelines, host, method)
+            if exact is not None:
+                return True, index, exact
+        else:
+            for child in (node.children.get(segments[index]), node.param_child):
+                if child is None:
+                    continue
+                found = self._lookup(child, segments, index + 1, host, method)
+                if found is not None and (best is None or found[:2] > best[:2]):
+                    if found[0]:
+                        return found
+                    best = found
+        if best is None:
+            prefix = _match(node.prefix_pipelines, host, method)
+            if prefix is not None:
+                return False, index, prefix
+        return best
@@ -1,6 +1,7 @@
 from typing import Any, Optional, Protocol, TypeVar, Generic, runtime_checkable
 from dataclasses import dataclass
-from fastapi import Request, Response
+from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 
 PolicyConfig = TypeVar("PolicyConfig", bound=BaseModel)
@@ -1,11 +1,22 @@
-from fastapigate.core.policy import PolicyRegistry
-#from fastapigate.policies.jwt_auth import JWTAuth
-#from fastapigate.policies.rate_limit import RateLimit
-from fastapigate.policies.retry import RetryPolicy
+from fastapigate.core.policy import ENTRY_POINT_GROUP, PolicyRegistry
+
+# Registered by import path: a policy module (and its dependencies, e.g. pyjwt
+# for jwt_auth) is only imported when a config uses the policy.
+DEFAULT_POLICIES = {
+    "cache": "fastapigate.policies.cache:CachePolicy",
+    "circuit_breaker": "fastapigate.policies.circuit_breaker:CircuitBreakerPolicy",
+    "compression": "fastapigate.policies.compression:CompressionPolicy",
+    "concurrency_limit": "fastapigate.policies.concurrency_limit:ConcurrencyLimitPolicy",
+    "hedge": "fastapigate.policies.hedge:HedgePolicy",
+    "ip_filter": "fastapigate.policies.ip_filter:IPFilterPolicy",
+    "jwt_auth": "fastapigate.policies.jwt_auth:JWTAuthPolicy",
+    "proxy": "fastapigate.policies.proxy:ProxyPolicy",
+    "rate_limit": "fastapigate.policies.rate_limit:RateLimitPolicy",
+    "retry": "fastapigate.policies.retry:RetryPolicy",
+}
 
 def default_policy_registry() -> PolicyRegistry:
-    registry = PolicyRegistry()
-    #registry.register("jwt_auth", JWTAuth)
-    #registry.register("rate_limit", RateLimit)
-    registry.register("retry", RetryPolicy)
+    registry = PolicyRegistry(entry_point_group=ENTRY_POINT_GROUP)
+    for policy_id, path in DEFAULT_POLICIES.items():
+        registry.register(policy_id, path)
     return registry
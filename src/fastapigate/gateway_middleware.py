@@ -1,30 +1,227 @@
-from typing import Awaitable, Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+import time
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from fastapigate.core.config import GatewayConfig
 from fastapigate.core.gateway import Gateway
+from fastapigate.core.metrics import PROMETHEUS_CONTENT_TYPE
+from fastapigate.core.reload import ConfigReloader
 from fastapigate.default_policy_registry import default_policy_registry
-from starlette.middleware.trustedhost import TrustedHostMiddleware
 
-class GatewayMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, gateway: Gateway):
-        super().__init__(app)
+# Number of ASGI messages the wrapped app may run ahead of the client
+# when its response is streamed through outbound policies.
+_STREAM_QUEUE_SIZE = 8
+
+
+def _app_receive(request: Request, receive: Receive) -> Receive:
+    """
+    Return the `receive` channel the wrapped app should read the request body from.
+
+    The original channel is handed through untouched unless a policy explicitly
+    read the body (`await request.body()`); in that case the buffered body is
+    replayed once before falling back to the original channel (for disconnects).
+    """
+    body: Optional[bytes] = getattr(request, "_body", None)
+    if body is None:
+        return receive
+
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+class _AppResponse(StreamingResponse):
+    """
+    The wrapped app's response, streamed chunk by chunk from its `send` calls.
+
+    Only used when outbound policies need a `Response` object to look at.
+    Body chunks are forwarded as-is, never joined or copied.
+    """
+
+    def __init__(self, start_message: Message, queue: asyncio.Queue, task: asyncio.Task):
+        super().__init__(self._stream(), status_code=start_message["status"])
+        self.raw_headers = list(start_message.get("headers", []))
+        self._queue = queue
+        self._task = task
+
+    async def _stream(self):
+        while True:
+            message = await self._queue.get()
+            if message is None:
+                break
+            if isinstance(message, Exception):
+                raise message
+            if message["type"] != "http.response.body":
+                continue
+            body = message.get("body", b"")
+            if body:
+                yield body
+            if not message.get("more_body", False):
+                break
+        # Let the app finish (e.g. background tasks) before the response completes.
+        await self._task
+
+    def close(self) -> None:
+        """Cancel the app if the response was dropped before being fully streamed."""
+        if not self._task.done():
+            self._task.cancel()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # The wrapped app owns `receive` (it may still be reading the request body),
+        # so unlike StreamingResponse we must not listen for disconnects here.
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _call_app(app: ASGIApp, scope: Scope, receive: Receive) -> _AppResponse:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_STREAM_QUEUE_SIZE)
+
+    async def send_to_queue(message: Message) -> None:
+        await queue.put(message)
+
+    async def run_app() -> None:
+        try:
+            await app(scope, receive, send_to_queue)
+        except Exception as exc:
+            await queue.put(exc)
+        else:
+            await queue.put(None)
+
+    task = asyncio.create_task(run_app())
+    try:
+        message = await queue.get()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if isinstance(message, Exception):
+        raise message
+    if message is None or message["type"] != "http.response.start":
+        task.cancel()
+        raise RuntimeError("No response returned.")
+    return _AppResponse(message, queue, task)
+
+
+class GatewayMiddleware:
+    """
+    Pure ASGI middleware running the gateway phases around the wrapped app.
+
+    Bodies are passed through without buffering: the request body is only read
+    into memory when a policy asks for it, and when there are no outbound
+    policies the app writes its response straight to the server's `send`.
+    """
+
+    def __init__(self, app: ASGIApp, gateway: Gateway, reloader: Optional[ConfigReloader] = None):
+        self.app = app
         self.gateway = gateway
+        # Started with the first request (or the lifespan startup), on the event
+        # loop serving the app, and stopped on the lifespan shutdown.
+        self.reloader = reloader
 
     @classmethod
-    def from_gateway_config(cls, app, gateway_config: GatewayConfig):
+    def from_gateway_config(cls, app: ASGIApp, gateway_config: GatewayConfig):
         gateway = Gateway(gateway_config, default_policy_registry())
         return cls(app, gateway)
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
-        async with self.gateway(call_next) as ctx:
-            response = await ctx.run(request)
-            return response
-
-            response = await ctx.call_before(request)
-            if response:
-                return response
-            response = await call_next(request)
-            response = await ctx.call_after(request, response)
-        return response
+    @classmethod
+    def from_config_file(cls, app: ASGIApp, path: str, reload_interval: Optional[float] = 1.0):
+        """
+        A gateway on the YAML config at `path`, reloaded when the file changes
+        or on SIGHUP (see `ConfigReloader`).
+        """
+        gateway = Gateway(GatewayConfig.from_file(path), default_policy_registry())
+        return cls(app, gateway, ConfigReloader(gateway, path, interval=reload_interval))
+
+    def _is_metrics_request(self, scope: Scope) -> bool:
+        metrics_path = self.gateway.gateway_config.metrics.path
+        return metrics_path is not None and scope["path"] == metrics_path and self.gateway.metrics is not None
+
+    def _metrics_response(self) -> Response:
+        content = self.gateway.metrics.render_prometheus()
+        if self.gateway.access_log is not None:
+            content += self.gateway.access_log.render_prometheus()
+        return Response(content, media_type=PROMETHEUS_CONTENT_TYPE)
+
+    def _lifespan_receive(self, receive: Receive) -> Receive:
+        """`receive` of the lifespan protocol, stopping the reloader when the server shuts down."""
+
+        async def lifespan_receive() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.shutdown" and self.reloader is not None:
+                await self.reloader.stop()
+            return message
+
+        return lifespan_receive
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.reloader is not None and not self.reloader.started:
+            self.reloader.start()
+        if scope["type"] == "lifespan" and self.reloader is not None:
+            await self.app(scope, self._lifespan_receive(receive), send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        backend_calls: list[_AppResponse] = []
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            # What was sent, for the access log.
+            context = ctx.context
+            if message["type"] == "http.response.start":
+                response_started = True
+                context["status"] = message["status"]
+                context["response_started_at"] = time.perf_counter()
+            elif message.get("body"):
+                context["bytes_sent"] = context.get("bytes_sent", 0) + len(message["body"])
+            await send(message)
+
+        async def call_next(request: Request) -> Response:
+            # A copy, as policies may run several backend calls concurrently.
+            backend_response = await _call_app(self.app, dict(scope), _app_receive(request, receive))
+            backend_calls.append(backend_response)
+            return backend_response
+
+        try:
+            async with self.gateway(call_next) as ctx:
+                try:
+                    response = await ctx.call_before(request)
+                    if response is None and self._is_metrics_request(scope):
+                        # Past the inbound policies (authentication, IP filters) like any request.
+                        response = self._metrics_response()
+                    elif response is None:
+                        pipeline = ctx.pipeline(request)
+                        if not pipeline.backend and not pipeline.outbound:
+                            # Nothing needs to see the response: let the app stream it directly.
+                            await ctx.enter_backend(request)
+                            await self.app(scope, _app_receive(request, receive), send_wrapper)
+                            return
+                        backend_response = await ctx.call_backend(request)
+                        if pipeline.outbound:
+                            response = await ctx.call_after(request, backend_response) or backend_response
+                        else:
+                            response = backend_response
+                except Exception as exc:
+                    if response_started:
+                        raise
+                    response = await ctx.call_on_error(request, exc, ctx.context)
+                    if response is None:
+                        raise
+                await response(scope, receive, send_wrapper)
+        finally:
+            for backend_response in backend_calls:
+                backend_response.close()
@@ -0,0 +1,10 @@
+from fastapigate.ipfilter.table import Address, IPTable, parse_address, read_networks
+from fastapigate.ipfilter.trie import PrefixTrie
+
+__all__ = [
+    "Address",
+    "IPTable",
+    "PrefixTrie",
+    "parse_address",
+    "read_networks",
+]
@@ -0,0 +1,88 @@
+import socket
+from typing import Generic, Iterable, Optional, TypeVar
+
+from fastapigate.ipfilter.trie import PrefixTrie
+
+V = TypeVar("V")
+
+# (bits, integer) of an IPv4 (32) or IPv6 (128) address.
+Address = tuple[int, int]
+
+_IPV4_MAPPED = 0xFFFF
+
+
+def _parse_ip(text: str) -> Optional[Address]:
+    try:
+        return 32, int.from_bytes(socket.inet_pton(socket.AF_INET, text))
+    except OSError:
+        pass
+    try:
+        value = int.from_bytes(socket.inet_pton(socket.AF_INET6, text))
+    except (OSError, ValueError):
+        return None
+    if value >> 32 == _IPV4_MAPPED:
+        return 32, value & 0xFFFFFFFF
+    return 128, value
+
+
+def parse_address(host: str) -> Optional[Address]:
+    """
+    Parse an IPv4 or IPv6 address, as found in `request.client.host` or a
+    `X-Forwarded-For` entry (a port, brackets or IPv6 zone are ignored), None if
+    it isn't one. IPv4-mapped IPv6 addresses are returned as IPv4 addresses.
+    """
+    address = _parse_ip(host)
+    if address is not None:
+        return address
+    if host.startswith("["):
+        host = host[1:].partition("]")[0]
+    elif host.count(":") == 1:
+        # IPv4 address with a port.
+        host = host.partition(":")[0]
+    return _parse_ip(host.partition("%")[0])
+
+
+def read_networks(path: str) -> list[str]:
+    """The networks listed in a file, one per line; `#` starts a comment."""
+    with open(path) as f:
+        return [network for line in f if (network := line.partition("#")[0].strip())]
+
+
+class IPTable(Generic[V]):
+    """
+    Maps IPv4 and IPv6 networks (CIDRs, or single addresses) to values, with a
+    longest-prefix match lookup of addresses in O(address bits) whatever the
+    number of networks (see `PrefixTrie`).
+    """
+
+    def __init__(self, networks: Iterable[tuple[str, V]] = ()):
+        self._tries: dict[int, PrefixTrie[V]] = {32: PrefixTrie(32), 128: PrefixTrie(128)}
+        for network, value in networks:
+            self.add(network, value)
+
+    def __len__(self) -> int:
+        return sum(len(trie) for trie in self._tries.values())
+
+    def add(self, network: str, value: V) -> None:
+        """Map `network` to `value`; raises ValueError if it isn't a network or address."""
+        host, slash, length = network.strip().partition("/")
+        address = _parse_ip(host)
+        if address is None or (slash and not length.isdigit()):
+            raise ValueError(f"{network!r} does not appear to be an IPv4 or IPv6 network")
+        bits, prefix = address
+        length = int(length) if slash else bits
+        if bits == 32 and ":" in host:
+            # An IPv4-mapped IPv6 network: matched as IPv4, like the addresses it contains.
+            length -= 96
+        if not 0 <= length <= bits:
+            raise ValueError(f"{network!r} has an invalid prefix length")
+        self._tries[bits].insert(prefix, length, value)
+
+    def lookup(self, address: Address) -> Optional[V]:
+        """The value of the most specific network containing `address`, None if there is none."""
+        return self._tries[address[0]].longest_match(address[1])
+
+    def get(self, host: str) -> Optional[V]:
+        """`lookup` of a host string, None if it isn't an IP address."""
+        address = parse_address(host)
+        return None if address is None else self.lookup(address)
@@ -0,0 +1,94 @@
+from typing import Generic, Iterator, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+class _Node:
+    __slots__ = ("prefix", "length", "value", "children")
+
+    def __init__(self, prefix: int, length: int, value=None):
+        # `prefix` keeps only its first `length` bits, the others are zero.
+        self.prefix = prefix
+        self.length = length
+        self.value = value
+        self.children: list[Optional[_Node]] = [None, None]
+
+
+class PrefixTrie(Generic[V]):
+    """
+    A path-compressed binary trie (PATRICIA) mapping prefixes of `bits`-bit
+    integers, e.g. IPv4 (32) or IPv6 (128) networks, to values.
+
+    Chains of single-child nodes are collapsed into their last node, so the trie
+    holds at most two nodes per prefix whatever the prefixes' lengths, and a
+    longest-prefix match visits at most `bits` nodes, one shift and xor each.
+    """
+
+    def __init__(self, bits: int):
+        self.bits = bits
+        self._root = _Node(0, 0)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _mask(self, prefix: int, length: int) -> int:
+        return prefix >> (self.bits - length) << (self.bits - length) if length else 0
+
+    def _bit(self, value: int, index: int) -> int:
+        """Bit `index` of `value`, counting from the most significant one."""
+        return (value >> (self.bits - index - 1)) & 1
+
+    def insert(self, prefix: int, length: int, value: V) -> None:
+        """Map the first `length` bits of `prefix` to `value`, replacing any value they had."""
+        if not 0 <= length <= self.bits:
+            raise ValueError(f"Prefix length {length} out of range for {self.bits}-bit keys")
+        prefix = self._mask(prefix, length)
+        node = self._root
+        while node.length < length:
+            bit = self._bit(prefix, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(prefix, length, value)
+                self._size += 1
+                return
+            # Length of the prefix `child` and the new prefix have in common.
+            common = min(self.bits - (child.prefix ^ prefix).bit_length(), child.length, length)
+            if common == child.length:
+                node = child
+                continue
+            # The new prefix branches off (or ends) within `child`'s compressed path: split it.
+            split = _Node(self._mask(prefix, common), common)
+            split.children[self._bit(child.prefix, common)] = child
+            node.children[bit] = split
+            if common == length:
+                split.value = value
+            else:
+                split.children[self._bit(prefix, common)] = _Node(prefix, length, value)
+            self._size += 1
+            return
+        if node.value is None:
+            self._size += 1
+        node.value = value
+
+    def longest_match(self, key: int) -> Optional[V]:
+        """The value of the longest prefix of `key` in the trie, None if there is none."""
+        bits = self.bits
+        node = self._root
+        match = node.value
+        while node.length < bits:
+            node = node.children[(key >> (bits - node.length - 1)) & 1]
+            if node is None or (key ^ node.prefix) >> (bits - node.length):
+                break
+            if node.value is not None:
+                match = node.value
+        return match
+
+    def items(self) -> Iterator[tuple[int, int, V]]:
+        """(prefix, length, value) of every prefix, in key order."""
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.value is not None:
+                yield node.prefix, node.length, node.value
+            stack.extend(child for child in reversed(node.children) if child is not None)
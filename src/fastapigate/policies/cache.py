@@ -0,0 +1,244 @@
+import asyncio
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from fastapigate.cache import CachedResponse, CacheStats, ResponseCacheStore
+from fastapigate.core.gateway import call_on_exit, gateway_context
+from fastapigate.core.types import BasePolicy
+
+# Directives allowing a shared cache to reuse responses to requests with Authorization (RFC 9111, 3.5).
+_AUTHORIZED_REUSE_DIRECTIVES = ("public", "s-maxage", "must-revalidate")
+# Headers a 304 repeats from the cached response (RFC 9110, 15.4.5).
+_NOT_MODIFIED_HEADERS = frozenset((b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary"))
+
+class CachePolicyConfig(BaseModel):
+    max_bytes: int = 64 * 1024 * 1024
+    max_entry_bytes: int = 1024 * 1024
+    # Freshness of responses carrying neither max-age/s-maxage nor Expires (0: don't cache them).
+    default_ttl_seconds: float = 0.0
+    max_ttl_seconds: float = 3600.0
+    methods: list[str] = ["GET", "HEAD"]
+    cacheable_status: list[int] = [200, 203, 204, 300, 301, 404, 410]
+    # How long concurrent misses wait for the one request fetching the response.
+    coalesce_timeout_seconds: float = 5.0
+
+def _parse_cache_control(value: Optional[str]) -> dict[str, Optional[str]]:
+    directives: dict[str, Optional[str]] = {}
+    if value:
+        for directive in value.split(","):
+            name, _, argument = directive.strip().partition("=")
+            directives[name.lower()] = argument.strip('"') if argument else None
+    return directives
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class CachePolicy(BasePolicy[CachePolicyConfig]):
+    """
+    A shared HTTP response cache. List it with the same config in both the
+    inbound and the outbound phase, e.g. with a YAML anchor:
+
+        inbound:
+          - cache: &cache {max_bytes: 104857600}
+        outbound:
+          - cache: *cache
+
+    Inbound serves fresh entries (answering `If-None-Match`/`If-Modified-Since`
+    with 304) and makes concurrent misses for one key wait for a single backend
+    call. Outbound stores responses that `Cache-Control`/`Expires` allow, only
+    buffering bodies up to `max_entry_bytes`. See `stats` for the counters.
+
+    Requests with `Authorization` are only served entries, and their responses
+    only stored, when the response is marked `public`, `s-maxage` or
+    `must-revalidate` (RFC 9111, 3.5).
+    """
+    _store: ResponseCacheStore = field(init=False)
+    _inflight: dict[tuple, asyncio.Future] = field(default_factory=dict, init=False)
+    _context_key: str = field(init=False)
+
+    def __post_init__(self):
+        self._store = ResponseCacheStore(max_bytes=self.config.max_bytes)
+        self._context_key = f"cache:{id(self)}"
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._store.stats
+
+    @staticmethod
+    def _primary_key(request: Request) -> tuple:
+        path = request.scope.get("raw_path") or request.url.path
+        return request.method, request.headers.get("host", ""), path, request.url.query
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        if request.method not in self.config.methods:
+            return None
+        request_cache_control = _parse_cache_control(request.headers.get("cache-control"))
+        if "no-store" in request_cache_control or "no-cache" in request_cache_control:
+            return None
+
+        primary = self._primary_key(request)
+        header = request.headers.get
+        entry = self._store.get(primary, header)
+        if entry is None:
+            inflight = self._inflight.get(primary)
+            if inflight is not None:
+                self._store.stats.coalesced += 1
+                try:
+                    await asyncio.wait_for(asyncio.shield(inflight), self.config.coalesce_timeout_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                entry = self._store.get(primary, header)
+        if entry is not None and "authorization" in request.headers and not entry.serves_authorized:
+            entry = None
+        if entry is not None:
+            self._store.stats.hits += 1
+            return self._respond(request, entry)
+
+        self._store.stats.misses += 1
+        if primary not in self._inflight:
+            # This request fetches the response for everyone else missing on the key.
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[primary] = future
+            call_on_exit(partial(self._release, primary, future))
+            gateway_context.get()[self._context_key] = primary
+        return None
+
+    def _release(self, primary: tuple, future: asyncio.Future) -> None:
+        if self._inflight.get(primary) is future:
+            del self._inflight[primary]
+        if not future.done():
+            future.set_result(None)
+
+    def _respond(self, request: Request, entry: CachedResponse) -> Response:
+        if self._is_not_modified(request, entry):
+            self._store.stats.not_modified += 1
+            response = Response(status_code=304)
+            response.raw_headers = [(name, value) for name, value in entry.raw_headers if name in _NOT_MODIFIED_HEADERS]
+            return response
+        response = Response(content=entry.body, status_code=entry.status_code)
+        age = max(0, int(self._store.clock() - entry.stored_at))
+        response.raw_headers = entry.raw_headers + [(b"age", str(age).encode())]
+        return response
+
+    @staticmethod
+    def _is_not_modified(request: Request, entry: CachedResponse) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if entry.etag is None:
+                return False
+            if if_none_match.strip() == "*":
+                return True
+            # Weak comparison, as required for If-None-Match.
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return entry.etag.removeprefix("W/") in candidates
+        if_modified_since = _parse_http_date(request.headers.get("if-modified-since"))
+        return if_modified_since is not None and entry.last_modified is not None and entry.last_modified <= if_modified_since
+
+    def _freshness(self, request: Request, response: Response) -> Optional[tuple[float, tuple[str, ...], bool]]:
+        """
+        The TTL, Vary header names and whether requests with Authorization may
+        be served it, of a storable response; None if it must not be stored.
+        """
+        if response.status_code not in self.config.cacheable_status or "set-cookie" in response.headers:
+            return None
+        cache_control = _parse_cache_control(response.headers.get("cache-control"))
+        if "no-store" in cache_control or "private" in cache_control or "no-cache" in cache_control:
+            return None
+        serves_authorized = any(directive in cache_control for directive in _AUTHORIZED_REUSE_DIRECTIVES)
+        if "authorization" in request.headers and not serves_authorized:
+            return None
+        vary = tuple(sorted(
+            name.strip().lower() for name in response.headers.get("vary", "").split(",") if name.strip()
+        ))
+        if "*" in vary:
+            return None
+        ttl: Optional[float] = None
+        for directive in ("s-maxage", "max-age"):
+            if cache_control.get(directive):
+                try:
+                    ttl = float(cache_control[directive])
+                    break
+                except ValueError:
+                    return None
+        if ttl is None:
+            expires = _parse_http_date(response.headers.get("expires"))
+            if expires is not None:
+                date = _parse_http_date(response.headers.get("date")) or self._store.clock()
+                ttl = expires - date
+            else:
+                ttl = self.config.default_ttl_seconds
+        ttl = min(ttl, self.config.max_ttl_seconds)
+        return (ttl, vary, serves_authorized) if ttl > 0 else None
+
+    async def outbound(self, request: Request, response: Response) -> Optional[Response]:
+        primary = gateway_context.get().pop(self._context_key, None)
+        if primary is None:
+            return None
+        freshness = self._freshness(request, response)
+        if freshness is None:
+            return None
+        content_length = response.headers.get("content-length")
+        if content_length is not None and int(content_length) > self.config.max_entry_bytes:
+            return None
+
+        body_iterator = getattr(response, "body_iterator", None)
+        if body_iterator is None:
+            body = response.body
+        else:
+            chunks: list[bytes] = []
+            size = 0
+            async for chunk in body_iterator:
+                chunk = chunk if isinstance(chunk, bytes) else bytes(chunk)
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.config.max_entry_bytes:
+                    # Too large to cache: send what was read, then stream the rest.
+                    return self._resume(response, chunks, body_iterator)
+            body = b"".join(chunks)
+
+        ttl, vary, serves_authorized = freshness
+        now = self._store.clock()
+        if request.method == "HEAD":
+            # No body, but the length of the one a GET would get, if the upstream said.
+            raw_headers = list(response.raw_headers)
+        else:
+            raw_headers = [(name, value) for name, value in response.raw_headers if name != b"content-length"]
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+        entry = CachedResponse(
+            status_code=response.status_code,
+            raw_headers=raw_headers,
+            body=body,
+            stored_at=now,
+            expires_at=now + ttl,
+            etag=response.headers.get("etag"),
+            last_modified=_parse_http_date(response.headers.get("last-modified")),
+            serves_authorized=serves_authorized,
+        )
+        self._store.put(primary, vary, request.headers.get, entry)
+        cached_response = Response(content=body, status_code=response.status_code, background=response.background)
+        cached_response.raw_headers = raw_headers
+        return cached_response
+
+    @staticmethod
+    def _resume(response: Response, chunks: list[bytes], body_iterator: Any) -> Response:
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+            async for chunk in body_iterator:
+                yield chunk
+
+        resumed = StreamingResponse(stream(), status_code=response.status_code, background=response.background)
+        resumed.raw_headers = response.raw_headers
+        return resumed
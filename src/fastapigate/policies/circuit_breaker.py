@@ -0,0 +1,227 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Literal, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from pydantic import BaseModel
+
+from fastapigate.core.gateway import gateway_context
+from fastapigate.core.types import BasePolicy
+
+class CircuitBreakerPolicyConfig(BaseModel):
+    # One circuit per upstream key: `name`, or the request's Host header.
+    key_by: Literal["name", "host"] = "name"
+    name: str = "default"
+    max_keys: int = 1_000
+    # Rolling statistics over `window_seconds`, kept in `bucket_count` ring buckets.
+    window_seconds: float = 10.0
+    bucket_count: int = 10
+    minimum_calls: int = 20
+    # Percentages of failed / slow calls in the window opening the circuit.
+    failure_rate_threshold: float = 50.0
+    slow_call_rate_threshold: float = 100.0
+    slow_call_duration_ms: float = 1_000.0
+    # Backend responses with these status codes count as failures.
+    failure_status: list[int] = [500, 502, 503, 504]
+    # Time spent open before probing with `half_open_max_calls` calls.
+    open_seconds: float = 30.0
+    half_open_max_calls: int = 5
+    # Fail-fast response while open (a Retry-After header is added).
+    open_status_code: int = 503
+    open_content: str = "Service unavailable"
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+@dataclass
+class CircuitBreaker:
+    """
+    The circuit of one upstream. Outcomes are counted in a ring of fixed
+    buckets (one per `window / bucket_count` seconds) with running totals, so
+    recording a call allocates nothing and reading the rates is O(1).
+    """
+    config: CircuitBreakerPolicyConfig
+    state: CircuitState = CircuitState.CLOSED
+    opened_at: float = 0.0
+    _bucket_width: float = field(init=False)
+    _epochs: list[int] = field(init=False)
+    _calls: list[int] = field(init=False)
+    _failures: list[int] = field(init=False)
+    _slow: list[int] = field(init=False)
+    _totals: list[int] = field(default_factory=lambda: [0, 0, 0], init=False)
+    _epoch: int = field(default=-1, init=False)
+    _half_open_permits: int = field(default=0, init=False)
+
+    def __post_init__(self):
+        buckets = self.config.bucket_count
+        self._bucket_width = self.config.window_seconds / buckets
+        self._epochs = [-1] * buckets
+        self._calls = [0] * buckets
+        self._failures = [0] * buckets
+        self._slow = [0] * buckets
+
+    def _advance(self, now: float) -> int:
+        """Drop the buckets that slid out of the window, return the current bucket."""
+        epoch = int(now / self._bucket_width)
+        if epoch != self._epoch:
+            buckets = self.config.bucket_count
+            for slot in range(buckets):
+                if self._epochs[slot] != -1 and self._epochs[slot] <= epoch - buckets:
+                    self._clear(slot)
+            self._epoch = epoch
+        slot = epoch % self.config.bucket_count
+        if self._epochs[slot] != epoch:
+            self._clear(slot)
+            self._epochs[slot] = epoch
+        return slot
+
+    def _clear(self, slot: int) -> None:
+        totals = self._totals
+        totals[0] -= self._calls[slot]
+        totals[1] -= self._failures[slot]
+        totals[2] -= self._slow[slot]
+        self._calls[slot] = self._failures[slot] = self._slow[slot] = 0
+        self._epochs[slot] = -1
+
+    def _reset(self) -> None:
+        for slot in range(self.config.bucket_count):
+            self._clear(slot)
+
+    def retry_after(self, now: float) -> float:
+        return max(0.0, self.opened_at + self.config.open_seconds - now)
+
+    def try_acquire(self, now: float) -> bool:
+        """Whether a call may go through; a half-open circuit lets a few probes pass."""
+        if self.state is CircuitState.OPEN:
+            if now - self.opened_at < self.config.open_seconds:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._half_open_permits = self.config.half_open_max_calls
+            self._reset()
+        if self.state is CircuitState.HALF_OPEN:
+            if self._half_open_permits <= 0:
+                return False
+            self._half_open_permits -= 1
+        return True
+
+    def release(self) -> None:
+        """Give back a probe permit of a call that was abandoned without an outcome."""
+        if self.state is CircuitState.HALF_OPEN:
+            self._half_open_permits += 1
+
+    def record(self, now: float, failed: bool, duration: float) -> None:
+        slot = self._advance(now)
+        slow = duration * 1000 >= self.config.slow_call_duration_ms
+        self._calls[slot] += 1
+        self._failures[slot] += failed
+        self._slow[slot] += slow
+        totals = self._totals
+        totals[0] += 1
+        totals[1] += failed
+        totals[2] += slow
+
+        calls, failures, slow_calls = totals
+        if self.state is CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._open(now)
+            elif calls >= self.config.half_open_max_calls:
+                self.state = CircuitState.CLOSED
+                self._reset()
+        elif self.state is CircuitState.CLOSED and calls >= self.config.minimum_calls:
+            if (failures * 100 >= self.config.failure_rate_threshold * calls
+                    or slow_calls * 100 >= self.config.slow_call_rate_threshold * calls):
+                self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = CircuitState.OPEN
+        self.opened_at = now
+        self._reset()
+
+    def stats(self) -> dict[str, object]:
+        self._advance(time.monotonic())
+        calls, failures, slow_calls = self._totals
+        return {"state": self.state.value, "calls": calls, "failures": failures, "slow_calls": slow_calls}
+
+@dataclass
+class CircuitBreakerPolicy(BasePolicy[CircuitBreakerPolicyConfig]):
+    """
+    Stops sending traffic to an upstream that keeps failing or answering slowly,
+    failing fast instead of letting every request wait for its timeout.
+
+    As a backend policy it calls the backend itself, measuring every outcome,
+    and fails fast while the circuit is open. As an on-error policy (configure
+    it identically in both phases to share the circuits) it counts errors it
+    didn't see in the backend phase, and answers with the fail-fast response
+    instead of the error while the circuit is open. Used in the on-error phase
+    alone it only sees failures, so it opens after `minimum_calls` of them.
+    """
+    _breakers: OrderedDict[str, CircuitBreaker] = field(default_factory=OrderedDict, init=False)
+    _context_key: str = field(init=False)
+
+    def __post_init__(self):
+        self._context_key = f"circuit_breaker:{id(self)}"
+
+    def _breaker(self, request: Request) -> CircuitBreaker:
+        if self.config.key_by == "host":
+            key = request.headers.get("host", "")
+        else:
+            key = self.config.name
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(self.config)
+            while len(self._breakers) > self.config.max_keys:
+                self._breakers.popitem(last=False)
+        else:
+            self._breakers.move_to_end(key)
+        return breaker
+
+    def stats(self) -> dict[str, dict[str, object]]:
+        return {key: breaker.stats() for key, breaker in self._breakers.items()}
+
+    def _open_response(self, breaker: CircuitBreaker, now: float) -> Response:
+        return Response(
+            status_code=self.config.open_status_code,
+            content=self.config.open_content,
+            headers={"Retry-After": str(max(1, math.ceil(breaker.retry_after(now))))},
+        )
+
+    async def backend(self, request: Request) -> Optional[Response]:
+        context = gateway_context.get()
+        call_backend_fn = context.get("call_backend_fn")
+        if not call_backend_fn:
+            return None
+        breaker = self._breaker(request)
+        start = time.monotonic()
+        if not breaker.try_acquire(start):
+            return self._open_response(breaker, start)
+        context[self._context_key] = True
+        try:
+            response = await call_backend_fn()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            now = time.monotonic()
+            breaker.record(now, True, now - start)
+            raise
+        now = time.monotonic()
+        breaker.record(now, response.status_code in self.config.failure_status, now - start)
+        return response
+
+    async def on_error(self, request: Request, exc: Exception, context: dict) -> Optional[Response]:
+        if context.get("phase") not in ("backend", "outbound"):
+            return None
+        breaker = self._breaker(request)
+        now = time.monotonic()
+        if not context.pop(self._context_key, False) and context.get("phase") == "backend":
+            breaker.record(now, True, 0.0)
+        if breaker.state is CircuitState.OPEN:
+            return self._open_response(breaker, now)
+        return None
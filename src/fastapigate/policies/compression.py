@@ -0,0 +1,199 @@
+import asyncio
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from pydantic import BaseModel
+
+from fastapigate.core.types import BasePolicy
+
+# zlib window bits of each content coding: "deflate" is the zlib format (RFC 9110 8.4.1.2).
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+class CompressionPolicyConfig(BaseModel):
+    # Content codings offered, preferred in this order when the client accepts several equally.
+    encodings: list[str] = ["gzip", "deflate"]
+    # zlib level, from 1 (fastest) to 9 (smallest).
+    level: int = 6
+    # Bodies smaller than this are sent as they are.
+    min_size: int = 1024
+    # Content types not to compress as they already are; entries ending in "/" are prefixes.
+    excluded_content_types: list[str] = [
+        "image/png", "image/jpeg", "image/gif", "image/webp", "image/avif",
+        "video/", "audio/", "font/woff", "font/woff2",
+        "application/zip", "application/gzip", "application/x-gzip", "application/zstd",
+        "application/x-bzip2", "application/x-xz", "application/x-7z-compressed",
+        "application/x-rar-compressed", "application/octet-stream", "application/pdf",
+    ]
+    # Chunks of at least this size are compressed in a worker thread, off the event loop.
+    thread_offload_bytes: int = 64 * 1024
+    max_threads: int = 4
+
+@lru_cache(maxsize=1024)
+def _negotiate(accept_encoding: str, encodings: tuple[str, ...]) -> Optional[str]:
+    """The offered coding the client accepts with the highest q-value, None if it accepts none."""
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *parameters = item.split(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities["gzip" if coding == "x-gzip" else coding] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+async def _replay(chunks: list[bytes]) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+def _with_vary(raw_headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    """`raw_headers` with `Vary: Accept-Encoding` (a new list if added)."""
+    for name, value in raw_headers:
+        if name == b"vary" and any(token.strip().lower() in (b"accept-encoding", b"*") for token in value.split(b",")):
+            return raw_headers
+    return [*raw_headers, (b"vary", b"Accept-Encoding")]
+
+def _encoded(raw_headers: list[tuple[bytes, bytes]], encoding: str, content_length: Optional[int]) -> list[tuple[bytes, bytes]]:
+    """`raw_headers` for the body sent with `encoding`."""
+    encoded = []
+    for name, value in raw_headers:
+        if name in (b"content-length", b"accept-ranges"):
+            continue
+        if name == b"etag" and not value.startswith(b"W/"):
+            # The encoded body is a different representation: its ETag is weak at best.
+            value = b"W/" + value
+        encoded.append((name, value))
+    encoded.append((b"content-encoding", encoding.encode()))
+    if content_length is not None:
+        encoded.append((b"content-length", str(content_length).encode()))
+    return encoded
+
+def _set_raw_headers(response: Response, raw_headers: list[tuple[bytes, bytes]]) -> Response:
+    # A new list rather than changed in place: the old one may be shared (e.g.
+    # with a cache entry). `Response.headers` caches a view of the old one.
+    if raw_headers is not response.raw_headers:
+        response.raw_headers = raw_headers
+        vars(response).pop("_headers", None)
+    return response
+
+@dataclass
+class CompressionPolicy(BasePolicy[CompressionPolicyConfig]):
+    """
+    An outbound policy compressing responses with gzip or deflate, as negotiated
+    with the client's `Accept-Encoding`. Streamed bodies are compressed chunk by
+    chunk, each chunk flushed, so a stream isn't held back; chunks of at least
+    `thread_offload_bytes` are compressed in a thread pool of `max_threads`.
+
+    Left alone: bodies under `min_size` (peeked at when their length is
+    unknown), responses without a content type or of an excluded one, already
+    encoded, partial or bodiless ones, and `Cache-Control: no-transform`.
+
+    Outbound policies run in config order: list compression before a cache, and
+    the cache stores compressed responses, one per Accept-Encoding (as they
+    vary on it), so hits are served compressed too.
+    """
+    _executor: ThreadPoolExecutor = field(init=False)
+    _encodings: tuple[str, ...] = field(init=False)
+    _excluded_types: frozenset[str] = field(init=False)
+    _excluded_prefixes: tuple[str, ...] = field(init=False)
+
+    def __post_init__(self):
+        unknown = [encoding for encoding in self.config.encodings if encoding not in _WBITS]
+        if unknown or not self.config.encodings:
+            raise ValueError(f"Compression encodings must be among {list(_WBITS)}, got {self.config.encodings}")
+        if not 1 <= self.config.level <= 9:
+            raise ValueError("The compression level must be between 1 and 9")
+        self._encodings = tuple(self.config.encodings)
+        self._excluded_types = frozenset(self.config.excluded_content_types)
+        self._excluded_prefixes = tuple(prefix for prefix in self.config.excluded_content_types if prefix.endswith("/"))
+        self._executor = ThreadPoolExecutor(max_workers=self.config.max_threads, thread_name_prefix="fastapigate-compression")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _compressible(self, request: Request, response: Response) -> bool:
+        if request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        headers = response.headers
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", "").lower():
+            return False
+        content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        if not content_type or content_type in self._excluded_types or content_type.startswith(self._excluded_prefixes):
+            return False
+        return True
+
+    def _compressor(self, encoding: str) -> Any:
+        return zlib.compressobj(self.config.level, zlib.DEFLATED, _WBITS[encoding])
+
+    @staticmethod
+    def _deflate(compressor: Any, data: bytes, mode: int) -> bytes:
+        return compressor.compress(data) + compressor.flush(mode)
+
+    async def _compress(self, compressor: Any, data: bytes, mode: int = zlib.Z_SYNC_FLUSH) -> bytes:
+        if len(data) >= self.config.thread_offload_bytes:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(self._deflate, compressor, data, mode))
+        return self._deflate(compressor, data, mode)
+
+    async def _compressed(self, encoding: str, chunks: Iterable[bytes], body_iterator: AsyncIterator[Any]) -> AsyncIterator[bytes]:
+        compressor = self._compressor(encoding)
+        head = b"".join(chunks)
+        if head:
+            yield await self._compress(compressor, head)
+        async for chunk in body_iterator:
+            if chunk:
+                yield await self._compress(compressor, chunk if isinstance(chunk, bytes) else bytes(chunk))
+        yield compressor.flush()
+
+    async def outbound(self, request: Request, response: Response) -> Optional[Response]:
+        if not self._compressible(request, response):
+            return None
+        # Whether the response is compressed or not, it depends on Accept-Encoding.
+        raw_headers = _with_vary(response.raw_headers)
+        encoding = _negotiate(request.headers.get("accept-encoding", ""), self._encodings)
+        content_length = response.headers.get("content-length")
+        if encoding is None or (content_length is not None and content_length.isdigit() and int(content_length) < self.config.min_size):
+            return _set_raw_headers(response, raw_headers)
+
+        body_iterator = getattr(response, "body_iterator", None)
+        if body_iterator is None:
+            body: Optional[bytes] = getattr(response, "body", None)
+            # No body in memory or streamed (e.g. a `FileResponse`), or too small a one.
+            if body is None or len(body) < self.config.min_size:
+                return _set_raw_headers(response, raw_headers)
+            compressed = await self._compress(self._compressor(encoding), body, zlib.Z_FINISH)
+            compressed_response = Response(content=compressed, status_code=response.status_code, background=response.background)
+            compressed_response.raw_headers = _encoded(raw_headers, encoding, len(compressed))
+            return compressed_response
+
+        chunks: list[bytes] = []
+        if content_length is None:
+            # Length unknown: read up to `min_size` to find out if it is worth it.
+            size = 0
+            async for chunk in body_iterator:
+                chunk = chunk if isinstance(chunk, bytes) else bytes(chunk)
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.config.min_size:
+                    break
+            else:
+                response.body_iterator = _replay(chunks)
+                return _set_raw_headers(response, raw_headers)
+        # The same response object, so it is still sent (and closed) the way it was made to be.
+        response.body_iterator = self._compressed(encoding, chunks, body_iterator)
+        return _set_raw_headers(response, _encoded(raw_headers, encoding, None))
@@ -0,0 +1,248 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Literal, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from pydantic import BaseModel
+
+from fastapigate.core.gateway import call_on_exit
+from fastapigate.core.histogram import LatencyHistogram
+from fastapigate.core.types import BasePolicy
+
+class PriorityClass(BaseModel):
+    # Lower values are admitted first. A request gets the first class it matches.
+    priority: int
+    # Match on a header (any value if `values` is empty), a path prefix and/or methods.
+    header: Optional[str] = None
+    values: list[str] = []
+    path_prefix: Optional[str] = None
+    methods: list[str] = []
+
+class ConcurrencyLimitPolicyConfig(BaseModel):
+    # "gradient": track the ratio of the long-term to the recent latency;
+    # "aimd": grow by one while latencies stay under `aimd_latency_threshold_ms`, else back off.
+    algorithm: Literal["gradient", "aimd"] = "gradient"
+    initial_limit: int = 20
+    min_limit: int = 1
+    max_limit: int = 1_000
+    # Latencies are sampled over windows of `sample_window_ms` with at least `min_samples` requests.
+    sample_window_ms: float = 100.0
+    min_samples: int = 10
+    # Recent latency of a window: this percentile of its samples.
+    sample_percentile: float = 50.0
+    # Gradient: smoothing of the limit, the long-term latency EWMA, and the
+    # headroom added to the limit (its square root when None).
+    smoothing: float = 0.2
+    long_window_samples: int = 600
+    queue_headroom: Optional[int] = None
+    # AIMD
+    aimd_latency_threshold_ms: float = 1_000.0
+    aimd_backoff_ratio: float = 0.9
+    # Requests over the limit wait, by priority, up to `queue_timeout_ms` in a queue of `max_queue_size`.
+    max_queue_size: int = 100
+    queue_timeout_ms: float = 1_000.0
+    priorities: list[PriorityClass] = []
+    default_priority: int = 10
+    # Response to shed requests (a Retry-After header is added).
+    shed_status_code: int = 503
+    shed_content: str = "Service overloaded"
+    retry_after_seconds: int = 1
+
+@dataclass
+class ConcurrencyLimitStats:
+    limit: int
+    in_flight: int
+    queued: int
+    admitted: int = 0
+    queued_total: int = 0
+    shed: int = 0
+
+@dataclass
+class ConcurrencyLimitPolicy(BasePolicy[ConcurrencyLimitPolicyConfig]):
+    """
+    Bounds the requests in flight with a limit adapted from observed latency,
+    shedding load before latency degrades for everyone.
+
+    Requests over the limit wait in a bounded priority queue; they get a
+    `shed_status_code` response with Retry-After once they waited
+    `queue_timeout_ms`, or when the queue is full and nothing of lower priority
+    can be evicted. A slot is held until the request leaves the gateway (its
+    response sent, an exception or a cancellation), which is also the latency
+    the limit adapts to.
+    """
+    _limit: float = field(init=False)
+    _in_flight: int = field(default=0, init=False)
+    _queue: list[tuple[int, int, asyncio.Future]] = field(default_factory=list, init=False)
+    _queued: int = field(default=0, init=False)
+    _sequence: itertools.count = field(default_factory=itertools.count, init=False)
+    _samples: LatencyHistogram = field(default_factory=LatencyHistogram, init=False)
+    _window_start: float = field(default_factory=time.monotonic, init=False)
+    _long_latency: float = field(default=0.0, init=False)
+    _window_max_in_flight: int = field(default=0, init=False)
+    _stats: ConcurrencyLimitStats = field(init=False)
+
+    def __post_init__(self):
+        self._limit = float(self.config.initial_limit)
+        self._stats = ConcurrencyLimitStats(limit=self.config.initial_limit, in_flight=0, queued=0)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def stats(self) -> ConcurrencyLimitStats:
+        self._stats.limit = self.limit
+        self._stats.in_flight = self._in_flight
+        self._stats.queued = self._queued
+        return self._stats
+
+    def _priority(self, request: Request) -> int:
+        for priority_class in self.config.priorities:
+            if priority_class.header is not None:
+                value = request.headers.get(priority_class.header)
+                if value is None or (priority_class.values and value not in priority_class.values):
+                    continue
+            if priority_class.path_prefix is not None and not request.url.path.startswith(priority_class.path_prefix):
+                continue
+            if priority_class.methods and request.method not in priority_class.methods:
+                continue
+            return priority_class.priority
+        return self.config.default_priority
+
+    def _shed_response(self) -> Response:
+        self._stats.shed += 1
+        return Response(
+            status_code=self.config.shed_status_code,
+            content=self.config.shed_content,
+            headers={"Retry-After": str(self.config.retry_after_seconds)},
+        )
+
+    def _admit(self) -> None:
+        self._in_flight += 1
+        self._stats.admitted += 1
+        if self._in_flight > self._window_max_in_flight:
+            self._window_max_in_flight = self._in_flight
+        # Latency is measured from admission: time spent queued isn't the backend's.
+        call_on_exit(partial(self._release, time.monotonic()))
+
+    def _release(self, start: float) -> None:
+        self._in_flight -= 1
+        now = time.monotonic()
+        self._sample(now, now - start)
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to the highest-priority waiters still waiting."""
+        queue = self._queue
+        while queue and self._in_flight < self._limit:
+            _, _, waiter = heapq.heappop(queue)
+            if waiter.done():
+                continue
+            self._queued -= 1
+            # The slot is taken on the waiter's behalf, so a request releasing
+            # meanwhile can't hand it to someone else.
+            self._in_flight += 1
+            waiter.set_result(True)
+
+    def _evict(self, priority: int) -> bool:
+        """Shed the newest waiter of the lowest priority below `priority`, if any."""
+        victim = None
+        for entry in self._queue:
+            if entry[2].done():
+                continue
+            if entry[0] > priority and (victim is None or (entry[0], entry[1]) > (victim[0], victim[1])):
+                victim = entry
+        if victim is None:
+            return False
+        victim[2].set_result(False)
+        self._queued -= 1
+        return True
+
+    def _sample(self, now: float, latency: float) -> None:
+        samples = self._samples
+        samples.record(int(latency * 1e6))
+        if now - self._window_start < self.config.sample_window_ms / 1000 or samples.count < self.config.min_samples:
+            return
+        recent = samples.percentile(self.config.sample_percentile) / 1e6
+        max_in_flight = self._window_max_in_flight
+        samples.reset()
+        self._window_start = now
+        self._window_max_in_flight = self._in_flight
+        if self.config.algorithm == "gradient":
+            limit = self._gradient(recent, max_in_flight)
+        else:
+            limit = self._aimd(recent, max_in_flight)
+        self._limit = min(float(self.config.max_limit), max(float(self.config.min_limit), limit))
+
+    def _gradient(self, recent: float, max_in_flight: int) -> float:
+        # The long-term latency is the "no queueing" baseline; it only moves slowly.
+        if not self._long_latency:
+            self._long_latency = recent
+        else:
+            factor = 2 / (self.config.long_window_samples + 1)
+            self._long_latency += (recent - self._long_latency) * factor
+        # Don't grow a limit the traffic doesn't use.
+        if max_in_flight < self._limit / 2:
+            return self._limit
+        gradient = max(0.5, min(1.0, self._long_latency / recent)) if recent > 0 else 1.0
+        headroom = self.config.queue_headroom
+        if headroom is None:
+            headroom = math.sqrt(self._limit)
+        target = self._limit * gradient + headroom
+        return self._limit * (1 - self.config.smoothing) + target * self.config.smoothing
+
+    def _aimd(self, recent: float, max_in_flight: int) -> float:
+        if recent * 1000 > self.config.aimd_latency_threshold_ms:
+            return self._limit * self.config.aimd_backoff_ratio
+        if max_in_flight * 2 >= self._limit:
+            return self._limit + 1
+        return self._limit
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        if self._in_flight < self._limit and not self._queued:
+            self._admit()
+            return None
+
+        priority = self._priority(request)
+        if self._queued >= self.config.max_queue_size and not self._evict(priority):
+            return self._shed_response()
+        if len(self._queue) > 2 * self.config.max_queue_size:
+            # Drop the entries of waiters that timed out or were evicted.
+            self._queue = [entry for entry in self._queue if not entry[2].done()]
+            heapq.heapify(self._queue)
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+        self._queued += 1
+        self._stats.queued_total += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.config.queue_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if not waiter.done():
+            waiter.cancel()
+            self._queued -= 1
+        elif waiter.result():
+            # `_wake` already counted the slot as in flight.
+            self._in_flight -= 1
+            self._admit()
+            return None
+        return self._shed_response()
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            if waiter.result():
+                # Granted a slot just as we gave up: pass it on.
+                self._in_flight -= 1
+                self._wake()
+            return
+        waiter.cancel()
+        self._queued -= 1
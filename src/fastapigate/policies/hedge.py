@@ -0,0 +1,92 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import ClassVar, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from pydantic import BaseModel
+
+from fastapigate.core.gateway import gateway_context
+from fastapigate.core.histogram import RollingHistogram
+from fastapigate.core.types import BasePolicy
+from fastapigate.policies.retry import RetryBudget
+
+class HedgePolicyConfig(BaseModel):
+    # Send the hedge once the first call is slower than this latency percentile.
+    percentile: float = 95.0
+    # Latencies are learned over this rolling window.
+    window_seconds: float = 60.0
+    # Until that many samples are in the window, hedge after `initial_delay_ms`.
+    min_samples: int = 100
+    initial_delay_ms: float = 100.0
+    min_delay_ms: float = 1.0
+    # Share of the traffic that may be hedged, with bursts up to `max_hedge_burst`.
+    max_hedge_ratio: float = 0.05
+    max_hedge_burst: float = 10.0
+    # Only idempotent requests are hedged.
+    methods: list[str] = ["GET", "HEAD", "OPTIONS"]
+
+@dataclass
+class HedgePolicy(BasePolicy[HedgePolicyConfig]):
+    """
+    A backend policy cutting tail latency with speculative calls: when the
+    backend hasn't answered within the learned `percentile` latency, a second
+    identical call is sent, the first response wins and the other is cancelled.
+    """
+    buffers_request_body: ClassVar[bool] = True
+
+    _latencies: RollingHistogram = field(init=False)
+    _budget: RetryBudget = field(init=False)
+    _delay: float = field(init=False)
+    _delay_computed_at: float = field(default=float("-inf"), init=False)
+
+    def __post_init__(self):
+        self._latencies = RollingHistogram(window=self.config.window_seconds)
+        self._budget = RetryBudget(
+            ratio=self.config.max_hedge_ratio, min_per_second=0.0, capacity=self.config.max_hedge_burst
+        )
+        self._delay = self.config.initial_delay_ms / 1000
+
+    def _hedge_delay(self, now: float) -> float:
+        # Walking the histogram is cheap, but there's no need to do it per request.
+        if now - self._delay_computed_at >= 1.0:
+            self._delay_computed_at = now
+            latencies = self._latencies.snapshot()
+            if latencies.count >= self.config.min_samples:
+                delay_us = latencies.percentile(self.config.percentile)
+                self._delay = max(delay_us / 1e6, self.config.min_delay_ms / 1000)
+        return self._delay
+
+    async def _timed_call(self, call_backend_fn) -> Response:
+        start = time.perf_counter()
+        try:
+            return await call_backend_fn()
+        finally:
+            # Cancelled losers count at their elapsed time, a lower bound of their
+            # latency: leaving out the slow calls would drag the percentile down.
+            self._latencies.record(int((time.perf_counter() - start) * 1e6))
+
+    async def backend(self, request: Request) -> Optional[Response]:
+        call_backend_fn = gateway_context.get().get("call_backend_fn")
+        if not call_backend_fn or request.method not in self.config.methods:
+            return None
+        self._budget.deposit()
+
+        calls = {asyncio.ensure_future(self._timed_call(call_backend_fn))}
+        try:
+            done, _ = await asyncio.wait(calls, timeout=self._hedge_delay(time.monotonic()))
+            if not done and self._budget.withdraw():
+                calls.add(asyncio.ensure_future(self._timed_call(call_backend_fn)))
+            while True:
+                done, pending = await asyncio.wait(calls, return_when=asyncio.FIRST_COMPLETED)
+                for call in done:
+                    if call.exception() is None:
+                        return call.result()
+                if not pending:
+                    return done.pop().result()
+                # The first call to finish failed, let the other one have its chance.
+                calls = pending
+        finally:
+            for call in calls:
+                call.cancel()
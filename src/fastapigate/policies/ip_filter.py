@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+from pydantic import BaseModel
+
+from fastapigate.core.types import BasePolicy
+from fastapigate.ipfilter import Address, IPTable, parse_address, read_networks
+
+logger = logging.getLogger(__name__)
+
+IPFilterAction = Literal["allow", "deny"]
+
+class IPFilterPolicyConfig(BaseModel):
+    # Networks (CIDRs or single addresses, IPv4 or IPv6) to allow and to deny.
+    # The most specific network containing the client decides, deny on a tie.
+    allow: list[str] = []
+    deny: list[str] = []
+    # Files listing more networks, one per line ('#' starts a comment), e.g. threat feeds.
+    allow_files: list[str] = []
+    deny_files: list[str] = []
+    # What happens to clients in none of the networks, or whose address is unknown.
+    default_action: IPFilterAction = "allow"
+    # Proxies whose `forwarded_header` is trusted: for requests coming through
+    # them, the client is the rightmost address of the header that isn't one.
+    trusted_proxies: list[str] = []
+    forwarded_header: str = "X-Forwarded-For"
+    # How often the files are checked for changes and reloaded (None: never).
+    reload_interval_seconds: Optional[float] = 30.0
+    deny_status_code: int = 403
+    deny_content: str = "Forbidden"
+
+@dataclass
+class IPFilterPolicy(BasePolicy[IPFilterPolicyConfig]):
+    """
+    Allows or denies requests by client IP address against (possibly large)
+    allow and deny lists of networks.
+
+    The lists are loaded into an `IPTable`, whose lookups take time in the
+    address length rather than the number of networks. The files are checked
+    for changes every `reload_interval_seconds` and a new table is built in a
+    worker thread and swapped in, requests using the old one meanwhile; a file
+    that fails to load is logged and the running table kept. `update()` swaps
+    in new lists programmatically.
+    """
+    _table: IPTable[bool] = field(init=False)
+    _trusted_proxies: Optional[IPTable[bool]] = field(default=None, init=False)
+    _default: bool = field(default=True, init=False)
+    _allow: list[str] = field(default_factory=list, init=False)
+    _deny: list[str] = field(default_factory=list, init=False)
+    # File path -> its (mtime_ns, size) and networks when last loaded.
+    _files: dict[str, tuple[tuple[int, int], list[str]]] = field(default_factory=dict, init=False)
+    _checked_at: float = field(default=0.0, init=False)
+    _refresh_task: Optional[asyncio.Task] = field(default=None, init=False)
+
+    def __post_init__(self):
+        self._default = self.config.default_action == "allow"
+        if self.config.trusted_proxies:
+            self._trusted_proxies = IPTable((network, True) for network in self.config.trusted_proxies)
+        self._allow, self._deny = list(self.config.allow), list(self.config.deny)
+        self._files = self._read_files()
+        self._table = self._build(self._allow, self._deny, self._files)
+        self._checked_at = time.monotonic()
+
+    def _read_files(self) -> dict[str, tuple[tuple[int, int], list[str]]]:
+        """The files' stamps and networks, only reading those that changed since last loaded."""
+        files = {}
+        for path in [*self.config.allow_files, *self.config.deny_files]:
+            stat = os.stat(path)
+            stamp = stat.st_mtime_ns, stat.st_size
+            loaded = self._files.get(path)
+            # Stat first: a file changing while it is read is then read again at the next check.
+            files[path] = loaded if loaded is not None and loaded[0] == stamp else (stamp, read_networks(path))
+        return files
+
+    def _build(
+        self, allow: list[str], deny: list[str], files: dict[str, tuple[tuple[int, int], list[str]]]
+    ) -> IPTable[bool]:
+        """A table of the lists and files' networks; raises ValueError if one is invalid."""
+        table: IPTable[bool] = IPTable()
+        for network in allow:
+            table.add(network, True)
+        for path in self.config.allow_files:
+            for network in files[path][1]:
+                table.add(network, True)
+        # Added last, so they replace allowed networks that are the same.
+        for network in deny:
+            table.add(network, False)
+        for path in self.config.deny_files:
+            for network in files[path][1]:
+                table.add(network, False)
+        return table
+
+    def _reload_files(self) -> None:
+        try:
+            files = self._read_files()
+            if files == self._files:
+                return
+            self._table = self._build(self._allow, self._deny, files)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"Reloading the IP filter lists failed, keeping the running ones: {exc!r}")
+            return
+        self._files = files
+        logger.info(f"Reloaded the IP filter lists ({len(self._table)} networks)")
+
+    def refresh(self) -> asyncio.Task:
+        """Reload the files that changed, unless a reload is already running, and return it."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._checked_at = time.monotonic()
+            self._refresh_task = asyncio.create_task(asyncio.to_thread(self._reload_files))
+        return self._refresh_task
+
+    def update(self, allow: Optional[list[str]] = None, deny: Optional[list[str]] = None) -> None:
+        """
+        Replace the inline allow and/or deny lists (the files' networks stay)
+        with a new table built on the calling thread; raises ValueError, keeping
+        the running lists, if a network is invalid.
+        """
+        allow = self._allow if allow is None else list(allow)
+        deny = self._deny if deny is None else list(deny)
+        self._table = self._build(allow, deny, self._files)
+        self._allow, self._deny = allow, deny
+
+    def client_address(self, request: Request) -> Optional[Address]:
+        """The client's address, as seen through the trusted proxies; None if unknown."""
+        address = parse_address(request.client.host) if request.client else None
+        trusted = self._trusted_proxies
+        if trusted is None or address is None or not trusted.lookup(address):
+            return address
+        hops = [
+            hop.strip()
+            for value in request.headers.getlist(self.config.forwarded_header)
+            for hop in value.split(",")
+        ]
+        # Each proxy appends the address it got the request from: walk back from
+        # the last one, up to the first hop not added by a trusted proxy.
+        for hop in reversed(hops):
+            address = parse_address(hop)
+            if address is None or not trusted.lookup(address):
+                return address
+        return address
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        interval = self.config.reload_interval_seconds
+        if interval is not None and self._files and time.monotonic() - self._checked_at > interval:
+            self.refresh()
+
+        address = self.client_address(request)
+        allowed = None if address is None else self._table.lookup(address)
+        if allowed is None:
+            allowed = self._default
+        if allowed:
+            return None
+        return Response(status_code=self.config.deny_status_code, content=self.config.deny_content)
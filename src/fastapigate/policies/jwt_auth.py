@@ -1,11 +1,13 @@
+import asyncio
 import jwt
-from jwt import PyJWKClient
-from dataclasses import dataclass
-from typing import Optional, Any
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Optional
 
-from fastapi import Request, Response
+from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 
+from fastapigate.auth import AsyncJWKSClient, VerifiedTokenCache
 from fastapigate.core.types import BasePolicy
 
 class JWTAuthPolicyConfig(BaseModel):
@@ -13,6 +15,17 @@ class JWTAuthPolicyConfig(BaseModel):
     audience: str
     issuer: str
     algorithms: list[str] = ["RS256"]
+    leeway_seconds: float = 0.0
+    # Keys older than this are refreshed in the background while still being served.
+    jwks_refresh_seconds: float = 300.0
+    # Minimum time between fetches triggered by an unknown `kid`.
+    jwks_min_refetch_seconds: float = 30.0
+    jwks_timeout_seconds: float = 5.0
+    # Verified tokens to remember (0 disables the cache) and for how long at most.
+    token_cache_size: int = 10_000
+    token_cache_ttl_seconds: float = 300.0
+    # Run signature verification in a worker thread instead of on the event loop.
+    verify_in_thread: bool = False
 
 @dataclass
 class JWTAuthPolicy(BasePolicy[JWTAuthPolicyConfig]):
@@ -20,13 +33,38 @@ class JWTAuthPolicy(BasePolicy[JWTAuthPolicyConfig]):
     A JWT authentication policy that verifies the Bearer token from the Authorization header.
     On successful validation, the decoded token is attached to `request.state.jwt_payload`.
     If verification fails, a 401 Unauthorized response is returned.
+
+    Signing keys come from an `AsyncJWKSClient`, so a JWKS fetch never blocks
+    the event loop, and tokens that were already verified are served from a
+    `VerifiedTokenCache` until they expire.
     """
-    _jwk_client: Optional[PyJWKClient] = None
+    mutates_request_state: ClassVar[bool] = True
+
+    _jwk_client: AsyncJWKSClient = field(init=False)
+    _token_cache: VerifiedTokenCache = field(init=False)
 
-    def _get_jwk_client(self) -> PyJWKClient:
-        if self._jwk_client is None:
-            self._jwk_client = PyJWKClient(self.config.jwk_url)
-        return self._jwk_client
+    def __post_init__(self):
+        self._jwk_client = AsyncJWKSClient(
+            self.config.jwk_url,
+            refresh_interval=self.config.jwks_refresh_seconds,
+            min_refetch_interval=self.config.jwks_min_refetch_seconds,
+            timeout=self.config.jwks_timeout_seconds,
+        )
+        self._token_cache = VerifiedTokenCache(
+            max_entries=self.config.token_cache_size,
+            ttl=self.config.token_cache_ttl_seconds,
+            leeway=self.config.leeway_seconds,
+        )
+
+    def _decode(self, token: str, signing_key: Any) -> dict[str, Any]:
+        return jwt.decode(
+            token,
+            signing_key,
+            algorithms=self.config.algorithms,
+            audience=self.config.audience,
+            issuer=self.config.issuer,
+            leeway=self.config.leeway_seconds,
+        )
 
     async def inbound(self, request: Request) -> Optional[Response]:
         auth_header = request.headers.get("Authorization")
@@ -36,16 +74,19 @@ class JWTAuthPolicy(BasePolicy[JWTAuthPolicyConfig]):
                 content="Missing or invalid Authorization header"
             )
         token = auth_header[len("Bearer "):].strip()
+        digest = self._token_cache.digest(token)
+        decoded = self._token_cache.get(digest)
+        if decoded is not None:
+            request.state.jwt_payload = decoded
+            return None
         try:
-            jwk_client = self._get_jwk_client()
-            signing_key = jwk_client.get_signing_key_from_jwt(token).key
-            decoded = jwt.decode(
-                token,
-                signing_key,
-                algorithms=self.config.algorithms,
-                audience=self.config.audience,
-                issuer=self.config.issuer,
-            )
+            kid = jwt.get_unverified_header(token).get("kid")
+            signing_key = (await self._jwk_client.get_signing_key(kid)).key
+            if self.config.verify_in_thread:
+                decoded = await asyncio.to_thread(self._decode, token, signing_key)
+            else:
+                decoded = self._decode(token, signing_key)
+            self._token_cache.put(digest, decoded)
             # Attach the decoded payload to the request for later use.
             request.state.jwt_payload = decoded
         except Exception as e:
@@ -54,5 +95,3 @@ class JWTAuthPolicy(BasePolicy[JWTAuthPolicyConfig]):
                 content=f"Invalid token: {str(e)}"
             )
         return None
-
-
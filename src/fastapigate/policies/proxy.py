@@ -0,0 +1,237 @@
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from fastapigate.core.gateway import add_access_log_fields, call_on_exit, gateway_context
+from fastapigate.core.types import BasePolicy
+from fastapigate.proxy import (
+    LoadBalancer,
+    RawHeaders,
+    Upstream,
+    UpstreamCall,
+    UpstreamClient,
+    UpstreamError,
+    UpstreamResponse,
+    UpstreamStats,
+)
+
+# Headers describing the connection rather than the message, never forwarded (RFC 9110 7.6.1).
+HOP_BY_HOP_HEADERS = frozenset({
+    b"connection",
+    b"keep-alive",
+    b"proxy-authenticate",
+    b"proxy-authorization",
+    b"proxy-connection",
+    b"te",
+    b"trailer",
+    b"transfer-encoding",
+    b"upgrade",
+})
+
+def _forwardable(headers: RawHeaders) -> RawHeaders:
+    """`headers` without the hop-by-hop ones, including those named in `Connection`."""
+    dropped = HOP_BY_HOP_HEADERS.union(
+        token.strip().lower() for name, value in headers if name == b"connection" for token in value.split(b",")
+    )
+    return [(name, value) for name, value in headers if name not in dropped]
+
+class UpstreamConfig(BaseModel):
+    url: str
+    # Relative share of the traffic the upstream can take.
+    weight: float = 1.0
+
+class LoadBalancingConfig(BaseModel):
+    # Time constant of the peak-EWMA of upstream latencies.
+    ewma_decay_seconds: float = 10.0
+    # Latency assumed for upstreams without samples yet.
+    initial_latency_ms: float = 100.0
+    # Upstream responses with these status codes count as failures, as do errors.
+    failure_status: list[int] = [502, 503, 504]
+    # Failures in a row ejecting an upstream, for `base_ejection_seconds` times
+    # its ejections in a row (at most `max_ejection_seconds`).
+    consecutive_failures: int = 5
+    base_ejection_seconds: float = 30.0
+    max_ejection_seconds: float = 300.0
+    # Upstreams are no longer ejected once this share of them is.
+    max_ejection_percent: float = 50.0
+    # Back from an ejection, an upstream's weight ramps up over this time.
+    slow_start_seconds: float = 30.0
+    slow_start_min_weight: float = 0.1
+
+class ProxyPolicyConfig(BaseModel):
+    # Upstream base URL: requests go to its origin, their path (minus
+    # `strip_prefix`) appended to its path, their query string kept.
+    url: Optional[str] = None
+    # Or several upstreams (same shape of URL) to balance the load between.
+    upstreams: list[UpstreamConfig] = []
+    load_balancing: LoadBalancingConfig = LoadBalancingConfig()
+    strip_prefix: str = ""
+    # Send the client's Host header rather than the upstream's.
+    preserve_host: bool = False
+    # Add X-Forwarded-For, X-Forwarded-Proto and X-Forwarded-Host.
+    forwarded_headers: bool = True
+    # Connections per upstream origin, and how many of them to keep idle.
+    max_connections: int = 100
+    max_idle_connections: int = 20
+    idle_timeout_seconds: float = 60.0
+    # How long a request may wait for a connection when all are busy.
+    pool_timeout_seconds: float = 5.0
+    connect_timeout_seconds: float = 2.0
+    # Longest the upstream may take to accept (more of) the request body or
+    # to send (more of) its response.
+    read_timeout_seconds: float = 30.0
+    dns_ttl_seconds: float = 60.0
+    verify_tls: bool = True
+    # Status of the responses to upstream failures, as an onError policy.
+    error_status_code: int = 502
+    timeout_status_code: int = 504
+
+@dataclass
+class ProxyPolicy(BasePolicy[ProxyPolicyConfig]):
+    """
+    A backend policy forwarding requests to a remote upstream instead of the
+    wrapped app, over a pool of keep-alive HTTP/1.1 connections (see
+    `fastapigate.proxy.UpstreamClient`). Request and response bodies are
+    streamed through, not buffered, unless a policy needs the body replayable.
+
+    The proxy stands in for the app as the route's backend: backend and
+    on-error policies re-invoking the backend (hedge, retry) call the upstream.
+    Upstream failures raise `UpstreamError`s; listed in onError too (with the
+    same config, so it is the same instance), the policy answers them with
+    `error_status_code`, or `timeout_status_code` for timeouts.
+
+    With several `upstreams`, each request goes to the one a `LoadBalancer`
+    picks (see `load_balancing`); a request invoking the backend again (retry,
+    hedge) goes to an upstream it didn't try yet if there is one. See `stats()`.
+    """
+    _client: UpstreamClient = field(init=False)
+    _balancer: LoadBalancer = field(init=False)
+    _context_key: str = field(init=False)
+
+    def __post_init__(self):
+        if bool(self.config.url) == bool(self.config.upstreams):
+            raise ValueError("A proxy needs either a url or upstreams")
+        upstreams = self.config.upstreams or [UpstreamConfig(url=self.config.url)]
+        balancing = self.config.load_balancing
+        self._balancer = LoadBalancer(
+            [Upstream(upstream.url, upstream.weight) for upstream in upstreams],
+            decay=balancing.ewma_decay_seconds,
+            initial_latency=balancing.initial_latency_ms / 1000,
+            consecutive_failures=balancing.consecutive_failures,
+            base_ejection_time=balancing.base_ejection_seconds,
+            max_ejection_time=balancing.max_ejection_seconds,
+            max_ejection_percent=balancing.max_ejection_percent,
+            slow_start_time=balancing.slow_start_seconds,
+            slow_start_min_weight=balancing.slow_start_min_weight,
+        )
+        self._context_key = f"proxy:{id(self)}"
+        self._client = UpstreamClient(
+            max_connections=self.config.max_connections,
+            max_idle_connections=self.config.max_idle_connections,
+            idle_timeout=self.config.idle_timeout_seconds,
+            connect_timeout=self.config.connect_timeout_seconds,
+            read_timeout=self.config.read_timeout_seconds,
+            pool_timeout=self.config.pool_timeout_seconds,
+            dns_ttl=self.config.dns_ttl_seconds,
+            verify_tls=self.config.verify_tls,
+        )
+
+    @property
+    def client(self) -> UpstreamClient:
+        return self._client
+
+    def stats(self) -> dict[str, UpstreamStats]:
+        """Load, latency and health of each upstream, by URL."""
+        return self._balancer.stats()
+
+    def close(self) -> None:
+        """Close the idle upstream connections (see `Gateway.reload`)."""
+        self._client.close()
+
+    def _target(self, request: Request, upstream: Upstream) -> str:
+        scope = request.scope
+        path: bytes = scope.get("raw_path") or scope["path"].encode()
+        prefix = self.config.strip_prefix.rstrip("/").encode()
+        if prefix and (path == prefix or path.startswith(prefix + b"/")):
+            path = path[len(prefix):]
+        target = (upstream.base_path + path) or b"/"
+        if not target.startswith(b"/"):
+            target = b"/" + target
+        if scope.get("query_string"):
+            target += b"?" + scope["query_string"]
+        return target.decode("latin-1")
+
+    def _headers(self, request: Request) -> RawHeaders:
+        dropped = (b"content-length", b"expect") if self.config.preserve_host else (b"content-length", b"expect", b"host")
+        headers = [(name, value) for name, value in _forwardable(request.scope["headers"]) if name not in dropped]
+        if self.config.forwarded_headers:
+            client = request.client.host if request.client else None
+            forwarded_for = request.headers.get("x-forwarded-for")
+            if client:
+                forwarded_for = f"{forwarded_for}, {client}" if forwarded_for else client
+            headers = [(name, value) for name, value in headers if name != b"x-forwarded-for"]
+            if forwarded_for:
+                headers.append((b"x-forwarded-for", forwarded_for.encode("latin-1")))
+            headers.append((b"x-forwarded-proto", request.url.scheme.encode()))
+            if "host" in request.headers and "x-forwarded-host" not in request.headers:
+                headers.append((b"x-forwarded-host", request.headers["host"].encode("latin-1")))
+        return headers
+
+    async def forward(self, request: Request) -> Response:
+        """Send `request` to the upstream; returns once the response headers arrived."""
+        headers = request.headers
+        has_body = "content-length" in headers or "transfer-encoding" in headers
+        body: Optional[bytes] = getattr(request, "_body", None)
+        content_length: Optional[int] = None
+        if body is not None:
+            # Buffered by a policy: sent from memory, so it can be again.
+            content_length = len(body)
+        elif headers.get("content-length", "").isdigit():
+            content_length = int(headers["content-length"])
+
+        # Upstreams this request tried already (a retried or hedged request).
+        tried: list[Upstream] = gateway_context.get().setdefault(self._context_key, [])
+        call = self._balancer.pick(exclude=tried)
+        tried.append(call.upstream)
+        add_access_log_fields(upstream=call.upstream.url)
+        # Counted as outstanding until the response is sent or dropped.
+        call_on_exit(call.done)
+        try:
+            upstream = await self._client.request(
+                call.upstream.origin,
+                request.method,
+                self._target(request, call.upstream),
+                self._headers(request),
+                body=request.stream() if has_body else None,
+                content_length=content_length,
+            )
+        except UpstreamError:
+            call.observe(failed=True)
+            raise
+        call.observe(failed=upstream.status_code in self.config.load_balancing.failure_status)
+        # Closes the connection if the response isn't streamed to the end.
+        call_on_exit(upstream.close)
+        response = StreamingResponse(self._stream(upstream, call), status_code=upstream.status_code)
+        response.raw_headers = _forwardable(upstream.headers)
+        return response
+
+    @staticmethod
+    async def _stream(upstream: UpstreamResponse, call: UpstreamCall) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in upstream.body():
+                yield chunk
+        finally:
+            call.done()
+
+    async def backend(self, request: Request) -> Optional[Response]:
+        return await self.forward(request)
+
+    async def on_error(self, request: Request, exc: Exception, context: dict[str, Any]) -> Optional[Response]:
+        if not isinstance(exc, UpstreamError):
+            return None
+        if isinstance(exc, TimeoutError):
+            return Response(status_code=self.config.timeout_status_code, content="Upstream request timed out")
+        return Response(status_code=self.config.error_status_code, content="Upstream request failed")
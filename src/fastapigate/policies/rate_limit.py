@@ -1,105 +1,148 @@
-import time
-import asyncio
+import math
 from dataclasses import dataclass, field
-from typing import Optional, Any
+from hashlib import blake2b
+from typing import Literal, Optional
 
-from fastapi import Request, Response
+from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 
 from fastapigate.core.types import BasePolicy
+from fastapigate.ratelimit import (
+    LeasingRateLimiter,
+    MemoryStore,
+    RateLimiter,
+    RespConnection,
+    SharedMemoryStore,
+    create_algorithm,
+)
+
+RateLimitKey = Literal["global", "ip", "user", "user_ip"]
+RateLimitAlgorithmName = Literal["gcra", "sliding_window_counter", "sliding_window_log"]
+RateLimitBackend = Literal["memory", "shared_memory", "remote"]
+
+class RateLimitRule(BaseModel):
+    key: RateLimitKey = "global"
+    limit: int
+    window_seconds: float = 60.0
+    # Back-to-back requests allowed by the gcra algorithm, defaults to `limit`.
+    burst: Optional[int] = None
 
 class RateLimitPolicyConfig(BaseModel):
     requests_per_minute: Optional[int] = None
     requests_per_minute_per_ip: Optional[int] = None
     requests_per_minute_per_user: Optional[int] = None
     requests_per_minute_per_user_per_ip: Optional[int] = None
+    limits: list[RateLimitRule] = []
+    algorithm: RateLimitAlgorithmName = "sliding_window_counter"
+    # Upper bound of tracked keys per rule, least recently used keys are evicted first.
+    max_keys: int = 100_000
+    # "shared_memory" enforces the limits across all worker processes of the host.
+    backend: RateLimitBackend = "memory"
+    # Prefix of the per-rule table files for the shared_memory backend. Table
+    # names also hold a hash of this config, so policies share tables (and
+    # counters) only if configured identically; give identically configured
+    # policies of different scopes their own path to keep them apart.
+    shared_memory_path: str = "/dev/shm/fastapigate-ratelimit"
+    # Redis-protocol store shared by all nodes for the remote backend.
+    remote_url: str = "redis://localhost:6379/0"
+    remote_key_prefix: str = "fastapigate:ratelimit"
+    remote_timeout_seconds: float = 0.05
+    # Tokens a node leases from the store at once and spends locally.
+    remote_lease_tokens: int = 10
+    # How long to stay on local-only limits after the store became unreachable.
+    remote_retry_seconds: float = 5.0
+
+    def rules(self) -> list[RateLimitRule]:
+        """The `requests_per_minute*` shorthands followed by the explicit `limits`."""
+        shorthands: list[tuple[RateLimitKey, Optional[int]]] = [
+            ("global", self.requests_per_minute),
+            ("ip", self.requests_per_minute_per_ip),
+            ("user", self.requests_per_minute_per_user),
+            ("user_ip", self.requests_per_minute_per_user_per_ip),
+        ]
+        rules = [
+            RateLimitRule(key=key, limit=limit, window_seconds=60.0)
+            for key, limit in shorthands
+            if limit is not None and limit > 0
+        ]
+        return rules + [rule for rule in self.limits if rule.limit > 0]
 
 @dataclass
 class RateLimitPolicy(BasePolicy[RateLimitPolicyConfig]):
     """
     A rate limiting policy enforcing limits at multiple levels:
-      - Global requests per minute
-      - Requests per minute per IP
-      - Requests per minute per user (if provided via "X-User" header)
-      - Requests per minute per user per IP
+      - Global requests
+      - Requests per IP
+      - Requests per user (if provided via "X-User" header)
+      - Requests per user per IP
 
-    This implementation uses a fixed 60-second window and
-    maintains a dedicated asyncio.Lock for each key to reduce contention.
+    Each limit has its own window and is enforced by the configured algorithm
+    (see `fastapigate.ratelimit`). Checks never await, so no locks are needed,
+    and each limit tracks at most `max_keys` keys.
     """
-    _counters: dict[str, tuple[float, int]] = field(default_factory=dict, init=False)
-    _locks: dict[str, asyncio.Lock] = field(default_factory=dict, init=False)
-    _locks_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+    _limiters: list[tuple[RateLimitRule, RateLimiter]] = field(default_factory=list, init=False)
+    _connection: Optional[RespConnection] = field(default=None, init=False)
+    _config_hash: str = field(init=False)
 
-    async def inbound(self, request: Request) -> Optional[Response]:
-        now = time.time()
+    def __post_init__(self):
+        if self.config.backend == "shared_memory" and self.config.algorithm == "sliding_window_log":
+            raise ValueError("The sliding_window_log algorithm is not supported by the shared_memory backend")
+        if self.config.backend == "remote":
+            self._connection = RespConnection(self.config.remote_url, timeout=self.config.remote_timeout_seconds)
+        self._config_hash = blake2b(self.config.model_dump_json().encode(), digest_size=8).hexdigest()
+        for index, rule in enumerate(self.config.rules()):
+            self._limiters.append((rule, self._create_limiter(index, rule)))
 
-        # Global rate limit
-        requests_per_minute = self.config.requests_per_minute
-        if requests_per_minute is not None and requests_per_minute > 0:
-            if await self._update_and_check("global", self.config.requests_per_minute, now):
-                return Response(
-                    status_code=429,
-                    content="Global rate limit exceeded"
-                )
+    def _create_limiter(self, index: int, rule: RateLimitRule) -> RateLimiter | LeasingRateLimiter:
+        algorithm = create_algorithm(self.config.algorithm, rule.limit, rule.window_seconds, rule.burst)
+        if self.config.backend == "shared_memory":
+            path = f"{self.config.shared_memory_path}-{self._config_hash}-{index}-{rule.key}"
+            return RateLimiter(algorithm, SharedMemoryStore(path, algorithm, slots=self.config.max_keys))
+        limiter = RateLimiter(algorithm, MemoryStore(max_keys=self.config.max_keys))
+        if self._connection is not None:
+            return LeasingRateLimiter(
+                self._connection,
+                rule.limit,
+                rule.window_seconds,
+                fallback=limiter,
+                key_prefix=f"{self.config.remote_key_prefix}:{index}",
+                lease_tokens=self.config.remote_lease_tokens,
+                retry_interval=self.config.remote_retry_seconds,
+                max_keys=self.config.max_keys,
+            )
+        return limiter
 
-        # Per-IP rate limit
-        ip = request.client.host if request.client else "unknown"
-        requests_per_minute_per_ip = self.config.requests_per_minute_per_ip
-        if requests_per_minute_per_ip is not None and requests_per_minute_per_ip > 0:
-            ip_key = f"ip:{ip}"
-            if await self._update_and_check(ip_key, requests_per_minute_per_ip, now):
-                return Response(
-                    status_code=429,
-                    content=f"Rate limit exceeded for IP {ip}"
-                )
+    def close(self) -> None:
+        """Release the shared memory segments and the remote connection (see `Gateway.reload`)."""
+        for _, limiter in self._limiters:
+            if isinstance(limiter, RateLimiter) and isinstance(limiter.store, SharedMemoryStore):
+                limiter.store.close()
+        if self._connection is not None:
+            self._connection.close()
 
-        # Per-user rate limit (if provided via "X-User" header)
+    async def inbound(self, request: Request) -> Optional[Response]:
+        ip = request.client.host if request.client else "unknown"
         user = request.headers.get("X-User")
-        requests_per_minute_per_user = self.config.requests_per_minute_per_user
-        if user and requests_per_minute_per_user is not None and requests_per_minute_per_user > 0:
-            user_key = f"user:{user}"
-            if await self._update_and_check(user_key, requests_per_minute_per_user, now):
-                return Response(
-                    status_code=429,
-                    content=f"Rate limit exceeded for user {user}"
-                )
 
-        # Per-user-per-IP rate limit
-        requests_per_minute_per_user_per_ip = self.config.requests_per_minute_per_user_per_ip
-        if user and requests_per_minute_per_user_per_ip is not None and requests_per_minute_per_user_per_ip > 0:
-            user_ip_key = f"user_ip:{user}:{ip}"
-            if await self._update_and_check(user_ip_key, requests_per_minute_per_user_per_ip, now):
+        for rule, limiter in self._limiters:
+            if rule.key == "global":
+                key, content = "global", "Global rate limit exceeded"
+            elif rule.key == "ip":
+                key, content = f"ip:{ip}", f"Rate limit exceeded for IP {ip}"
+            elif not user:
+                continue
+            elif rule.key == "user":
+                key, content = f"user:{user}", f"Rate limit exceeded for user {user}"
+            else:
+                key, content = f"user_ip:{user}:{ip}", f"Rate limit exceeded for user {user} from IP {ip}"
+
+            decision = await limiter.acquire(key)
+            if not decision.allowed:
                 return Response(
                     status_code=429,
-                    content=f"Rate limit exceeded for user {user} from IP {ip}"
+                    content=content,
+                    headers={"Retry-After": str(math.ceil(decision.retry_after))},
                 )
 
         return None
-
-    async def _update_and_check(self, key: str, limit: int, now: float) -> bool:
-        """
-        Update the counter for the given key and return True if the limit has been reached.
-        Uses a fixed window of 60 seconds.
-        """
-        lock = await self._get_lock(key)
-        async with lock:
-            timestamp, count = self._counters.get(key, (now, 0))
-            # Reset counter if the window has passed
-            if now - timestamp > 60:
-                timestamp, count = now, 0
-            if count >= limit:
-                return True
-            self._counters[key] = (timestamp, count + 1)
-            return False
-
-    async def _get_lock(self, key: str) -> asyncio.Lock:
-        """
-        Return the asyncio.Lock for a specific key, creating one if necessary.
-        """
-        if key not in self._locks:
-            async with self._locks_lock:
-                if key not in self._locks:
-                    self._locks[key] = asyncio.Lock()
-        return self._locks[key]
-
-
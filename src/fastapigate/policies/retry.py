@@ -1,53 +1,172 @@
 import asyncio
-from dataclasses import dataclass
-from typing import Optional
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, ClassVar, Optional
 
+from fastapigate.core.gateway import gateway_context
 from fastapigate.core.types import BasePolicy
-from fastapi import Request, Response
+from starlette.requests import Request
+from starlette.responses import Response
 from pydantic import BaseModel
 
 class RetryPolicyConfig(BaseModel):
     max_attempts: int = 3
+    # Base of the exponential backoff; the n-th retry sleeps a random time in
+    # [0, min(max_backoff_seconds, backoff_seconds * 2 ** (n - 1))] ("full jitter").
     backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 30.0
+    # Backend responses with these status codes are retried (backend phase only).
+    retry_on_status: list[int] = [502, 503, 504]
+    # Exceptions retried, matched by class name anywhere in their MRO.
+    retry_on_exceptions: list[str] = ["Exception"]
+    # Retry budget: every request seen earns `budget_ratio` retries, plus
+    # `budget_min_retries_per_second` over time, up to `budget_capacity`.
+    budget_ratio: float = 0.1
+    budget_min_retries_per_second: float = 1.0
+    budget_capacity: float = 10.0
+
+@dataclass
+class RetryBudget:
+    """
+    A token bucket capping retries to a share of the traffic, so retries
+    can't multiply the load on a backend that is already struggling.
+    """
+    ratio: float
+    min_per_second: float
+    capacity: float
+    _tokens: float = field(init=False)
+    _updated_at: float = field(default_factory=time.monotonic, init=False)
+
+    def __post_init__(self):
+        self._tokens = self.capacity
+
+    def deposit(self) -> None:
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.min_per_second)
+        self._updated_at = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
 
 @dataclass
 class RetryPolicy(BasePolicy[RetryPolicyConfig]):
+    """
+    Re-invokes the backend on retryable exceptions and status codes, with
+    exponential backoff, full jitter and a retry budget.
+
+    As a backend policy it wraps the backend call itself and can also retry on
+    status codes. As an on-error policy it retries failures of the backend and
+    outbound phases. Either way the request body is buffered so it can be replayed.
+
+    The budget grows with the requests the policy sees. As an on-error policy
+    alone it only sees failing ones: list it in the inbound phase too (with the
+    same config, so it is the same instance) for every request to count.
+    """
+    buffers_request_body: ClassVar[bool] = True
+
+    _budget: RetryBudget = field(init=False)
+    _retry_on_exceptions: frozenset[str] = field(init=False)
+    _context_key: str = field(init=False)
+
+    def __post_init__(self):
+        self._budget = RetryBudget(
+            ratio=self.config.budget_ratio,
+            min_per_second=self.config.budget_min_retries_per_second,
+            capacity=self.config.budget_capacity,
+        )
+        self._retry_on_exceptions = frozenset(self.config.retry_on_exceptions)
+        self._context_key = f"retry:{id(self)}"
+
+    def _deposit(self, context: dict[str, Any]) -> None:
+        """Earn the budget of the request, once whichever phases see it."""
+        if self._context_key not in context:
+            context[self._context_key] = True
+            self._budget.deposit()
+
+    def _is_retryable(self, exc: Exception) -> bool:
+        return any(cls.__name__ in self._retry_on_exceptions for cls in type(exc).__mro__)
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.config.max_backoff_seconds, self.config.backoff_seconds * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+    async def _retry(
+        self, call_backend_fn: Callable[[], Awaitable[Response]], context: dict[str, Any]
+    ) -> Optional[Response]:
+        """Retry until a non-retryable outcome, `max_attempts` or an exhausted budget."""
+        response: Optional[Response] = None
+        attempt_count = context.get("attempt_count", 1)
+        while attempt_count < self.config.max_attempts and self._budget.withdraw():
+            await asyncio.sleep(self._backoff(attempt_count))
+            attempt_count += 1
+            context["attempt_count"] = attempt_count
+            try:
+                response = await call_backend_fn()
+            except Exception as exc:
+                if not self._is_retryable(exc):
+                    raise
+                response = None
+                continue
+            if response.status_code not in self.config.retry_on_status:
+                return response
+        return response
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        self._deposit(gateway_context.get())
+        return None
+
+    async def backend(self, request: Request) -> Optional[Response]:
+        """
+        Call the backend ourselves, retrying retryable outcomes. The last
+        response (or exception) is what the gateway continues with.
+        """
+        context = gateway_context.get()
+        call_backend_fn = context.get("call_backend_fn")
+        if not call_backend_fn:
+            return None
+        self._deposit(context)
+        try:
+            response = await call_backend_fn()
+        except Exception as exc:
+            if not self._is_retryable(exc):
+                raise
+            response = await self._retry(call_backend_fn, context)
+            if response is None:
+                raise
+            return response
+        if response.status_code in self.config.retry_on_status:
+            return await self._retry(call_backend_fn, context) or response
+        return response
 
     async def on_error(self, request: Request, exc: Exception, context: dict) -> Optional[Response]:
         """
         If the exception occurred during the backend or outbound phase,
         we attempt to re-invoke the backend call up to `max_attempts` times.
-        
+
         The 'context' dict can store details like the function needed
         to call the backend, the previously failed attempt count, etc.
         """
-        phase = context.get("phase")  
+        phase = context.get("phase")
         # We'll only retry if the error happened in the 'backend' or 'outbound' phase.
         if phase not in ("backend", "outbound"):
             return None
+        self._deposit(context)
 
         # Grab the call_backend function or response from context
         call_backend_fn = context.get("call_backend_fn")
         if not call_backend_fn:
             return None  # can't retry if we don't know how to call the backend
 
-        attempt_count = context.get("attempt_count", 1)
-
-        if attempt_count >= self.config.max_attempts:
-            # Already tried enough times, give up
+        if not self._is_retryable(exc):
             return None
 
-        # Wait some backoff time
-        await asyncio.sleep(self.config.backoff_seconds)
-
-        # Increment attempt count
-        context["attempt_count"] = attempt_count + 1
-
-        # Re-invoke the backend call, returning its result or raising again
         try:
-            backend_response = await call_backend_fn()
-            return backend_response  # If successful, we have a new response
-        except Exception as e:
-            # If it fails again, we do nothing here. Possibly the next on-error policy can handle it,
-            # or the same RetryPolicy might get invoked again if it's configured in sequence.
+            return await self._retry(call_backend_fn, context)
+        except Exception:
+            # If it fails for good, we do nothing here. Possibly the next on-error policy can handle it.
             return None
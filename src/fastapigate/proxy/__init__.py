@@ -0,0 +1,34 @@
+from fastapigate.proxy.balancer import LoadBalancer, Upstream, UpstreamCall, UpstreamStats
+from fastapigate.proxy.client import (
+    ConnectionPool,
+    Origin,
+    PoolStats,
+    PoolTimeout,
+    RawHeaders,
+    UpstreamClient,
+    UpstreamConnectError,
+    UpstreamError,
+    UpstreamProtocolError,
+    UpstreamResponse,
+    UpstreamTimeout,
+)
+from fastapigate.proxy.dns import DNSCache
+
+__all__ = [
+    "ConnectionPool",
+    "DNSCache",
+    "LoadBalancer",
+    "Origin",
+    "PoolStats",
+    "PoolTimeout",
+    "RawHeaders",
+    "Upstream",
+    "UpstreamCall",
+    "UpstreamClient",
+    "UpstreamConnectError",
+    "UpstreamError",
+    "UpstreamProtocolError",
+    "UpstreamResponse",
+    "UpstreamStats",
+    "UpstreamTimeout",
+]
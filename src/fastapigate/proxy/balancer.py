@@ -0,0 +1,184 @@
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+from fastapigate.proxy.client import Origin
+
+
+@dataclass
+class UpstreamStats:
+    # Requests in flight (until their response body was sent).
+    outstanding: int = 0
+    # Peak-EWMA of the time to response headers, in milliseconds.
+    latency_ms: float = 0.0
+    # Current share of its weight (below 1 while ejected or slow-starting).
+    weight_factor: float = 1.0
+    ejected: bool = False
+    requests: int = 0
+    failures: int = 0
+    ejections: int = 0
+
+
+@dataclass
+class Upstream:
+    """One upstream of a `LoadBalancer` and its load, latency and health."""
+    url: str
+    weight: float = 1.0
+    origin: Origin = field(init=False)
+    base_path: bytes = field(init=False)
+    outstanding: int = field(default=0, init=False)
+    _latency: float = field(default=0.0, init=False)
+    _observed_at: float = field(default=0.0, init=False)
+    _sampled: bool = field(default=False, init=False)
+    _consecutive_failures: int = field(default=0, init=False)
+    # Times ejected in a row without recovering in between, scales the ejection time.
+    _ejection_streak: int = field(default=0, init=False)
+    ejected_until: float = field(default=0.0, init=False)
+    # Start of the slow start after an ejection, None when not slow-starting.
+    _recovered_at: Optional[float] = field(default=None, init=False)
+    stats: UpstreamStats = field(default_factory=UpstreamStats, init=False)
+
+    def __post_init__(self):
+        self.origin = Origin.from_url(self.url)
+        self.base_path = urlsplit(self.url).path.rstrip("/").encode()
+
+
+@dataclass
+class UpstreamCall:
+    """One request to an upstream picked by `LoadBalancer.pick`, counted as outstanding until `done()`."""
+    balancer: "LoadBalancer"
+    upstream: Upstream
+    started_at: float
+    _observed: bool = False
+    _done: bool = False
+
+    def observe(self, failed: bool) -> None:
+        """Record the outcome once the response headers arrived (or the request failed)."""
+        if not self._observed:
+            self._observed = True
+            self.balancer.observe(self.upstream, self.balancer.clock() - self.started_at, failed)
+
+    def done(self) -> None:
+        if not self._done:
+            self._done = True
+            self.upstream.outstanding -= 1
+
+
+@dataclass
+class LoadBalancer:
+    """
+    Picks an upstream per request with the power of two choices: of two
+    upstreams drawn at random, the one with the lowest cost, its peak-EWMA
+    latency times its outstanding requests plus one, divided by its weight.
+    Peak-EWMA jumps to a slower sample at once and decays towards faster ones
+    with time constant `decay`, so a slowing upstream sheds traffic quickly;
+    upstreams are assumed to take `initial_latency` until their first sample.
+
+    Passive health checking: `consecutive_failures` failures in a row eject an
+    upstream for `base_ejection_time` times the number of ejections in a row
+    (up to `max_ejection_time`), unless `max_ejection_percent` of the upstreams
+    are ejected already. When all are ejected, all are used. Back from an
+    ejection, an upstream's weight ramps up from `slow_start_min_weight` over
+    `slow_start_time`.
+    """
+    upstreams: list[Upstream]
+    decay: float = 10.0
+    initial_latency: float = 0.1
+    consecutive_failures: int = 5
+    base_ejection_time: float = 30.0
+    max_ejection_time: float = 300.0
+    max_ejection_percent: float = 50.0
+    slow_start_time: float = 30.0
+    slow_start_min_weight: float = 0.1
+    clock: Callable[[], float] = time.monotonic
+    rng: random.Random = field(default_factory=random.Random)
+
+    def __post_init__(self):
+        if not self.upstreams:
+            raise ValueError("A load balancer needs at least one upstream")
+        now = self.clock()
+        for upstream in self.upstreams:
+            upstream._latency, upstream._observed_at = self.initial_latency, now
+
+    def _weight_factor(self, upstream: Upstream, now: float) -> float:
+        if upstream.ejected_until:
+            if now < upstream.ejected_until:
+                return 0.0
+            upstream.ejected_until = 0.0
+            upstream._recovered_at = now
+        if upstream._recovered_at is None:
+            return 1.0
+        progress = (now - upstream._recovered_at) / self.slow_start_time if self.slow_start_time > 0 else 1.0
+        if progress >= 1.0:
+            upstream._recovered_at = None
+            return 1.0
+        return max(self.slow_start_min_weight, progress)
+
+    def _cost(self, upstream: Upstream, now: float, weight_factor: float) -> float:
+        # Decayed since the last sample too, so an upstream no longer picked
+        # because of one slow response gets traffic (and new samples) again.
+        latency = upstream._latency * math.exp(-(now - upstream._observed_at) / self.decay)
+        return max(latency, 1e-6) * (upstream.outstanding + 1) / (upstream.weight * weight_factor)
+
+    def pick(self, exclude: Iterable[Upstream] = ()) -> UpstreamCall:
+        """
+        Pick an upstream for a request, preferring those not in `exclude` (e.g.
+        already tried by the request). Call `done()` on the result when finished.
+        """
+        now = self.clock()
+        excluded = set(map(id, exclude))
+        available = [(upstream, factor) for upstream in self.upstreams if (factor := self._weight_factor(upstream, now))]
+        candidates = [(upstream, factor) for upstream, factor in available if id(upstream) not in excluded]
+        # Rather an upstream tried already, or one ejected, than none.
+        candidates = candidates or available or [(upstream, 1.0) for upstream in self.upstreams]
+        if len(candidates) == 1:
+            upstream = candidates[0][0]
+        else:
+            first, second = self.rng.sample(candidates, 2)
+            upstream = min(first, second, key=lambda candidate: self._cost(candidate[0], now, candidate[1]))[0]
+        upstream.outstanding += 1
+        upstream.stats.requests += 1
+        return UpstreamCall(self, upstream, now)
+
+    def observe(self, upstream: Upstream, latency: float, failed: bool) -> None:
+        now = self.clock()
+        if latency > upstream._latency or not (upstream._sampled or failed):
+            # The first sample replaces `initial_latency`.
+            upstream._latency, upstream._observed_at, upstream._sampled = latency, now, True
+        elif not failed:
+            # Failures don't lower the latency: an upstream failing fast must not look fast.
+            weight = math.exp(-(now - upstream._observed_at) / self.decay)
+            upstream._latency = upstream._latency * weight + latency * (1 - weight)
+            upstream._observed_at = now
+        if not failed:
+            upstream._consecutive_failures = 0
+            if upstream._recovered_at is None and not upstream.ejected_until:
+                upstream._ejection_streak = 0
+            return
+        upstream.stats.failures += 1
+        upstream._consecutive_failures += 1
+        if upstream._consecutive_failures >= self.consecutive_failures and not upstream.ejected_until:
+            self._eject(upstream, now)
+
+    def _eject(self, upstream: Upstream, now: float) -> None:
+        ejected = sum(1 for other in self.upstreams if other.ejected_until > now)
+        if (ejected + 1) * 100 > self.max_ejection_percent * len(self.upstreams):
+            return
+        upstream._ejection_streak += 1
+        upstream.ejected_until = now + min(self.base_ejection_time * upstream._ejection_streak, self.max_ejection_time)
+        upstream._consecutive_failures = 0
+        upstream._recovered_at = None
+        upstream.stats.ejections += 1
+
+    def stats(self) -> dict[str, UpstreamStats]:
+        now = self.clock()
+        for upstream in self.upstreams:
+            stats = upstream.stats
+            stats.outstanding = upstream.outstanding
+            stats.latency_ms = upstream._latency * math.exp(-(now - upstream._observed_at) / self.decay) * 1e3
+            stats.weight_factor = self._weight_factor(upstream, now)
+            stats.ejected = stats.weight_factor == 0.0
+        return {upstream.url: upstream.stats for upstream in self.upstreams}
@@ -0,0 +1,498 @@
+import asyncio
+import ssl
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from fastapigate.proxy.dns import DNSCache
+
+RawHeaders = list[tuple[bytes, bytes]]
+
+# Largest body piece read from an upstream at once.
+_CHUNK_SIZE = 64 * 1024
+# Upper bound of a response's status line and headers.
+_MAX_HEAD_SIZE = 64 * 1024
+
+
+class UpstreamError(Exception):
+    """A request to an upstream failed before or while its response was received."""
+
+
+class UpstreamConnectError(UpstreamError, ConnectionError):
+    """No connection to the upstream could be opened (DNS, refused, TLS, connect timeout)."""
+
+
+class UpstreamTimeout(UpstreamError, TimeoutError):
+    """The upstream didn't accept the request body or send (more of) its response in time."""
+
+
+class UpstreamProtocolError(UpstreamError):
+    """The upstream closed the connection early or sent a malformed response."""
+
+
+class PoolTimeout(UpstreamError, TimeoutError):
+    """No connection of the pool got free in time."""
+
+
+class Origin(NamedTuple):
+    scheme: str
+    host: str
+    port: int
+
+    @classmethod
+    def from_url(cls, url: str) -> "Origin":
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Upstream URL {url!r} is not an absolute http(s) URL")
+        return cls(parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+
+    @property
+    def host_header(self) -> bytes:
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        default_port = 443 if self.scheme == "https" else 80
+        return (host if self.port == default_port else f"{host}:{self.port}").encode()
+
+
+@dataclass
+class _Connection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    reused: bool = False
+    idle_since: float = 0.0
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+@dataclass
+class PoolStats:
+    connects: int = 0
+    reuses: int = 0
+    waits: int = 0
+    discards: int = 0
+
+
+@dataclass
+class ConnectionPool:
+    """
+    Keep-alive connections to one upstream origin, at most `max_connections`
+    of them open, of which at most `max_idle` idle.
+
+    Idle connections are reused most recently released first and closed once
+    idle for `idle_timeout` seconds. When all connections are busy, requests
+    queue (first come, first served) for up to `pool_timeout` seconds, and a
+    released connection is handed straight to the first of them.
+    """
+    origin: Origin
+    dns: DNSCache
+    ssl_context: Optional[ssl.SSLContext] = None
+    max_connections: int = 100
+    max_idle: int = 20
+    idle_timeout: float = 60.0
+    connect_timeout: float = 2.0
+    pool_timeout: float = 5.0
+    stats: PoolStats = field(default_factory=PoolStats)
+    _idle: list[_Connection] = field(default_factory=list, init=False)
+    # Connections open or being opened, and slots handed to waiters.
+    _open: int = field(default=0, init=False)
+    # Waiters get a connection, or None: a free slot to open one in.
+    _waiters: deque[asyncio.Future] = field(default_factory=deque, init=False)
+
+    @property
+    def open_connections(self) -> int:
+        return self._open
+
+    @property
+    def idle_connections(self) -> int:
+        return len(self._idle)
+
+    async def acquire(self) -> _Connection:
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            # An upstream closing an idle connection shows as EOF on our end.
+            if now - connection.idle_since < self.idle_timeout and not connection.reader.at_eof():
+                connection.reused = True
+                self.stats.reuses += 1
+                return connection
+            connection.close()
+            self._open -= 1
+        if self._open < self.max_connections:
+            self._open += 1
+        else:
+            connection = await self._wait()
+            if connection is not None:
+                connection.reused = True
+                self.stats.reuses += 1
+                return connection
+        try:
+            return await self._connect()
+        except BaseException:
+            self._free_slot()
+            raise
+
+    async def _wait(self) -> Optional[_Connection]:
+        self.stats.waits += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            async with asyncio.timeout(self.pool_timeout):
+                return await waiter
+        except BaseException as exc:
+            if not waiter.done():
+                waiter.cancel()
+            if waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            else:
+                # Handed a connection (or slot) just as we're leaving: pass it on.
+                self._hand_over(waiter.result())
+            if isinstance(exc, TimeoutError):
+                raise PoolTimeout(f"No connection to {self.origin.host}:{self.origin.port} got free in time") from None
+            raise
+
+    async def _connect(self) -> _Connection:
+        origin = self.origin
+        try:
+            async with asyncio.timeout(self.connect_timeout):
+                addresses = await self.dns.resolve(origin.host, origin.port)
+                for index, address in enumerate(addresses):
+                    try:
+                        reader, writer = await asyncio.open_connection(
+                            address,
+                            origin.port,
+                            ssl=self.ssl_context,
+                            server_hostname=origin.host if self.ssl_context is not None else None,
+                            limit=_MAX_HEAD_SIZE,
+                        )
+                        break
+                    except OSError:
+                        if index == len(addresses) - 1:
+                            raise
+        except TimeoutError:
+            self.dns.invalidate(origin.host, origin.port)
+            raise UpstreamConnectError(f"Connecting to {origin.host}:{origin.port} timed out") from None
+        except OSError as exc:
+            self.dns.invalidate(origin.host, origin.port)
+            raise UpstreamConnectError(f"Connecting to {origin.host}:{origin.port} failed: {exc!r}") from exc
+        self.stats.connects += 1
+        return _Connection(reader, writer)
+
+    def _free_slot(self) -> None:
+        self._hand_over(None)
+
+    def _hand_over(self, connection: Optional[_Connection]) -> None:
+        """Give a connection, or its slot if None, to the first waiter; keep or free it if there is none."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(connection)
+                return
+        if connection is None:
+            self._open -= 1
+        elif len(self._idle) < self.max_idle:
+            connection.idle_since = time.monotonic()
+            self._idle.append(connection)
+        else:
+            connection.close()
+            self._open -= 1
+
+    def release(self, connection: _Connection, reusable: bool) -> None:
+        """Return a connection once its response was fully read (`reusable`), or drop it."""
+        if reusable:
+            self._hand_over(connection)
+        else:
+            self.stats.discards += 1
+            connection.close()
+            self._free_slot()
+
+    def close(self) -> None:
+        for connection in self._idle:
+            connection.close()
+        self._open -= len(self._idle)
+        self._idle.clear()
+
+
+@dataclass
+class UpstreamResponse:
+    """
+    An upstream's response whose body is still to be read from the connection,
+    with `body()`. The connection goes back to the pool once the body was read
+    to the end, and is closed if reading stops early or `close()` is called first.
+    """
+    status_code: int
+    # Response headers, lower-cased, in the order received.
+    headers: RawHeaders
+    _pool: ConnectionPool
+    _connection: Optional[_Connection]
+    _read_timeout: float
+    # "length", "chunked", "close" (until EOF) or "none".
+    _framing: str
+    _length: int = 0
+    _keep_alive: bool = True
+
+    async def _read(self, size: int) -> bytes:
+        async with asyncio.timeout(self._read_timeout):
+            return await self._reader.read(size)
+
+    async def _readuntil(self, separator: bytes) -> bytes:
+        async with asyncio.timeout(self._read_timeout):
+            return await self._reader.readuntil(separator)
+
+    async def _read_exactly(self, size: int) -> AsyncIterator[bytes]:
+        while size:
+            data = await self._read(min(size, _CHUNK_SIZE))
+            if not data:
+                raise UpstreamProtocolError("The upstream closed the connection mid-body")
+            size -= len(data)
+            yield data
+
+    async def body(self) -> AsyncIterator[bytes]:
+        if self._connection is None:
+            raise RuntimeError("The response body was already read or closed")
+        complete = False
+        try:
+            if self._framing == "length":
+                async for data in self._read_exactly(self._length):
+                    yield data
+            elif self._framing == "chunked":
+                while size := _chunk_size(await self._readuntil(b"\r\n")):
+                    async for data in self._read_exactly(size):
+                        yield data
+                    if await self._readuntil(b"\r\n") != b"\r\n":
+                        raise UpstreamProtocolError("Malformed chunked response body")
+                # Trailers, ignored.
+                while await self._readuntil(b"\r\n") != b"\r\n":
+                    pass
+            elif self._framing == "close":
+                while data := await self._read(_CHUNK_SIZE):
+                    yield data
+            complete = True
+        except TimeoutError:
+            raise UpstreamTimeout("The upstream stopped sending the response body") from None
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError) as exc:
+            raise UpstreamProtocolError(f"Reading the response body failed: {exc!r}") from exc
+        finally:
+            self._release(complete and self._keep_alive and self._framing != "close")
+
+    @property
+    def _reader(self) -> asyncio.StreamReader:
+        assert self._connection is not None
+        return self._connection.reader
+
+    def _release(self, reusable: bool) -> None:
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection, reusable)
+
+    def close(self) -> None:
+        """Drop the connection unless the body was read to the end (see `Gateway` exit callbacks)."""
+        self._release(False)
+
+
+def _chunk_size(line: bytes) -> int:
+    try:
+        return int(line.split(b";", 1)[0].strip(), 16)
+    except ValueError:
+        raise UpstreamProtocolError(f"Malformed chunk size line: {line!r}") from None
+
+
+def _parse_head(head: bytes) -> tuple[bytes, int, RawHeaders]:
+    lines = head[:-4].split(b"\r\n")
+    try:
+        version, status, *_ = lines[0].split(b" ", 2)
+        status_code = int(status)
+    except ValueError:
+        raise UpstreamProtocolError(f"Malformed status line: {lines[0]!r}") from None
+    headers = []
+    for line in lines[1:]:
+        name, colon, value = line.partition(b":")
+        if not colon:
+            raise UpstreamProtocolError(f"Malformed header line: {line!r}")
+        headers.append((name.strip().lower(), value.strip()))
+    return version, status_code, headers
+
+
+@dataclass
+class UpstreamClient:
+    """
+    A streaming HTTP/1.1 client for proxying to upstreams, with a keep-alive
+    `ConnectionPool` per origin and cached DNS lookups.
+
+    Request bodies are sent as they are read (chunked when their length isn't
+    known) and response bodies read as they are consumed, neither is buffered.
+    A body-less request failing on a reused connection before any response
+    byte arrived (the upstream closed it meanwhile) is retried once on a new one.
+    """
+    max_connections: int = 100
+    max_idle_connections: int = 20
+    idle_timeout: float = 60.0
+    connect_timeout: float = 2.0
+    read_timeout: float = 30.0
+    pool_timeout: float = 5.0
+    dns_ttl: float = 60.0
+    verify_tls: bool = True
+    _dns: DNSCache = field(init=False)
+    _pools: dict[Origin, ConnectionPool] = field(default_factory=dict, init=False)
+    _ssl_context: Optional[ssl.SSLContext] = field(default=None, init=False)
+
+    def __post_init__(self):
+        self._dns = DNSCache(ttl=self.dns_ttl)
+
+    def _tls(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            context = ssl.create_default_context()
+            if not self.verify_tls:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            self._ssl_context = context
+        return self._ssl_context
+
+    def pool(self, origin: Origin) -> ConnectionPool:
+        pool = self._pools.get(origin)
+        if pool is None:
+            pool = self._pools[origin] = ConnectionPool(
+                origin,
+                self._dns,
+                ssl_context=self._tls() if origin.scheme == "https" else None,
+                max_connections=self.max_connections,
+                max_idle=self.max_idle_connections,
+                idle_timeout=self.idle_timeout,
+                connect_timeout=self.connect_timeout,
+                pool_timeout=self.pool_timeout,
+            )
+        return pool
+
+    async def request(
+        self,
+        origin: Origin,
+        method: str,
+        target: str,
+        headers: RawHeaders,
+        body: Optional[AsyncIterable[bytes]] = None,
+        content_length: Optional[int] = None,
+    ) -> UpstreamResponse:
+        """
+        Send a request for `target` (path and query) to `origin`. `headers` must
+        not hold framing headers (Content-Length, Transfer-Encoding), which are
+        set from `body` and `content_length`; Host defaults to the origin's.
+        Returns once the response headers arrived.
+        """
+        head = [method.encode(), b" ", target.encode(), b" HTTP/1.1\r\n"]
+        if not any(name.lower() == b"host" for name, _ in headers):
+            head += [b"host: ", origin.host_header, b"\r\n"]
+        for name, value in headers:
+            head += [name, b": ", value, b"\r\n"]
+        if body is not None:
+            head.append(b"content-length: %d\r\n" % content_length if content_length is not None else b"transfer-encoding: chunked\r\n")
+        head.append(b"\r\n")
+        head_bytes = b"".join(head)
+
+        pool = self.pool(origin)
+        while True:
+            connection = await pool.acquire()
+            try:
+                return await self._exchange(pool, connection, method, head_bytes, body, content_length)
+            except _StaleConnection:
+                pool.release(connection, False)
+                continue
+            except BaseException:
+                pool.release(connection, False)
+                raise
+
+    async def _exchange(
+        self,
+        pool: ConnectionPool,
+        connection: _Connection,
+        method: str,
+        head: bytes,
+        body: Optional[AsyncIterable[bytes]],
+        content_length: Optional[int],
+    ) -> UpstreamResponse:
+        reader, writer = connection.reader, connection.writer
+        retryable = connection.reused and body is None
+        try:
+            writer.write(head)
+            if body is not None:
+                await self._send_body(writer, body, chunked=content_length is None)
+            else:
+                async with asyncio.timeout(self.read_timeout):
+                    await writer.drain()
+        except TimeoutError:
+            raise UpstreamTimeout("The upstream didn't accept the request in time") from None
+        except ConnectionError as exc:
+            if retryable:
+                raise _StaleConnection() from exc
+            # The upstream may have answered early (e.g. 413) and closed: try to read its response.
+
+        try:
+            async with asyncio.timeout(self.read_timeout):
+                while True:
+                    version, status_code, headers = _parse_head(await reader.readuntil(b"\r\n\r\n"))
+                    # Interim responses (100 Continue, 103 Early Hints) are skipped.
+                    if status_code >= 200:
+                        break
+                    retryable = False
+        except TimeoutError:
+            raise UpstreamTimeout("The upstream didn't respond in time") from None
+        except asyncio.IncompleteReadError as exc:
+            if retryable and not exc.partial:
+                raise _StaleConnection() from exc
+            raise UpstreamProtocolError("The upstream closed the connection without responding") from exc
+        except asyncio.LimitOverrunError as exc:
+            raise UpstreamProtocolError("The upstream's response headers are too large") from exc
+        except ConnectionError as exc:
+            if retryable:
+                raise _StaleConnection() from exc
+            raise UpstreamProtocolError(f"Reading the response failed: {exc!r}") from exc
+
+        connection_tokens = {
+            token.strip().lower() for name, value in headers if name == b"connection" for token in value.split(b",")
+        }
+        keep_alive = b"close" not in connection_tokens and (version == b"HTTP/1.1" or b"keep-alive" in connection_tokens)
+        framing, length = "close", 0
+        transfer_encoding = b",".join(value for name, value in headers if name == b"transfer-encoding").lower()
+        if method == "HEAD" or status_code in (204, 304):
+            framing = "none"
+        elif transfer_encoding:
+            if not transfer_encoding.rstrip().endswith(b"chunked"):
+                raise UpstreamProtocolError(f"Unsupported transfer encoding {transfer_encoding!r}")
+            framing = "chunked"
+        else:
+            lengths = {value for name, value in headers if name == b"content-length"}
+            if len(lengths) > 1 or (lengths and not next(iter(lengths)).isdigit()):
+                raise UpstreamProtocolError(f"Invalid Content-Length {lengths!r}")
+            if lengths:
+                framing, length = "length", int(lengths.pop())
+        return UpstreamResponse(
+            status_code, headers, pool, connection, self.read_timeout, framing, length, keep_alive
+        )
+
+    async def _send_body(self, writer: asyncio.StreamWriter, body: AsyncIterable[bytes], chunked: bool) -> None:
+        async for chunk in body:
+            if not chunk:
+                continue
+            if chunked:
+                writer.writelines((b"%x\r\n" % len(chunk), chunk, b"\r\n"))
+            else:
+                writer.write(chunk)
+            # Backpressure: don't read more of the client's body than the upstream takes.
+            async with asyncio.timeout(self.read_timeout):
+                await writer.drain()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        async with asyncio.timeout(self.read_timeout):
+            await writer.drain()
+
+    def close(self) -> None:
+        """Close the idle connections; busy ones are closed as their responses finish."""
+        for pool in self._pools.values():
+            pool.close()
+
+
+class _StaleConnection(Exception):
+    """A reused connection turned out closed by the upstream before it got the request."""
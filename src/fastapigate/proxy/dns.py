@@ -0,0 +1,61 @@
+import asyncio
+import socket
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+
+
+def _is_ip_literal(host: str) -> bool:
+    for family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except OSError:
+            pass
+    return False
+
+
+@dataclass
+class DNSCache:
+    """
+    Resolves upstream host names to addresses, caching them for `ttl` seconds.
+
+    Concurrent lookups of the same name share one `getaddrinfo` call (which runs
+    in the loop's executor). IP literals are returned as-is without a lookup.
+    """
+    ttl: float = 60.0
+    clock: Callable[[], float] = time.monotonic
+    _entries: dict[tuple[str, int], tuple[float, list[str]]] = field(default_factory=dict, init=False)
+    _pending: dict[tuple[str, int], asyncio.Future] = field(default_factory=dict, init=False)
+
+    async def resolve(self, host: str, port: int) -> list[str]:
+        """The addresses of `host`, in the resolver's order of preference; raises OSError on failure."""
+        key = (host, port)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self.clock():
+            return entry[1]
+        if _is_ip_literal(host):
+            return [host]
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(self._lookup(host, port))
+            pending.add_done_callback(partial(self._done, key))
+        return await asyncio.shield(pending)
+
+    def _done(self, key: tuple[str, int], lookup: asyncio.Future) -> None:
+        self._pending.pop(key, None)
+        # Retrieved even if every caller was cancelled meanwhile, so it isn't logged as never retrieved.
+        lookup.cancelled() or lookup.exception()
+
+    async def _lookup(self, host: str, port: int) -> list[str]:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        if not addresses:
+            raise OSError(f"No address found for {host}")
+        self._entries[(host, port)] = (self.clock() + self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host: str, port: int) -> None:
+        """Forget the addresses of `host`, e.g. after none of them could be connected to."""
+        self._entries.pop((host, port), None)
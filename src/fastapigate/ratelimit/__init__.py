@@ -0,0 +1,28 @@
+from fastapigate.ratelimit.algorithms import (
+    ALGORITHMS,
+    GCRA,
+    RateLimitAlgorithm,
+    SlidingWindowCounter,
+    SlidingWindowLog,
+    create_algorithm,
+)
+from fastapigate.ratelimit.limiter import MemoryStore, RateLimitDecision, RateLimiter, RateLimitStore
+from fastapigate.ratelimit.remote import LeasingRateLimiter, RespConnection, RespError
+from fastapigate.ratelimit.shm import SharedMemoryStore
+
+__all__ = [
+    "ALGORITHMS",
+    "GCRA",
+    "LeasingRateLimiter",
+    "MemoryStore",
+    "RateLimitAlgorithm",
+    "RateLimitDecision",
+    "RateLimiter",
+    "RateLimitStore",
+    "RespConnection",
+    "RespError",
+    "SharedMemoryStore",
+    "SlidingWindowCounter",
+    "SlidingWindowLog",
+    "create_algorithm",
+]
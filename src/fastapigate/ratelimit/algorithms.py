@@ -0,0 +1,128 @@
+import struct
+from collections import deque
+from typing import Any, Optional, Protocol
+
+# Rejections always report a positive wait, 0.0 is reserved for "admitted".
+_MIN_RETRY_AFTER = 1e-6
+
+
+class RateLimitAlgorithm(Protocol):
+    """
+    A rate limiting algorithm working on an opaque, compact per-key state.
+
+    `hit` never awaits, so a check-and-update is atomic on the event loop and
+    needs no per-key lock. Algorithms with a fixed-size state also declare its
+    binary layout as `state_struct`, so stores can keep it outside the Python heap.
+    """
+    limit: int
+    window: float
+
+    def hit(self, state: Optional[Any], now: float) -> tuple[Any, float]:
+        """Record one request. Return the new state and 0.0 if admitted, else the seconds to wait."""
+        ...
+
+    def is_expired(self, state: Any, now: float) -> bool:
+        """True when `state` is indistinguishable from a key that was never seen."""
+        ...
+
+
+class GCRA:
+    """
+    Generic cell rate algorithm. The whole per-key state is a single float,
+    the theoretical arrival time (TAT) of the next request.
+
+    `burst` requests may arrive back to back, after that requests are spaced
+    `window / limit` seconds apart. It defaults to `limit`.
+    """
+    state_struct = struct.Struct("<d")
+
+    def __init__(self, limit: int, window: float, burst: Optional[int] = None):
+        self.limit = limit
+        self.window = window
+        self.emission_interval = window / limit
+        self.tolerance = self.emission_interval * (burst or limit)
+
+    def hit(self, state: Optional[float], now: float) -> tuple[float, float]:
+        tat = state if state is not None and state > now else now
+        new_tat = tat + self.emission_interval
+        allow_at = new_tat - self.tolerance
+        if now < allow_at:
+            return tat, allow_at - now
+        return new_tat, 0.0
+
+    def is_expired(self, state: float, now: float) -> bool:
+        return state <= now
+
+
+class SlidingWindowCounter:
+    """
+    Approximates a sliding window from the counts of the current and previous
+    fixed windows, weighting the previous one by how much of it still overlaps.
+    The per-key state is a `(window_index, previous_count, current_count)` tuple.
+    """
+    state_struct = struct.Struct("<qqq")
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+
+    def hit(self, state: Optional[tuple[int, int, int]], now: float) -> tuple[tuple[int, int, int], float]:
+        index = int(now // self.window)
+        previous, current = 0, 0
+        if state is not None:
+            if state[0] == index:
+                previous, current = state[1], state[2]
+            elif state[0] == index - 1:
+                previous = state[2]
+        elapsed = now - index * self.window
+        weight = 1.0 - elapsed / self.window
+        if previous * weight + current + 1 > self.limit:
+            if current + 1 > self.limit or previous == 0:
+                retry_after = self.window - elapsed
+            else:
+                # Time at which the previous window's weight has decayed enough.
+                retry_after = self.window * (1.0 - (self.limit - current - 1) / previous) - elapsed
+            return (index, previous, current), max(retry_after, _MIN_RETRY_AFTER)
+        return (index, previous, current + 1), 0.0
+
+    def is_expired(self, state: tuple[int, int, int], now: float) -> bool:
+        return state[0] < int(now // self.window) - 1
+
+
+class SlidingWindowLog:
+    """
+    Exact sliding window keeping the timestamps of the admitted requests.
+    Memory is bounded by `limit` timestamps per key.
+    """
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+
+    def hit(self, state: Optional[deque], now: float) -> tuple[deque, float]:
+        log = state if state is not None else deque(maxlen=self.limit)
+        horizon = now - self.window
+        while log and log[0] <= horizon:
+            log.popleft()
+        if len(log) >= self.limit:
+            return log, log[0] - horizon
+        log.append(now)
+        return log, 0.0
+
+    def is_expired(self, state: deque, now: float) -> bool:
+        return not state or state[-1] <= now - self.window
+
+
+ALGORITHMS: dict[str, type] = {
+    "gcra": GCRA,
+    "sliding_window_counter": SlidingWindowCounter,
+    "sliding_window_log": SlidingWindowLog,
+}
+
+
+def create_algorithm(name: str, limit: int, window: float, burst: Optional[int] = None) -> RateLimitAlgorithm:
+    if name not in ALGORITHMS:
+        raise ValueError(f"Unknown rate limit algorithm: {name}")
+    if name == "gcra":
+        return GCRA(limit, window, burst)
+    return ALGORITHMS[name](limit, window)
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable, NamedTuple, Optional, Protocol
+
+from fastapigate.ratelimit.algorithms import RateLimitAlgorithm
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0
+
+
+_ADMITTED = RateLimitDecision(True)
+
+class RateLimitStore(Protocol):
+    """Where a `RateLimiter` keeps its per-key algorithm state."""
+
+    def hit(self, algorithm: RateLimitAlgorithm, key: str, now: float) -> float:
+        """Apply one request for `key`, return 0.0 if admitted, else the seconds to wait."""
+        ...
+
+
+@dataclass
+class MemoryStore:
+    """
+    In-process store bounded to `max_keys` entries.
+
+    Entries are kept in least-recently-used order. Every hit also drops up to
+    `sweep` expired entries from the cold end, so idle keys (e.g. from a scan
+    across many IPs) are released long before the LRU bound kicks in.
+    """
+    max_keys: int = 100_000
+    sweep: int = 2
+    _states: OrderedDict[Hashable, Any] = field(default_factory=OrderedDict, init=False)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def hit(self, algorithm: RateLimitAlgorithm, key: str, now: float) -> float:
+        states = self._states
+        state = states.get(key)
+        state, retry_after = algorithm.hit(state, now)
+        states[key] = state
+        states.move_to_end(key)
+        self._evict(algorithm, now)
+        return retry_after
+
+    def _evict(self, algorithm: RateLimitAlgorithm, now: float) -> None:
+        states = self._states
+        while len(states) > self.max_keys:
+            states.popitem(last=False)
+        for _ in range(self.sweep):
+            if len(states) < 2:
+                break
+            oldest_key = next(iter(states))
+            if not algorithm.is_expired(states[oldest_key], now):
+                break
+            del states[oldest_key]
+
+
+@dataclass
+class RateLimiter:
+    """Applies one algorithm (limit per window) to arbitrary keys kept in a store."""
+    algorithm: RateLimitAlgorithm
+    store: RateLimitStore = field(default_factory=MemoryStore)
+    clock: Callable[[], float] = time.monotonic
+
+    def hit(self, key: str, now: Optional[float] = None) -> RateLimitDecision:
+        retry_after = self.store.hit(self.algorithm, key, self.clock() if now is None else now)
+        if retry_after:
+            return RateLimitDecision(False, retry_after)
+        return _ADMITTED
+
+    async def acquire(self, key: str) -> RateLimitDecision:
+        """Awaitable `hit`, the common interface with limiters backed by remote stores."""
+        return self.hit(key)
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse
+
+from fastapigate.ratelimit.limiter import RateLimitDecision, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+_ADMITTED = RateLimitDecision(True)
+
+
+class RespError(Exception):
+    """An error reply (`-ERR ...`) from the key-value store."""
+
+
+def _encode_command(*args: Any) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readuntil(b"\r\n")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise RespError(f"Unexpected reply: {line!r}")
+
+
+@dataclass
+class RespConnection:
+    """
+    A minimal client for Redis-protocol (RESP) compatible stores.
+
+    Commands are sent as pipelines over a single lazily (re)opened connection;
+    any I/O error or timeout drops the connection and is raised to the caller.
+    """
+    url: str = "redis://localhost:6379/0"
+    timeout: float = 0.05
+    _reader: Optional[asyncio.StreamReader] = field(default=None, init=False)
+    _writer: Optional[asyncio.StreamWriter] = field(default=None, init=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        url = urlparse(self.url)
+        reader, writer = await asyncio.open_connection(url.hostname or "localhost", url.port or 6379)
+        self._reader, self._writer = reader, writer
+        setup = []
+        if url.password:
+            setup.append(("AUTH", url.username, url.password) if url.username else ("AUTH", url.password))
+        if url.path.strip("/"):
+            setup.append(("SELECT", url.path.strip("/")))
+        if setup:
+            for reply in await self._send(setup):
+                if isinstance(reply, RespError):
+                    raise reply
+        return reader, writer
+
+    async def _send(self, commands: list[tuple]) -> list[Any]:
+        assert self._reader is not None and self._writer is not None
+        self._writer.write(b"".join(_encode_command(*command) for command in commands))
+        await self._writer.drain()
+        return [await _read_reply(self._reader) for _ in commands]
+
+    async def pipeline(self, commands: list[tuple]) -> list[Any]:
+        """Send `commands` in one round trip. Error replies are returned, not raised."""
+        async with self._lock:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    if self._writer is None:
+                        await self._connect()
+                    return await self._send(commands)
+            except BaseException:
+                self.close()
+                raise
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader, self._writer = None, None
+
+
+@dataclass
+class _Lease:
+    window_index: int
+    tokens: int = 0
+    exhausted: bool = False
+
+
+@dataclass
+class LeasingRateLimiter:
+    """
+    A sliding-window-counter limit shared by every node through a RESP store.
+
+    Instead of one round trip per request, a node leases `lease_tokens` tokens
+    at a time and spends them locally. Lease requests of all keys that ran dry
+    at the same moment are coalesced into a single pipeline, and concurrent
+    requests for the same key wait on that one refill. Over-admission is bounded
+    by `lease_tokens` per node and window.
+
+    While the store is unreachable, requests are decided by the local
+    `fallback` limiter and the store is retried after `retry_interval` seconds.
+    """
+    connection: RespConnection
+    limit: int
+    window: float
+    fallback: RateLimiter
+    key_prefix: str = "fastapigate:ratelimit"
+    lease_tokens: int = 10
+    retry_interval: float = 5.0
+    max_keys: int = 100_000
+    clock: Callable[[], float] = time.time
+    _leases: OrderedDict[str, _Lease] = field(default_factory=OrderedDict, init=False)
+    _pending: dict[tuple[str, int], asyncio.Future] = field(default_factory=dict, init=False)
+    _flush_task: Optional[asyncio.Task] = field(default=None, init=False)
+    _down_until: float = field(default=0.0, init=False)
+
+    async def acquire(self, key: str) -> RateLimitDecision:
+        while True:
+            now = self.clock()
+            if now < self._down_until:
+                return self.fallback.hit(key)
+            index = int(now // self.window)
+            lease = self._leases.get(key)
+            if lease is not None and lease.window_index == index:
+                if lease.tokens > 0:
+                    lease.tokens -= 1
+                    return _ADMITTED
+                if lease.exhausted:
+                    return RateLimitDecision(False, (index + 1) * self.window - now)
+            await self._refill(key, index)
+
+    def _refill(self, key: str, index: int) -> asyncio.Future:
+        future = self._pending.get((key, index))
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[(key, index)] = future
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush())
+        return future
+
+    async def _flush(self) -> None:
+        # Keys running dry while a batch is in flight go out in the next one:
+        # `_refill` only starts a flush when none is running.
+        while self._pending:
+            # Yield once so every key running dry in this loop iteration joins the batch.
+            await asyncio.sleep(0)
+            pending, self._pending = self._pending, {}
+            await self._flush_batch(pending)
+
+    async def _flush_batch(self, pending: dict[tuple[str, int], asyncio.Future]) -> None:
+        window_ms = int(self.window * 2000)
+        commands: list[tuple] = []
+        for key, index in pending:
+            current = f"{self.key_prefix}:{key}:{index}"
+            commands.append(("INCRBY", current, self.lease_tokens))
+            commands.append(("PEXPIRE", current, window_ms))
+            commands.append(("GET", f"{self.key_prefix}:{key}:{index - 1}"))
+        try:
+            replies = await self.connection.pipeline(commands)
+            for reply in replies:
+                if isinstance(reply, RespError):
+                    raise reply
+        except (OSError, asyncio.TimeoutError, RespError, asyncio.IncompleteReadError) as exc:
+            logger.warning(f"Rate limit store unreachable, using local limits: {exc!r}")
+            self._down_until = self.clock() + self.retry_interval
+        else:
+            now = self.clock()
+            for i, (key, index) in enumerate(pending):
+                total, _, previous = replies[3 * i: 3 * i + 3]
+                self._grant(key, index, int(total), int(previous or 0), now)
+        finally:
+            for future in pending.values():
+                if not future.done():
+                    future.set_result(None)
+
+    def _grant(self, key: str, index: int, total: int, previous: int, now: float) -> None:
+        weight = 1.0 - (now - index * self.window) / self.window
+        used_before = previous * max(weight, 0.0) + total - self.lease_tokens
+        granted = max(0, min(self.lease_tokens, int(self.limit - used_before)))
+        lease = self._leases.get(key)
+        if lease is None or lease.window_index != index:
+            lease = self._leases[key] = _Lease(index)
+        self._leases.move_to_end(key)
+        lease.tokens += granted
+        lease.exhausted = granted < self.lease_tokens
+        while len(self._leases) > self.max_keys:
+            self._leases.popitem(last=False)
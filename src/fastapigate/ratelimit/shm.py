@@ -0,0 +1,153 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import Any
+
+from fastapigate.ratelimit.algorithms import RateLimitAlgorithm
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"FGRL"
+_VERSION = 2
+# magic, version, bucket count, ways per bucket, algorithm name, limit, window
+_HEADER = struct.Struct("<4sIII32sQd")
+_HEADER_SIZE = 64
+# key digest (0 = empty slot), last hit, then up to 24 bytes of algorithm state
+_SLOT = struct.Struct("<Qd24s")
+
+
+def _digest(key: str) -> int:
+    # Must be identical in every worker, so the randomized built-in hash() won't do.
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+@dataclass
+class SharedMemoryStore:
+    """
+    Rate limit state shared by every process on the host through an mmap-ed file.
+
+    The file holds a fixed-size hash table split into buckets of `ways` slots.
+    A key lives in one bucket; a hit locks just that bucket's byte range
+    (`fcntl.lockf`) for the read-modify-write, so workers never see a torn
+    update and unrelated keys don't contend. When a bucket is full the least
+    recently hit (or an expired) slot is recycled, keeping memory fixed.
+
+    The header records the table's geometry and the algorithm, limit and
+    window its states belong to. A file with a different header is never
+    resized in place, as other processes may still have it mapped: a new table
+    is renamed over it, and those processes keep their (now unlinked) one
+    until they reopen the path.
+
+    Only algorithms with a fixed-size state (`state_struct`) are supported.
+    """
+    path: str
+    algorithm: RateLimitAlgorithm
+    slots: int = 65_536
+    ways: int = 8
+    _fd: int = field(init=False)
+    _mmap: mmap.mmap = field(init=False)
+    _buckets: int = field(init=False)
+    _state_struct: struct.Struct = field(init=False)
+
+    def __post_init__(self):
+        state_struct = getattr(self.algorithm, "state_struct", None)
+        if state_struct is None:
+            raise ValueError(f"{type(self.algorithm).__name__} has no fixed-size state for the shared memory store")
+        self._state_struct = state_struct
+        self._buckets = max(1, self.slots // self.ways)
+        size = _HEADER_SIZE + self._buckets * self.ways * _SLOT.size
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, self._buckets, self.ways,
+            type(self.algorithm).__name__.encode(), self.algorithm.limit, self.algorithm.window,
+        )
+        self._fd = self._open(header, size)
+        self._mmap = mmap.mmap(self._fd, size)
+
+    def _open(self, header: bytes, size: int) -> int:
+        """A descriptor of the table at `path`, created or replaced unless it has `header` and `size`."""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                # Unless replaced by another process while waiting for the lock.
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    current_size = os.fstat(fd).st_size
+                    if current_size == size and os.pread(fd, _HEADER.size, 0) == header:
+                        return fd
+                    if current_size == 0:
+                        # Just created: nobody can have an empty file mapped.
+                        self._initialize(fd, header, size)
+                        return fd
+                    self._replace(header, size)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _replace(self, header: bytes, size: int) -> None:
+        logger.warning(f"Replacing the rate limit table {self.path}, made for another algorithm, limit or size")
+        directory, name = os.path.split(self.path)
+        fd, path = tempfile.mkstemp(prefix=f".{name}.", dir=directory or None)
+        try:
+            self._initialize(fd, header, size)
+            os.replace(path, self.path)
+        except BaseException:
+            os.unlink(path)
+            raise
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _initialize(fd: int, header: bytes, size: int) -> None:
+        os.ftruncate(fd, size)
+        os.pwrite(fd, header, 0)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+    def hit(self, algorithm: RateLimitAlgorithm, key: str, now: float) -> float:
+        state_struct = self._state_struct
+        digest = _digest(key)
+        bucket_size = self.ways * _SLOT.size
+        bucket_offset = _HEADER_SIZE + (digest % self._buckets) * bucket_size
+        buffer = self._mmap
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, bucket_size, bucket_offset, os.SEEK_SET)
+        try:
+            slot_offset, state = self._find_slot(algorithm, state_struct, digest, bucket_offset, now)
+            state, retry_after = algorithm.hit(state, now)
+            packed_state = state_struct.pack(*(state if isinstance(state, tuple) else (state,)))
+            _SLOT.pack_into(buffer, slot_offset, digest, now, packed_state)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, bucket_size, bucket_offset, os.SEEK_SET)
+        return retry_after
+
+    def _find_slot(
+        self, algorithm: RateLimitAlgorithm, state_struct: struct.Struct, digest: int, bucket_offset: int, now: float
+    ) -> tuple[int, Any]:
+        """Return the offset of the key's slot (or of the slot to recycle) and its current state."""
+        buffer = self._mmap
+        victim_offset, victim_last_hit = bucket_offset, float("inf")
+        for way in range(self.ways):
+            offset = bucket_offset + way * _SLOT.size
+            slot_digest, last_hit, packed_state = _SLOT.unpack_from(buffer, offset)
+            if slot_digest == digest:
+                fields = state_struct.unpack_from(packed_state)
+                return offset, fields[0] if len(fields) == 1 else fields
+            if slot_digest == 0:
+                if victim_last_hit != -1.0:
+                    victim_offset, victim_last_hit = offset, -1.0
+                continue
+            if victim_last_hit == -1.0:
+                continue
+            fields = state_struct.unpack_from(packed_state)
+            if algorithm.is_expired(fields[0] if len(fields) == 1 else fields, now):
+                victim_offset, victim_last_hit = offset, -1.0
+            elif last_hit < victim_last_hit:
+                victim_offset, victim_last_hit = offset, last_hit
+        return victim_offset, None
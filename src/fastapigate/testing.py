@@ -0,0 +1,342 @@
+"""
+In-process stand-ins for the external services the gateway talks to, and
+for the ASGI server in front of it, for tests and benchmarks that must not
+depend on real infrastructure.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import unquote_to_bytes
+
+from starlette.types import ASGIApp, Message, Scope
+
+from fastapigate.ratelimit.remote import RespError, _read_reply
+
+
+def _encode_reply(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+@dataclass
+class FakeRespServer:
+    """
+    A tiny Redis-protocol server supporting the commands the gateway uses
+    (PING, SELECT, GET, SET, DEL, INCRBY, PEXPIRE).
+
+        async with FakeRespServer() as server:
+            connection = RespConnection(server.url)
+
+    `commands` counts the commands received.
+    """
+    host: str = "127.0.0.1"
+    port: int = 0
+    commands: int = 0
+    _data: dict[bytes, tuple[bytes, Optional[float]]] = field(default_factory=dict, init=False)
+    _server: Optional[asyncio.Server] = field(default=None, init=False)
+    _connections: dict[asyncio.StreamWriter, asyncio.Task] = field(default_factory=dict, init=False)
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self) -> "FakeRespServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        """Stop accepting and drop every open connection (simulates an outage)."""
+        if self._server is not None:
+            self._server.close()
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeRespServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                command = await _read_reply(reader)
+                writer.write(_encode_reply(self._execute(command)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        value, expires_at = self._data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _execute(self, command: list[bytes]) -> Any:
+        self.commands += 1
+        name, args = command[0].upper(), command[1:]
+        if name == b"PING":
+            return "PONG"
+        if name == b"SELECT":
+            return "OK"
+        if name == b"GET":
+            return self._get(args[0])
+        if name == b"SET":
+            self._data[args[0]] = (args[1], None)
+            return "OK"
+        if name == b"DEL":
+            return sum(self._data.pop(key, None) is not None for key in args)
+        if name == b"INCRBY":
+            current = self._get(args[0])
+            value = int(current or 0) + int(args[1])
+            expires_at = self._data.get(args[0], (None, None))[1] if current is not None else None
+            self._data[args[0]] = (str(value).encode(), expires_at)
+            return value
+        if name == b"PEXPIRE":
+            current = self._get(args[0])
+            if current is None:
+                return 0
+            self._data[args[0]] = (current, time.monotonic() + int(args[1]) / 1000)
+            return 1
+        return RespError(f"ERR unknown command '{name.decode()}'")
+
+
+@dataclass
+class UpstreamServer:
+    """
+    A minimal HTTP/1.1 server running an ASGI `app`, standing in for the remote
+    upstreams of the proxy policy. Keep-alive connections and Content-Length or
+    chunked bodies are supported in both directions; bodies are streamed.
+
+        async with UpstreamServer(app) as server:
+            policy = ProxyPolicy(ProxyPolicyConfig(url=server.url))
+
+    `connections` counts the connections accepted and `requests` the requests served.
+    """
+    app: ASGIApp
+    host: str = "127.0.0.1"
+    port: int = 0
+    connections: int = 0
+    requests: int = 0
+    _server: Optional[asyncio.Server] = field(default=None, init=False)
+    _connections: dict[asyncio.StreamWriter, asyncio.Task] = field(default_factory=dict, init=False)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "UpstreamServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        """Stop accepting and drop every open connection."""
+        if self._server is not None:
+            self._server.close()
+            handlers = list(self._connections.values())
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "UpstreamServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                if not await self._serve(reader, writer, head):
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, head: bytes) -> bool:
+        """Serve one request; whether the connection can be kept alive."""
+        self.requests += 1
+        request_line, *header_lines = head[:-4].split(b"\r\n")
+        method, target, version = request_line.split(b" ")
+        headers = []
+        for line in header_lines:
+            name, _, value = line.partition(b":")
+            headers.append((name.strip().lower(), value.strip()))
+        header = dict(headers)
+        keep_alive = header.get(b"connection", b"").lower() != b"close" and version == b"HTTP/1.1"
+        chunked_request = b"chunked" in header.get(b"transfer-encoding", b"").lower()
+        remaining = int(header.get(b"content-length", 0))
+        path, _, query_string = target.partition(b"?")
+        body_done = not chunked_request and not remaining
+        # Whether the app got the last `http.request` message (an empty one without a body).
+        body_received = False
+        response_done = asyncio.Event()
+        chunked_response = False
+
+        async def read_body() -> bytes:
+            nonlocal remaining, body_done
+            if chunked_request:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                data = await reader.readexactly(size + 2)
+                if not size:
+                    body_done = True
+                return data[:-2]
+            data = await reader.read(min(remaining, 64 * 1024))
+            if not data:
+                raise ConnectionError("Connection closed mid-body")
+            remaining -= len(data)
+            body_done = not remaining
+            return data
+
+        async def receive() -> Message:
+            nonlocal body_received
+            if body_received:
+                await response_done.wait()
+                return {"type": "http.disconnect"}
+            data = await read_body() if not body_done else b""
+            body_received = body_done
+            return {"type": "http.request", "body": data, "more_body": not body_done}
+
+        async def send(message: Message) -> None:
+            nonlocal chunked_response
+            if message["type"] == "http.response.start":
+                response_headers = list(message.get("headers", []))
+                names = {name.lower() for name, _ in response_headers}
+                chunked_response = b"content-length" not in names and method != b"HEAD"
+                if chunked_response:
+                    response_headers.append((b"transfer-encoding", b"chunked"))
+                if not keep_alive:
+                    response_headers.append((b"connection", b"close"))
+                lines = [b"HTTP/1.1 %d OK\r\n" % message["status"]]
+                lines += [name + b": " + value + b"\r\n" for name, value in response_headers]
+                writer.write(b"".join(lines) + b"\r\n")
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                if body and method != b"HEAD":
+                    writer.writelines((b"%x\r\n" % len(body), body, b"\r\n") if chunked_response else (body,))
+                if not message.get("more_body", False):
+                    if chunked_response:
+                        writer.write(b"0\r\n\r\n")
+                    response_done.set()
+                await writer.drain()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.4"},
+            "http_version": version.decode().partition("/")[2],
+            "method": method.decode(),
+            "scheme": "http",
+            "path": unquote_to_bytes(path).decode("utf-8", "replace"),
+            "raw_path": path,
+            "query_string": query_string,
+            "root_path": "",
+            "headers": headers,
+            "client": writer.get_extra_info("peername")[:2],
+            "server": (self.host, self.port),
+        }
+        await self.app(scope, receive, send)
+        # Skip what the app didn't read of the body, to get to the next request.
+        while not body_done:
+            await read_body()
+        return keep_alive and response_done.is_set()
+
+
+def http_scope(
+    method: str = "GET",
+    path: str = "/",
+    headers: Optional[dict[str, str]] = None,
+    client: str = "127.0.0.1",
+) -> Scope:
+    """The ASGI scope of an HTTP/1.1 request to `gateway.test` from `client`."""
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"gateway.test")] + [
+            (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+        ],
+        "client": (client, 50000),
+        "server": ("gateway.test", 80),
+    }
+
+
+@dataclass
+class RecordedResponse:
+    """What an ASGI app sent back to `asgi_request`."""
+    status: int = 0
+    headers: list[tuple[bytes, bytes]] = field(default_factory=list)
+    body: bytes = b""
+
+    def header(self, name: str) -> Optional[str]:
+        encoded = name.lower().encode()
+        return next((value.decode() for key, value in self.headers if key == encoded), None)
+
+
+async def asgi_request(app: ASGIApp, scope: Scope, body: bytes = b"") -> RecordedResponse:
+    """
+    Call `app` with `scope` as an ASGI server would, `body` being the whole
+    request body, and record its response. The client disconnects once the
+    response is complete.
+    """
+    response = RecordedResponse()
+    chunks: list[bytes] = []
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive() -> Message:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+            response.headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    response.body = b"".join(chunks)
+    return response
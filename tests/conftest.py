@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    # The gateway is written against asyncio (tasks, streams, timeouts).
+    return "asyncio"
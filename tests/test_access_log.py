@@ -0,0 +1,193 @@
+import json
+import random
+import threading
+
+import pytest
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.core.access_log import AccessLog, RotatingFileSink
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+class ListSink:
+    """Keeps each write; `written` is set on every write, and writes wait for `unblocked`."""
+
+    def __init__(self):
+        self.writes: list[bytes] = []
+        self.written = threading.Event()
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.written.set()
+        self.unblocked.wait(5)
+        self.writes.append(data)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def records(self) -> list[dict]:
+        return [json.loads(line) for data in self.writes for line in data.decode().splitlines()]
+
+
+def access_log(sink: ListSink, **options) -> AccessLog:
+    # Long enough that only a full batch, a flush or closing wakes the writer.
+    return AccessLog(sink, **{"flush_interval": 60.0, **options})
+
+
+def record(index: int) -> dict:
+    return {"time": 0.0, "path": f"/{index}"}
+
+
+def test_full_batch_is_written_without_waiting_for_the_interval():
+    sink = ListSink()
+    log = access_log(sink, batch_size=3)
+
+    for index in range(3):
+        assert log.log(record(index))
+
+    assert sink.written.wait(5)
+    log.close()
+    assert [entry["path"] for entry in sink.records()] == ["/0", "/1", "/2"]
+    assert (log.stats().written, log.stats().batches) == (3, 1)
+
+
+def test_partial_batch_is_written_after_the_flush_interval():
+    sink = ListSink()
+    log = access_log(sink, batch_size=100, flush_interval=0.05)
+
+    log.log(record(0))
+
+    assert sink.written.wait(5)
+    assert log.stats().batches == 1
+    log.close()
+
+
+def test_flush_waits_for_the_queued_records():
+    sink = ListSink()
+    log = access_log(sink, batch_size=100)
+    for index in range(5):
+        log.log(record(index))
+
+    assert log.flush(5)
+
+    assert log.stats().written == 5
+    assert not sink.closed
+    log.close()
+
+
+def test_close_writes_the_queued_records_and_closes_the_sink():
+    sink = ListSink()
+    log = access_log(sink, batch_size=2)
+    for index in range(5):
+        log.log(record(index))
+
+    log.close()
+
+    assert [entry["path"] for entry in sink.records()] == [f"/{index}" for index in range(5)]
+    assert sink.closed
+    # Records logged after closing are dropped.
+    assert not log.log(record(5))
+    assert log.stats().dropped == 1
+
+
+def test_records_are_dropped_rather_than_waited_for_when_the_queue_is_full():
+    sink = ListSink()
+    sink.unblocked.clear()
+    # A queue of 2 wakes the writer on its first record, which it then takes.
+    log = access_log(sink, queue_size=2, batch_size=100)
+    log.log(record(0))
+    assert sink.written.wait(5)
+
+    assert log.log(record(1)) and log.log(record(2))
+    assert not log.log(record(3))
+
+    sink.unblocked.set()
+    log.close()
+    assert [entry["path"] for entry in sink.records()] == ["/0", "/1", "/2"]
+    assert (log.stats().queued, log.stats().dropped, log.stats().written) == (3, 1, 3)
+
+
+def test_sampling_keeps_failed_requests():
+    class Rng(random.Random):
+        def random(self) -> float:
+            return 0.5
+
+    log = access_log(ListSink(), sample_rate=0.25, rng=Rng())
+
+    assert not log.sampled(failed=False)
+    assert log.sampled(failed=True)
+    assert log.stats().sampled_out == 1
+    log.close()
+
+
+def test_write_errors_are_counted_and_later_batches_still_written():
+    class FailingOnceSink(ListSink):
+        failed = False
+
+        def write(self, data: bytes) -> None:
+            if not self.failed:
+                self.failed = True
+                raise OSError("Disk full")
+            super().write(data)
+
+    sink = FailingOnceSink()
+    log = access_log(sink, batch_size=100)
+    log.log(record(0))
+    log.flush(5)
+    log.log(record(1))
+    log.close()
+
+    assert [entry["path"] for entry in sink.records()] == ["/1"]
+    assert (log.stats().write_errors, log.stats().written) == (1, 1)
+
+
+def test_file_sink_rotates(tmp_path):
+    path = str(tmp_path / "access.log")
+    sink = RotatingFileSink(path, max_bytes=10, backup_count=2)
+
+    for data in (b"first---\n", b"second--\n", b"third---\n", b"fourth--\n"):
+        sink.write(data)
+    sink.close()
+
+    assert [open(name, "rb").read() for name in (path, f"{path}.1", f"{path}.2")] == [
+        b"fourth--\n",
+        b"third---\n",
+        b"second--\n",
+    ]
+
+
+async def test_gateway_logs_a_record_per_request():
+    async def ok_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"created"})
+
+    gateway = Gateway(GatewayConfig(accessLog={"enabled": True}), default_policy_registry())
+    sink = ListSink()
+    gateway.access_log.close()
+    gateway.access_log = access_log(sink)
+    app = GatewayMiddleware(ok_app, gateway)
+
+    await asgi_request(app, http_scope(method="POST", path="/items", client="192.0.2.1"))
+    gateway.access_log.close()
+
+    (entry,) = sink.records()
+    assert {key: entry[key] for key in ("method", "path", "status", "bytes_sent", "client", "host")} == {
+        "method": "POST",
+        "path": "/items",
+        "status": 201,
+        "bytes_sent": 7,
+        "client": "192.0.2.1",
+        "host": "gateway.test",
+    }
+    assert entry["time"].endswith("+00:00")
+
+
+def test_invalid_options_are_rejected():
+    for options in ({"sample_rate": 1.5}, {"batch_size": 0}, {"flush_interval": 0.0}):
+        with pytest.raises(ValueError):
+            AccessLog(ListSink(), **options)
@@ -0,0 +1,145 @@
+import math
+import random
+
+import pytest
+
+from fastapigate.proxy import LoadBalancer, Upstream
+
+
+class Clock:
+    """A clock moved by hand."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def balancer(*urls: str, **options) -> tuple[LoadBalancer, Clock]:
+    clock = Clock()
+    upstreams = [Upstream(url) for url in urls]
+    return LoadBalancer(upstreams, clock=clock, rng=random.Random(0), **options), clock
+
+
+def picks(lb: LoadBalancer, count: int) -> dict[str, int]:
+    """How many of `count` sequential requests went to each upstream."""
+    counts = {upstream.url: 0 for upstream in lb.upstreams}
+    for _ in range(count):
+        call = lb.pick()
+        counts[call.upstream.url] += 1
+        call.done()
+    return counts
+
+
+def test_prefers_the_lower_latency_upstream():
+    lb, _ = balancer("http://fast.test", "http://slow.test")
+    fast, slow = lb.upstreams
+    lb.observe(fast, 0.010, failed=False)
+    lb.observe(slow, 0.100, failed=False)
+
+    assert picks(lb, 100) == {"http://fast.test": 100, "http://slow.test": 0}
+
+
+def test_prefers_the_less_loaded_upstream():
+    lb, _ = balancer("http://busy.test", "http://idle.test")
+    for upstream in lb.upstreams:
+        lb.observe(upstream, 0.010, failed=False)
+    held = [lb.pick() for _ in range(4)]
+
+    # Equal latencies: requests spread over both, so neither has more than one extra in flight.
+    assert abs(lb.upstreams[0].outstanding - lb.upstreams[1].outstanding) <= 1
+    for call in held:
+        call.done()
+    busy = lb.upstreams[0]
+    busy.outstanding = 10
+    assert picks(lb, 20) == {"http://busy.test": 0, "http://idle.test": 20}
+
+
+def test_latency_jumps_to_slower_samples_and_decays_towards_faster_ones():
+    lb, clock = balancer("http://a.test", decay=10.0)
+    upstream = lb.upstreams[0]
+    lb.observe(upstream, 0.010, failed=False)
+
+    lb.observe(upstream, 0.100, failed=False)
+    assert lb.stats()["http://a.test"].latency_ms == pytest.approx(100.0)
+
+    # One time constant later a fast sample weighs 1 - 1/e.
+    clock.now = 10.0
+    lb.observe(upstream, 0.010, failed=False)
+    expected = 0.100 * math.exp(-1) + 0.010 * (1 - math.exp(-1))
+    assert lb.stats()["http://a.test"].latency_ms == pytest.approx(expected * 1e3)
+
+    # Without samples the cost keeps decaying, so an upstream is retried eventually.
+    clock.now = 20.0
+    assert lb.stats()["http://a.test"].latency_ms == pytest.approx(expected * math.exp(-1) * 1e3)
+
+
+def test_slow_upstream_gets_traffic_again_once_its_latency_decayed():
+    lb, clock = balancer("http://a.test", "http://b.test", decay=1.0)
+    a, b = lb.upstreams
+    lb.observe(a, 1.0, failed=False)
+    lb.observe(b, 0.010, failed=False)
+    assert picks(lb, 10)["http://a.test"] == 0
+
+    clock.now = 10.0
+    lb.observe(b, 0.010, failed=False)
+
+    assert picks(lb, 10)["http://a.test"] > 0
+
+
+def test_failures_do_not_lower_the_latency():
+    lb, clock = balancer("http://a.test")
+    upstream = lb.upstreams[0]
+    lb.observe(upstream, 0.100, failed=False)
+    clock.now = 10.0
+
+    lb.observe(upstream, 0.001, failed=True)
+
+    assert lb.stats()["http://a.test"].latency_ms == pytest.approx(100.0 * math.exp(-1))
+
+
+def test_single_upstream_is_always_picked():
+    lb, _ = balancer("http://only.test")
+    only = lb.upstreams[0]
+
+    call = lb.pick(exclude=[only])
+    assert call.upstream is only
+    assert only.outstanding == 1
+    call.done()
+    call.done()
+    assert only.outstanding == 0
+    assert picks(lb, 5) == {"http://only.test": 5}
+
+
+def test_excluded_upstreams_are_avoided():
+    lb, _ = balancer("http://a.test", "http://b.test", "http://c.test")
+    a, b, c = lb.upstreams
+    lb.observe(c, 1.0, failed=False)
+
+    for _ in range(10):
+        call = lb.pick(exclude=[a, b])
+        assert call.upstream is c
+        call.done()
+
+
+def test_failing_upstream_is_ejected_then_slow_started():
+    lb, clock = balancer("http://a.test", "http://b.test", consecutive_failures=3, base_ejection_time=30.0)
+    a, _ = lb.upstreams
+    for _ in range(3):
+        lb.observe(a, 0.010, failed=True)
+
+    assert lb.stats()["http://a.test"].ejected
+    assert picks(lb, 20)["http://a.test"] == 0
+    # Back after the ejection time, its weight ramps up over the slow start time.
+    clock.now = 30.0
+    assert lb.stats()["http://a.test"].weight_factor == pytest.approx(0.1)
+    clock.now = 45.0
+    assert lb.stats()["http://a.test"].weight_factor == pytest.approx(0.5)
+    clock.now = 60.0
+    assert lb.stats()["http://a.test"].weight_factor == 1.0
+
+
+def test_at_least_one_upstream_is_required():
+    with pytest.raises(ValueError):
+        LoadBalancer([])
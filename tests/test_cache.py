@@ -0,0 +1,80 @@
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI, Request, Response
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+def cached_app(cache_control: str) -> tuple[GatewayMiddleware, list[Optional[str]]]:
+    """A gateway caching an app that records the Authorization of each request it serves."""
+    app = FastAPI()
+    served: list[Optional[str]] = []
+
+    @app.get("/")
+    async def root(request: Request):
+        served.append(request.headers.get("authorization"))
+        return Response(f"response {len(served)}", headers={"cache-control": cache_control})
+
+    cache = {"max_bytes": 1024 * 1024}
+    config = GatewayConfig(globalPolicies={"inbound": [{"cache": cache}], "outbound": [{"cache": cache}]})
+    return GatewayMiddleware(app, Gateway(config, default_policy_registry())), served
+
+
+async def get(app: GatewayMiddleware, authorization: Optional[str] = None) -> bytes:
+    headers = {"authorization": authorization} if authorization is not None else {}
+    return (await asgi_request(app, http_scope(headers=headers))).body
+
+
+async def test_responses_to_authorized_requests_are_not_stored():
+    app, served = cached_app("max-age=60")
+
+    assert await get(app, "Bearer alice") == b"response 1"
+    assert await get(app) == b"response 2"
+
+    assert served == ["Bearer alice", None]
+
+
+async def test_authorized_requests_are_not_served_private_entries():
+    app, served = cached_app("max-age=60")
+
+    assert await get(app) == b"response 1"
+    assert await get(app) == b"response 1"
+    assert await get(app, "Bearer alice") == b"response 2"
+
+    assert served == [None, "Bearer alice"]
+
+
+@pytest.mark.parametrize("cache_control", ["public, max-age=60", "s-maxage=60", "max-age=60, must-revalidate"])
+async def test_responses_marked_shareable_are_cached_for_authorized_requests(cache_control):
+    app, served = cached_app(cache_control)
+
+    assert await get(app, "Bearer alice") == b"response 1"
+    assert await get(app, "Bearer bob") == b"response 1"
+    assert await get(app) == b"response 1"
+
+    assert served == ["Bearer alice"]
+
+
+async def test_head_responses_keep_the_upstream_content_length():
+    served = 0
+
+    async def head_app(scope, receive, send):
+        nonlocal served
+        served += 1
+        headers = [(b"content-length", b"1234"), (b"cache-control", b"max-age=60")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+    cache = {"max_bytes": 1024 * 1024}
+    config = GatewayConfig(globalPolicies={"inbound": [{"cache": cache}], "outbound": [{"cache": cache}]})
+    app = GatewayMiddleware(head_app, Gateway(config, default_policy_registry()))
+
+    for _ in range(2):
+        response = await asgi_request(app, http_scope(method="HEAD"))
+        assert (response.header("content-length"), response.body) == ("1234", b"")
+    assert served == 1
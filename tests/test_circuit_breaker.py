@@ -0,0 +1,131 @@
+import pytest
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.policies.circuit_breaker import CircuitBreaker, CircuitBreakerPolicyConfig, CircuitState
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+def breaker(**overrides) -> CircuitBreaker:
+    config = {"minimum_calls": 4, "failure_rate_threshold": 50.0, "open_seconds": 30.0, "half_open_max_calls": 2}
+    return CircuitBreaker(CircuitBreakerPolicyConfig(**{**config, **overrides}))
+
+
+def record(circuit: CircuitBreaker, now: float, *outcomes: bool, duration: float = 0.01) -> None:
+    for failed in outcomes:
+        assert circuit.try_acquire(now)
+        circuit.record(now, failed, duration)
+
+
+def open_circuit(now: float) -> CircuitBreaker:
+    circuit = breaker()
+    record(circuit, now, True, True, True, True)
+    assert circuit.state is CircuitState.OPEN
+    return circuit
+
+
+def test_opens_at_the_failure_rate_threshold():
+    circuit = breaker()
+
+    # Below minimum_calls, failures alone don't open it.
+    record(circuit, 100.0, False, True, False)
+    assert circuit.state is CircuitState.CLOSED
+    # 2 failures out of 4 calls: 50%.
+    record(circuit, 100.0, True)
+    assert circuit.state is CircuitState.OPEN
+    assert circuit.opened_at == 100.0
+
+
+def test_stays_closed_below_the_threshold():
+    circuit = breaker()
+
+    record(circuit, 100.0, False, False, False, True, False)
+
+    assert circuit.state is CircuitState.CLOSED
+
+
+def test_opens_on_slow_calls():
+    circuit = breaker(slow_call_rate_threshold=50.0, slow_call_duration_ms=500.0)
+
+    record(circuit, 100.0, False, False, duration=0.1)
+    record(circuit, 100.0, False, False, duration=0.5)
+
+    assert circuit.state is CircuitState.OPEN
+
+
+def test_failures_leave_the_rolling_window():
+    circuit = breaker()
+
+    record(circuit, 100.0, True, True, True)
+    # The window is 10 seconds: the failures above have slid out of it,
+    # otherwise 4 failures out of 7 calls would open the circuit.
+    record(circuit, 111.0, False, False, False, True)
+
+    assert circuit.state is CircuitState.CLOSED
+
+
+def test_fails_fast_while_open():
+    circuit = open_circuit(100.0)
+
+    assert not circuit.try_acquire(129.9)
+    assert circuit.retry_after(110.0) == pytest.approx(20.0)
+    assert circuit.state is CircuitState.OPEN
+
+
+def test_half_opens_after_the_cooldown_with_limited_probes():
+    circuit = open_circuit(100.0)
+
+    assert circuit.try_acquire(130.0)
+    assert circuit.state is CircuitState.HALF_OPEN
+    assert circuit.try_acquire(130.0)
+    assert not circuit.try_acquire(130.0)
+    # A probe abandoned without an outcome gives its permit back.
+    circuit.release()
+    assert circuit.try_acquire(130.0)
+
+
+def test_half_open_closes_after_successful_probes():
+    circuit = open_circuit(100.0)
+
+    record(circuit, 130.0, False)
+    assert circuit.state is CircuitState.HALF_OPEN
+    record(circuit, 130.0, False)
+
+    assert circuit.state is CircuitState.CLOSED
+    # It starts over with a clean window.
+    record(circuit, 130.0, True, True, True)
+    assert circuit.state is CircuitState.CLOSED
+
+
+def test_half_open_reopens_on_failure():
+    circuit = open_circuit(100.0)
+
+    record(circuit, 130.0, False, True)
+
+    assert circuit.state is CircuitState.OPEN
+    assert circuit.opened_at == 130.0
+    assert not circuit.try_acquire(159.0)
+
+
+async def test_policy_fails_fast_without_calling_the_backend():
+    calls = 0
+
+    async def failing_app(scope, receive, send):
+        nonlocal calls
+        calls += 1
+        await send({"type": "http.response.start", "status": 503, "headers": []})
+        await send({"type": "http.response.body", "body": b"down"})
+
+    breaker_config = {"minimum_calls": 2, "open_seconds": 30.0}
+    config = GatewayConfig(globalPolicies={"backend": [{"circuit_breaker": breaker_config}]})
+    app = GatewayMiddleware(failing_app, Gateway(config, default_policy_registry()))
+
+    for _ in range(2):
+        assert (await asgi_request(app, http_scope())).body == b"down"
+    response = await asgi_request(app, http_scope())
+
+    assert (response.status, response.body) == (503, b"Service unavailable")
+    assert response.header("retry-after") == "30"
+    assert calls == 2
@@ -0,0 +1,159 @@
+import json
+import zlib
+from typing import Optional
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.policies.compression import CompressionPolicy, CompressionPolicyConfig
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+BODY = json.dumps([{"id": index, "name": f"item {index}"} for index in range(200)]).encode()
+
+
+def compression(**config) -> CompressionPolicy:
+    return CompressionPolicy(config=CompressionPolicyConfig(**config))
+
+
+def request(accept_encoding: Optional[str] = "gzip, deflate", method: str = "GET") -> Request:
+    headers = {"accept-encoding": accept_encoding} if accept_encoding is not None else {}
+    return Request(http_scope(method=method, headers=headers))
+
+
+def json_response(body: bytes = BODY, **headers: str) -> Response:
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def streamed(*chunks: bytes, **headers: str) -> StreamingResponse:
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="application/json", headers=headers)
+
+
+async def read(response: StreamingResponse) -> list[bytes]:
+    return [chunk async for chunk in response.body_iterator]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate", "gzip"),
+        ("deflate", "deflate"),
+        ("gzip;q=0.5, deflate", "deflate"),
+        ("DEFLATE;q=0.9, x-gzip;q=0.8", "deflate"),
+        ("x-gzip", "gzip"),
+        ("*", "gzip"),
+        ("*;q=0.1, gzip;q=0", "deflate"),
+        ("gzip;q=0, deflate;q=0", None),
+        ("gzip;q=invalid", None),
+        ("br, identity", None),
+        (None, None),
+    ],
+)
+async def test_accept_encoding_negotiation(accept_encoding, expected):
+    response = await compression().outbound(request(accept_encoding), json_response())
+
+    assert response.headers.get("content-encoding") == expected
+    assert response.headers["vary"] == "Accept-Encoding"
+    if expected is not None:
+        assert zlib.decompress(response.body, WBITS[expected]) == BODY
+
+
+async def test_offered_encodings_are_preferred_in_config_order():
+    response = await compression(encodings=["deflate", "gzip"]).outbound(request("gzip, deflate"), json_response())
+
+    assert response.headers["content-encoding"] == "deflate"
+
+
+async def test_compressed_body_gets_its_length_and_a_weak_etag():
+    response = await compression().outbound(request(), json_response(etag='"v1"', **{"accept-ranges": "bytes"}))
+
+    assert response.headers["content-length"] == str(len(response.body))
+    assert response.headers["etag"] == 'W/"v1"'
+    assert "accept-ranges" not in response.headers
+
+
+async def test_bodies_below_the_minimum_size_are_sent_as_they_are():
+    policy = compression(min_size=1024)
+
+    response = await policy.outbound(request(), json_response(b"{}"))
+    assert "content-encoding" not in response.headers
+    assert response.body == b"{}"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    # Of unknown length: read up to `min_size`, then replayed.
+    response = await policy.outbound(request(), streamed(b"[1,", b"2]"))
+    assert "content-encoding" not in response.headers
+    assert await read(response) == [b"[1,", b"2]"]
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        json_response(**{"content-encoding": "br"}),
+        json_response(**{"cache-control": "public, no-transform"}),
+        Response(BODY, media_type="image/png"),
+        Response(BODY, media_type="video/mp4"),
+        Response(BODY),
+        Response(status_code=204),
+        Response(BODY, status_code=206, media_type="application/json"),
+    ],
+    ids=["encoded", "no-transform", "excluded type", "excluded prefix", "no content type", "no content", "partial"],
+)
+async def test_responses_left_alone(response):
+    headers = list(response.raw_headers)
+
+    assert await compression().outbound(request(), response) is None
+    assert response.raw_headers == headers
+
+
+async def test_head_requests_are_left_alone():
+    assert await compression().outbound(request(method="HEAD"), json_response()) is None
+
+
+async def test_streamed_chunks_are_flushed_as_they_come():
+    chunks = [BODY[:1500], BODY[1500:3000], BODY[3000:]]
+    response = await compression(min_size=1024).outbound(request("deflate"), streamed(*chunks))
+
+    assert "content-length" not in response.headers
+    decompressor = zlib.decompressobj(WBITS["deflate"])
+    decoded = [decompressor.decompress(chunk) for chunk in await read(response)]
+    # Each chunk (the first one peeked at to check `min_size`) decodes on its own.
+    assert decoded[:3] == chunks
+    assert b"".join(decoded) + decompressor.flush() == BODY
+    assert decompressor.eof
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+@pytest.mark.parametrize("thread_offload_bytes", [1, 64 * 1024], ids=["thread pool", "inline"])
+async def test_streamed_body_round_trip_through_the_gateway(encoding, thread_offload_bytes):
+    async def chunked_app(scope, receive, send):
+        headers = [(b"content-type", b"application/json")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        for start in range(0, len(BODY), 1000):
+            await send({"type": "http.response.body", "body": BODY[start:start + 1000], "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    outbound = [{"compression": {"thread_offload_bytes": thread_offload_bytes}}]
+    gateway = Gateway(GatewayConfig(globalPolicies={"outbound": outbound}), default_policy_registry())
+    app = GatewayMiddleware(chunked_app, gateway)
+
+    response = await asgi_request(app, http_scope(headers={"accept-encoding": encoding}))
+
+    assert response.header("content-encoding") == encoding
+    assert response.header("content-length") is None
+    assert zlib.decompress(response.body, WBITS[encoding]) == BODY
+
+
+def test_invalid_config_is_rejected():
+    for config in ({"encodings": ["br"]}, {"encodings": []}, {"level": 0}):
+        with pytest.raises(ValueError):
+            compression(**config)
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.policies.concurrency_limit import ConcurrencyLimitPolicy, ConcurrencyLimitPolicyConfig
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+class HeldApp:
+    """An ASGI app holding each request until `release` is set (failing on /fail)."""
+
+    def __init__(self):
+        self.started: asyncio.Queue = asyncio.Queue()
+        self.release = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        await self.started.put(scope["path"])
+        await self.release.wait()
+        if scope["path"] == "/fail":
+            raise RuntimeError("Backend failure")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+def limited(app: HeldApp, **config) -> tuple[GatewayMiddleware, ConcurrencyLimitPolicy]:
+    gateway_config = GatewayConfig(globalPolicies={"inbound": [{"concurrency_limit": config}]})
+    gateway = Gateway(gateway_config, default_policy_registry())
+    policy = next(policies[0] for key, policies in gateway._generation.policies.items() if key[1] == "concurrency_limit")
+    return GatewayMiddleware(app, gateway), policy
+
+
+def request(app: GatewayMiddleware, path: str = "/") -> asyncio.Task:
+    return asyncio.create_task(asgi_request(app, http_scope(path=path)))
+
+
+async def test_requests_over_the_limit_are_shed():
+    held = HeldApp()
+    app, policy = limited(held, initial_limit=2, max_queue_size=0, retry_after_seconds=3)
+    running = [request(app), request(app)]
+    for _ in running:
+        await asyncio.wait_for(held.started.get(), 5)
+
+    response = await asgi_request(app, http_scope())
+
+    assert (response.status, response.body) == (503, b"Service overloaded")
+    assert response.header("retry-after") == "3"
+    held.release.set()
+    assert [(await task).status for task in running] == [200, 200]
+    assert policy.stats().shed == 1
+
+
+async def test_queued_requests_get_freed_slots_or_time_out():
+    held = HeldApp()
+    app, policy = limited(held, initial_limit=1, max_queue_size=2, queue_timeout_ms=50.0)
+    first = request(app)
+    await asyncio.wait_for(held.started.get(), 5)
+
+    # Nothing frees the slot within the queue timeout.
+    assert (await asgi_request(app, http_scope())).status == 503
+
+    queued = request(app)
+    await asyncio.sleep(0.01)
+    assert policy.stats().queued == 1
+    held.release.set()
+    assert (await first).status == 200
+    assert (await queued).status == 200
+    assert (policy.stats().in_flight, policy.stats().queued) == (0, 0)
+
+
+async def test_slot_is_released_when_the_request_raises():
+    held = HeldApp()
+    held.release.set()
+    app, policy = limited(held, initial_limit=1, max_queue_size=0)
+
+    with pytest.raises(RuntimeError):
+        await asgi_request(app, http_scope(path="/fail"))
+
+    assert policy.stats().in_flight == 0
+    assert (await asgi_request(app, http_scope())).status == 200
+
+
+async def test_slots_are_released_when_requests_are_cancelled():
+    held = HeldApp()
+    app, policy = limited(held, initial_limit=1, max_queue_size=1, queue_timeout_ms=5_000.0)
+    running = request(app)
+    await asyncio.wait_for(held.started.get(), 5)
+    queued = request(app)
+    await asyncio.sleep(0.01)
+    assert (policy.stats().in_flight, policy.stats().queued) == (1, 1)
+
+    for task in (queued, running):
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert (policy.stats().in_flight, policy.stats().queued) == (0, 0)
+    held.release.set()
+    assert (await asgi_request(app, http_scope())).status == 200
+
+
+def sample(policy: ConcurrencyLimitPolicy, now: float, latency: float, in_flight: int) -> int:
+    """Close a sampling window in which `in_flight` requests ran at `latency`; the new limit."""
+    policy._window_max_in_flight = in_flight
+    policy._sample(now, latency)
+    return policy.limit
+
+
+def adaptive(**config) -> ConcurrencyLimitPolicy:
+    defaults = {"initial_limit": 20, "sample_window_ms": 0.0, "min_samples": 1}
+    policy = ConcurrencyLimitPolicy(config=ConcurrencyLimitPolicyConfig(**{**defaults, **config}))
+    # `sample` passes its own timestamps.
+    policy._window_start = 0.0
+    return policy
+
+
+def test_gradient_limit_grows_with_steady_latency_and_shrinks_when_it_rises():
+    policy = adaptive(algorithm="gradient")
+
+    limits = [sample(policy, now, 0.010, in_flight=policy.limit) for now in range(1, 6)]
+    assert limits == sorted(limits) and limits[-1] > 20
+
+    grown = policy.limit
+    limits = [sample(policy, now, 0.040, in_flight=policy.limit) for now in range(6, 11)]
+    assert limits == sorted(limits, reverse=True) and limits[-1] < grown
+
+
+def test_gradient_limit_does_not_grow_unused():
+    policy = adaptive(algorithm="gradient")
+
+    assert sample(policy, 1.0, 0.010, in_flight=2) == 20
+
+
+def test_aimd_limit_grows_additively_and_backs_off_multiplicatively():
+    policy = adaptive(algorithm="aimd", aimd_latency_threshold_ms=100.0, aimd_backoff_ratio=0.5, min_limit=4)
+
+    assert sample(policy, 1.0, 0.010, in_flight=20) == 21
+    assert sample(policy, 2.0, 0.010, in_flight=21) == 22
+    assert sample(policy, 3.0, 0.200, in_flight=22) == 11
+    assert sample(policy, 4.0, 0.200, in_flight=11) == 5
+    assert sample(policy, 5.0, 0.200, in_flight=5) == 4
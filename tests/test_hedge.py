@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.policies.hedge import HedgePolicy
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowFirstApp:
+    """An ASGI app whose first call hangs until cancelled, later calls answer at once."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        call = self.calls
+        if call == 1:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.cancelled.set()
+                raise
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"call %d" % call})
+
+
+def hedged(app, **config) -> tuple[GatewayMiddleware, HedgePolicy]:
+    hedge = {"initial_delay_ms": 20.0, "max_hedge_ratio": 1.0, **config}
+    gateway = Gateway(GatewayConfig(globalPolicies={"backend": [{"hedge": hedge}]}), default_policy_registry())
+    policy = next(policies[0] for key, policies in gateway._generation.policies.items() if key[1] == "hedge")
+    return GatewayMiddleware(app, gateway), policy
+
+
+async def test_slow_call_is_hedged_and_the_loser_cancelled():
+    backend_app = SlowFirstApp()
+    app, policy = hedged(backend_app)
+
+    response = await asyncio.wait_for(asgi_request(app, http_scope()), 5)
+
+    assert response.body == b"call 2"
+    await asyncio.wait_for(backend_app.cancelled.wait(), 5)
+    # The cancelled loser is recorded too, at no less than the hedge delay.
+    latencies = policy._latencies.snapshot()
+    assert latencies.count == 2
+    assert latencies.percentile(100.0) >= 20_000
+
+
+async def test_fast_calls_are_not_hedged():
+    backend_app = SlowFirstApp()
+    backend_app.calls = 1
+    app, policy = hedged(backend_app)
+
+    for _ in range(3):
+        assert (await asgi_request(app, http_scope())).status == 200
+
+    assert backend_app.calls == 4
+    assert policy._latencies.snapshot().count == 3
+
+
+async def test_non_idempotent_requests_are_not_hedged():
+    backend_app = SlowFirstApp()
+    app, _ = hedged(backend_app)
+
+    task = asyncio.create_task(asgi_request(app, http_scope("POST")))
+    await asyncio.sleep(0.1)
+
+    assert backend_app.calls == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_hedges_are_limited_by_the_budget():
+    backend_app = SlowFirstApp()
+    app, _ = hedged(backend_app, max_hedge_ratio=0.05, max_hedge_burst=0.0)
+
+    task = asyncio.create_task(asgi_request(app, http_scope()))
+    await asyncio.sleep(0.1)
+
+    assert backend_app.calls == 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
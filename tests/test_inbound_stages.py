@@ -0,0 +1,127 @@
+import asyncio
+from dataclasses import dataclass
+from typing import ClassVar, Optional
+
+import pytest
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.core.types import BasePolicy
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+class ProbeConfig(BaseModel):
+    name: str
+    delay: float = 0.0
+    # Answer with this status, or raise, once `delay` is over.
+    status: Optional[int] = None
+    raises: bool = False
+
+
+@dataclass
+class ProbePolicy(BasePolicy[ProbeConfig]):
+    """An inbound policy recording how each of its calls ended in `events`."""
+    events: ClassVar[list[tuple[str, str]]] = []
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        try:
+            await asyncio.sleep(self.config.delay)
+        except asyncio.CancelledError:
+            self.events.append((self.config.name, "cancelled"))
+            raise
+        self.events.append((self.config.name, "done"))
+        if self.config.raises:
+            raise RuntimeError(self.config.name)
+        if self.config.status is not None:
+            return Response(self.config.name, status_code=self.config.status)
+        return None
+
+
+@dataclass
+class StatefulProbePolicy(ProbePolicy):
+    mutates_request_state: ClassVar[bool] = True
+
+
+def gateway(*inbound: dict) -> Gateway:
+    registry = default_policy_registry()
+    registry.register("probe", ProbePolicy)
+    registry.register("stateful_probe", StatefulProbePolicy)
+    ProbePolicy.events.clear()
+    return Gateway(GatewayConfig(globalPolicies={"inbound": list(inbound)}, metrics={"enabled": False}), registry)
+
+
+def probe(name: str, **config) -> dict:
+    return {"probe": {"name": name, **config}, "independent": True}
+
+
+def stages(gateway: Gateway) -> list[list[str]]:
+    return [[policy.config.name for policy in stage] for stage in gateway._pipeline.inbound_stages]
+
+
+async def test_earliest_policy_in_config_order_wins_over_a_faster_one():
+    app = GatewayMiddleware(None, gateway(probe("slow", delay=0.05, status=401), probe("fast", status=429)))
+
+    response = await asgi_request(app, http_scope())
+
+    assert (response.status, response.body) == (401, b"slow")
+    assert ProbePolicy.events == [("fast", "done"), ("slow", "done")]
+
+
+async def test_policies_after_a_rejection_are_cancelled():
+    app = GatewayMiddleware(None, gateway(probe("reject", status=403), probe("slow", delay=5.0)))
+
+    response = await asyncio.wait_for(asgi_request(app, http_scope()), 1)
+
+    assert (response.status, response.body) == (403, b"reject")
+    assert ProbePolicy.events == [("reject", "done"), ("slow", "cancelled")]
+
+
+async def test_earliest_exception_in_config_order_is_raised():
+    app = GatewayMiddleware(None, gateway(probe("first", delay=0.05, raises=True), probe("second", raises=True)))
+
+    with pytest.raises(RuntimeError, match="first"):
+        await asgi_request(app, http_scope())
+
+
+async def test_requests_pass_when_no_policy_of_the_stage_answers():
+    async def ok_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"app"})
+
+    app = GatewayMiddleware(ok_app, gateway(probe("a", delay=0.01), probe("b")))
+
+    assert (await asgi_request(app, http_scope())).body == b"app"
+    assert sorted(ProbePolicy.events) == [("a", "done"), ("b", "done")]
+
+
+def test_policies_run_in_order_unless_marked_independent():
+    plain = {"probe": {"name": "plain"}}
+
+    assert stages(gateway(plain, probe("a"), probe("b"), {"probe": {"name": "c"}})) == [["plain"], ["a", "b"], ["c"]]
+
+
+def test_depends_on_puts_a_policy_after_its_dependencies():
+    built = gateway(
+        {**probe("a"), "id": "a"},
+        {**probe("b"), "id": "b"},
+        {"probe": {"name": "c"}, "id": "c", "dependsOn": ["a"]},
+        {"probe": {"name": "d"}, "dependsOn": ["c"]},
+    )
+
+    assert stages(built) == [["a", "b"], ["c"], ["d"]]
+
+
+def test_policies_mutating_request_state_run_alone():
+    built = gateway(probe("a"), {"stateful_probe": {"name": "state"}, "independent": True}, probe("b"))
+
+    assert stages(built) == [["a"], ["state"], ["b"]]
+
+
+def test_unknown_dependencies_are_rejected():
+    with pytest.raises(ValueError):
+        gateway({"probe": {"name": "a"}, "dependsOn": ["later"]}, {**probe("b"), "id": "later"})
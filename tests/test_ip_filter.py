@@ -0,0 +1,151 @@
+import ipaddress
+import random
+from typing import Optional
+
+import pytest
+from starlette.requests import Request
+
+from fastapigate.ipfilter import IPTable, PrefixTrie, parse_address
+from fastapigate.policies.ip_filter import IPFilterPolicy, IPFilterPolicyConfig
+from fastapigate.testing import http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+def network(text: str) -> tuple[int, int]:
+    parsed = ipaddress.ip_network(text)
+    return int(parsed.network_address), parsed.prefixlen
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [("10.1.2.3", "host"), ("10.1.2.4", "/16"), ("10.2.0.1", "/8"), ("11.0.0.1", None)],
+)
+def test_ipv4_longest_prefix_match(address, expected):
+    trie: PrefixTrie[str] = PrefixTrie(32)
+    for text, value in (("10.0.0.0/8", "/8"), ("10.1.0.0/16", "/16"), ("10.1.2.3/32", "host")):
+        trie.insert(*network(text), value)
+
+    assert trie.longest_match(int(ipaddress.ip_address(address))) == expected
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [("2001:db8::1", "/48"), ("2001:db8:0:1::1", "/64"), ("2001:db9::1", "/16"), ("::1", "default")],
+)
+def test_ipv6_longest_prefix_match(address, expected):
+    trie: PrefixTrie[str] = PrefixTrie(128)
+    for text, value in (("::/0", "default"), ("2001::/16", "/16"), ("2001:db8::/48", "/48"), ("2001:db8:0:1::/64", "/64")):
+        trie.insert(*network(text), value)
+
+    assert trie.longest_match(int(ipaddress.ip_address(address))) == expected
+
+
+@pytest.mark.parametrize("bits", [32, 128])
+def test_matches_a_linear_scan_of_random_prefixes(bits):
+    rng = random.Random(bits)
+    prefixes = {}
+    trie: PrefixTrie[int] = PrefixTrie(bits)
+    for value in range(500):
+        length = rng.randint(0, bits)
+        prefix = rng.getrandbits(bits) >> (bits - length) << (bits - length) if length else 0
+        prefixes[prefix, length] = value
+        trie.insert(prefix, length, value)
+
+    def scan(key: int) -> Optional[int]:
+        best = None
+        for (prefix, length), value in prefixes.items():
+            if key >> (bits - length) == prefix >> (bits - length) and (best is None or length > best[0]):
+                best = (length, value)
+        return best[1] if best else None
+
+    # Keys close to the prefixes, so that most of them match something.
+    for prefix, length in list(prefixes)[:200]:
+        key = prefix | rng.getrandbits(bits - length) if length < bits else prefix
+        assert trie.longest_match(key) == scan(key)
+    assert len(trie) == len(prefixes)
+    assert sorted((prefix, length) for prefix, length, _ in trie.items()) == sorted(prefixes)
+
+
+def test_reinserting_a_prefix_replaces_its_value():
+    trie: PrefixTrie[str] = PrefixTrie(32)
+    trie.insert(*network("10.0.0.0/8"), "old")
+    trie.insert(*network("10.0.0.0/8"), "new")
+
+    assert len(trie) == 1
+    assert trie.longest_match(int(ipaddress.ip_address("10.0.0.1"))) == "new"
+
+
+def test_table_matches_ipv4_and_ipv6_and_rejects_invalid_networks():
+    table = IPTable([("192.0.2.0/24", "v4"), ("2001:db8::/32", "v6"), ("::ffff:198.51.100.0/120", "mapped")])
+
+    assert table.get("192.0.2.7") == "v4"
+    assert table.get("2001:db8::7") == "v6"
+    # IPv4-mapped IPv6 addresses and networks match as IPv4.
+    assert table.get("::ffff:192.0.2.7") == "v4"
+    assert table.get("198.51.100.9") == "mapped"
+    assert table.get("not an address") is None
+    for invalid in ("192.0.2.0/33", "192.0.2.0/x", "example.com"):
+        with pytest.raises(ValueError):
+            table.add(invalid, "invalid")
+
+
+@pytest.mark.parametrize(
+    "host, address",
+    [
+        ("192.0.2.1", "192.0.2.1"),
+        ("192.0.2.1:8080", "192.0.2.1"),
+        ("[2001:db8::1]:443", "2001:db8::1"),
+        ("fe80::1%eth0", "fe80::1"),
+    ],
+)
+def test_addresses_are_parsed_from_hosts(host, address):
+    parsed = ipaddress.ip_address(address)
+    assert parse_address(host) == (parsed.max_prefixlen, int(parsed))
+
+
+async def allowed(policy: IPFilterPolicy, client: str, forwarded_for: Optional[str] = None) -> bool:
+    headers = {"x-forwarded-for": forwarded_for} if forwarded_for is not None else {}
+    response = await policy.inbound(Request(http_scope(headers=headers, client=client)))
+    return response is None
+
+
+def ip_filter(**config) -> IPFilterPolicy:
+    return IPFilterPolicy(config=IPFilterPolicyConfig(**config))
+
+
+async def test_most_specific_network_decides_and_deny_wins_ties():
+    policy = ip_filter(allow=["10.1.0.0/16", "10.9.9.9"], deny=["10.0.0.0/8", "10.1.2.0/24", "10.9.9.9"])
+
+    assert not await allowed(policy, "10.2.0.1")
+    assert await allowed(policy, "10.1.0.1")
+    assert not await allowed(policy, "10.1.2.1")
+    assert not await allowed(policy, "10.9.9.9")
+    assert await allowed(policy, "192.0.2.1")
+
+
+async def test_default_action_applies_to_unlisted_and_unknown_clients():
+    policy = ip_filter(allow=["192.0.2.0/24"], default_action="deny")
+
+    assert await allowed(policy, "192.0.2.1")
+    assert not await allowed(policy, "198.51.100.1")
+    assert not await allowed(policy, "unknown")
+
+
+async def test_forwarded_header_is_ignored_from_untrusted_peers():
+    policy = ip_filter(deny=["203.0.113.0/24"], trusted_proxies=["10.0.0.0/8"])
+
+    # A denied client can't pass by claiming another address.
+    assert not await allowed(policy, "203.0.113.5", forwarded_for="192.0.2.1")
+    # Nor can an allowed client get someone else denied.
+    assert await allowed(policy, "192.0.2.1", forwarded_for="203.0.113.5")
+
+
+async def test_client_is_the_rightmost_untrusted_hop_behind_trusted_proxies():
+    policy = ip_filter(deny=["203.0.113.0/24"], trusted_proxies=["10.0.0.0/8"])
+
+    assert not await allowed(policy, "10.0.0.1", forwarded_for="203.0.113.5")
+    assert not await allowed(policy, "10.0.0.1", forwarded_for="203.0.113.5, 10.0.0.2")
+    # Entries the client itself sent, left of the hop the proxies appended, are spoofable.
+    assert await allowed(policy, "10.0.0.1", forwarded_for="203.0.113.5, 192.0.2.1")
+    assert not await allowed(policy, "10.0.0.1", forwarded_for="192.0.2.1, 203.0.113.5, 10.0.0.2")
@@ -0,0 +1,67 @@
+import json
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import PyJWKClientError
+
+from fastapigate.auth.jwks import AsyncJWKSClient
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeJWKSClient(AsyncJWKSClient):
+    """Serves `jwks` (or raises `error`) instead of fetching `url`, counting the fetches."""
+
+    def __init__(self, jwks=None, error=None, **kwargs):
+        super().__init__("https://issuer.test/.well-known/jwks.json", **kwargs)
+        self.jwks = jwks
+        self.error = error
+        self.fetches = 0
+
+    def _fetch(self):
+        self.fetches += 1
+        if self.error is not None:
+            raise self.error
+        return self.jwks
+
+
+def jwks(kid: str) -> dict:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key()
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key))
+    jwk.update(kid=kid, use="sig", alg="RS256")
+    return {"keys": [jwk]}
+
+
+async def test_unknown_kids_are_fetched_at_most_once_per_interval():
+    client = FakeJWKSClient(jwks("known"), min_refetch_interval=60.0)
+
+    assert (await client.get_signing_key("known")).key_id == "known"
+    for _ in range(3):
+        with pytest.raises(PyJWKClientError):
+            await client.get_signing_key("bogus")
+
+    assert client.fetches == 1
+
+
+async def test_failing_endpoint_is_not_refetched_on_every_request():
+    client = FakeJWKSClient(error=OSError("connection refused"), min_refetch_interval=60.0)
+
+    with pytest.raises(OSError):
+        await client.get_signing_key("known")
+    for _ in range(3):
+        with pytest.raises(PyJWKClientError):
+            await client.get_signing_key("known")
+
+    assert client.fetches == 1
+
+
+async def test_failing_endpoint_is_retried_after_the_interval():
+    client = FakeJWKSClient(error=OSError("connection refused"), min_refetch_interval=0.0)
+
+    with pytest.raises(OSError):
+        await client.get_signing_key("known")
+    client.error, client.jwks = None, jwks("known")
+
+    assert (await client.get_signing_key("known")).key_id == "known"
+    assert client.fetches == 2
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.core.metrics import PROMETHEUS_CONTENT_TYPE
+from fastapigate.core.types import BasePolicy
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+class App:
+    """An ASGI app counting its calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"app"})
+
+
+def metrics_gateway(app: App) -> GatewayMiddleware:
+    config = GatewayConfig(
+        globalPolicies={"inbound": [{"ip_filter": {"deny": ["192.0.2.0/24"]}}]},
+        metrics={"path": "/metrics"},
+    )
+    return GatewayMiddleware(app, Gateway(config, default_policy_registry()))
+
+
+async def test_metrics_are_served_behind_the_inbound_policies():
+    backend_app = App()
+    app = metrics_gateway(backend_app)
+
+    response = await asgi_request(app, http_scope(path="/metrics", client="192.0.2.1"))
+    assert response.status == 403
+    assert b"ip_filter" not in response.body
+
+    response = await asgi_request(app, http_scope(path="/metrics", client="198.51.100.1"))
+    assert response.status == 200
+    assert response.header("content-type") == PROMETHEUS_CONTENT_TYPE
+    assert b'policy="ip_filter"' in response.body
+    # The metrics path never reaches the app.
+    assert backend_app.calls == 0
+
+
+async def test_metrics_path_is_opt_in():
+    backend_app = App()
+    config = GatewayConfig(globalPolicies={"inbound": [{"ip_filter": {"deny": ["192.0.2.0/24"]}}]})
+    app = GatewayMiddleware(backend_app, Gateway(config, default_policy_registry()))
+
+    response = await asgi_request(app, http_scope(path="/metrics", client="198.51.100.1"))
+    assert (response.status, response.body) == (200, b"app")
+
+
+
+class FailingPolicyConfig(BaseModel):
+    pass
+
+
+@dataclass
+class FailingPolicy(BasePolicy[FailingPolicyConfig]):
+    """An inbound policy raising on requests with an `x-fail` header."""
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        if "x-fail" in request.headers:
+            raise RuntimeError("Policy failure")
+        return None
+
+
+async def test_policy_calls_responses_and_errors_are_recorded():
+    registry = default_policy_registry()
+    registry.register("failing", FailingPolicy)
+    config = GatewayConfig(globalPolicies={"inbound": [{"ip_filter": {"deny": ["192.0.2.0/24"]}}, {"failing": {}}]})
+    gateway = Gateway(config, registry)
+    app = GatewayMiddleware(App(), gateway)
+
+    await asgi_request(app, http_scope(client="198.51.100.1"))
+    await asgi_request(app, http_scope(client="192.0.2.1"))
+    with pytest.raises(RuntimeError):
+        await asgi_request(app, http_scope(headers={"x-fail": "1"}, client="198.51.100.1"))
+
+    snapshot = gateway.metrics.snapshot()
+    ip_filter, failing = snapshot["ip_filter"]["inbound"], snapshot["failing"]["inbound"]
+    assert (ip_filter["calls"], ip_filter["short_circuits"], ip_filter["responses"]) == (3, 1, {403: 1})
+    assert (failing["calls"], failing["errors"]) == (2, 1)
+    gateway.metrics.reset()
+    assert gateway.metrics.snapshot()["ip_filter"]["inbound"]["calls"] == 0
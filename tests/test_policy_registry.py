@@ -0,0 +1,141 @@
+import importlib.metadata
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from fastapigate.core.policy import ENTRY_POINT_GROUP, PolicyRegistry
+
+POLICY_MODULE = """
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+from fastapigate.core.types import BasePolicy
+
+
+class LazyConfig(BaseModel):
+    pass
+
+
+@dataclass
+class LazyPolicy(BasePolicy[LazyConfig]):
+    pass
+"""
+
+
+@pytest.fixture
+def policy_module(tmp_path, monkeypatch) -> str:
+    """The name of an importable, not yet imported module defining `LazyPolicy`."""
+    (tmp_path / "lazy_policies.py").write_text(POLICY_MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "lazy_policies"
+    sys.modules.pop("lazy_policies", None)
+
+
+def with_entry_points(monkeypatch, *entry_points: importlib.metadata.EntryPoint) -> list[str]:
+    """Make `entry_points()` return `entry_points`; the groups it was asked for."""
+    groups = []
+
+    def fake_entry_points(group: str):
+        groups.append(group)
+        return [entry_point for entry_point in entry_points if entry_point.group == group]
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", fake_entry_points)
+    return groups
+
+
+def test_import_paths_are_imported_on_first_use(policy_module):
+    registry = PolicyRegistry()
+    registry.register("lazy", f"{policy_module}:LazyPolicy")
+
+    assert registry.ids() == ["lazy"]
+    assert policy_module not in sys.modules
+    policy_class = registry.get("lazy")
+    assert policy_class is sys.modules[policy_module].LazyPolicy
+    assert registry.get("lazy") is policy_class
+
+
+def test_default_registry_imports_no_policy_module():
+    code = textwrap.dedent(
+        """
+        import sys
+        from fastapigate.default_policy_registry import default_policy_registry
+
+        registry = default_policy_registry()
+        registry.ids()
+        registry.get("rate_limit")
+        print(sorted(name for name in sys.modules if name.startswith("fastapigate.policies.")))
+        """
+    )
+    # A fresh interpreter, as other tests have imported the policy modules.
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+    assert output.strip() == "['fastapigate.policies.rate_limit']"
+
+
+def test_entry_points_are_scanned_for_unknown_ids_only(policy_module, monkeypatch):
+    entry_point = importlib.metadata.EntryPoint("lazy", f"{policy_module}:LazyPolicy", ENTRY_POINT_GROUP)
+    other_group = importlib.metadata.EntryPoint("other", f"{policy_module}:LazyPolicy", "other.group")
+    groups = with_entry_points(monkeypatch, entry_point, other_group)
+    registry = PolicyRegistry(entry_point_group=ENTRY_POINT_GROUP)
+    registry.register("known", object)
+
+    registry.get("known")
+    assert groups == []
+    assert policy_module not in sys.modules
+
+    assert registry.get("lazy") is sys.modules[policy_module].LazyPolicy
+    assert groups == [ENTRY_POINT_GROUP]
+    assert registry.ids() == ["known", "lazy"]
+    with pytest.raises(ValueError, match="Unknown policy id: other"):
+        registry.get("other")
+    # Scanned once.
+    assert groups == [ENTRY_POINT_GROUP]
+
+
+def test_registered_ids_win_over_entry_points(policy_module, monkeypatch):
+    class Registered:
+        pass
+
+    with_entry_points(monkeypatch, importlib.metadata.EntryPoint("lazy", f"{policy_module}:LazyPolicy", ENTRY_POINT_GROUP))
+    registry = PolicyRegistry(entry_point_group=ENTRY_POINT_GROUP)
+    registry.register("lazy", Registered)
+
+    with pytest.raises(ValueError):
+        registry.get("missing")
+    assert registry.get("lazy") is Registered
+
+
+@pytest.mark.parametrize(
+    "path, message",
+    [
+        ("no_such_module_for_fastapigate:Policy", "No module named 'no_such_module_for_fastapigate'"),
+        ("lazy_policies:MissingPolicy", "has no attribute 'MissingPolicy'"),
+    ],
+)
+def test_bad_import_paths_name_the_policy(policy_module, path, message):
+    registry = PolicyRegistry()
+    registry.register("broken", path)
+
+    with pytest.raises(ValueError, match=f"Policy broken could not be loaded from {path}: .*{message}"):
+        registry.get("broken")
+
+
+def test_bad_entry_points_name_the_policy(monkeypatch):
+    with_entry_points(monkeypatch, importlib.metadata.EntryPoint("broken", "no_such_module_for_fastapigate:Policy", ENTRY_POINT_GROUP))
+    registry = PolicyRegistry(entry_point_group=ENTRY_POINT_GROUP)
+
+    with pytest.raises(ValueError, match="Policy broken could not be loaded from entry point no_such_module_for_fastapigate:Policy"):
+        registry.get("broken")
+
+
+def test_import_paths_need_a_class_name():
+    registry = PolicyRegistry()
+    registry.register("broken", "fastapigate.policies.rate_limit")
+
+    with pytest.raises(ValueError, match="not of the form 'package.module:ClassName'"):
+        registry.get("broken")
@@ -0,0 +1,163 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.proxy import Origin
+from fastapigate.testing import UpstreamServer, asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+@dataclass
+class Backend:
+    """The upstream app, and what the tests observe of it or feed it."""
+    app: FastAPI = field(default_factory=FastAPI)
+    # Request body chunks as the upstream reads them.
+    uploaded: asyncio.Queue = field(default_factory=asyncio.Queue)
+    # Lets the upstream send the rest of the /download body.
+    release_download: asyncio.Event = field(default_factory=asyncio.Event)
+    flaky_bodies: list[bytes] = field(default_factory=list)
+
+    def __post_init__(self):
+        app = self.app
+
+        @app.post("/upload")
+        async def upload(request: Request):
+            size = 0
+            async for chunk in request.stream():
+                if chunk:
+                    size += len(chunk)
+                    await self.uploaded.put(chunk)
+            return {"size": size}
+
+        @app.get("/download")
+        async def download():
+            async def body():
+                yield b"first"
+                await self.release_download.wait()
+                yield b"rest"
+
+            return StreamingResponse(body())
+
+        @app.get("/hello")
+        async def hello():
+            return {"hello": "world"}
+
+        @app.get("/body-size")
+        async def body_size(request: Request):
+            return {"size": len(await request.body())}
+
+        @app.post("/flaky")
+        async def flaky(request: Request):
+            self.flaky_bodies.append(await request.body())
+            if len(self.flaky_bodies) == 1:
+                return Response(status_code=503)
+            return Response(self.flaky_bodies[-1])
+
+
+def gateway(url: str, backend: Optional[list] = None) -> GatewayMiddleware:
+    proxy = {"proxy": {"url": url, "connect_timeout_seconds": 1.0}}
+    config = GatewayConfig(globalPolicies={"backend": [*(backend or []), proxy], "onError": [proxy]})
+    return GatewayMiddleware(FastAPI(), Gateway(config, default_policy_registry()))
+
+
+async def call(app: GatewayMiddleware, method: str, path: str, body: bytes = b"") -> tuple[int, bytes]:
+    headers = {"content-length": str(len(body))} if body else {}
+    response = await asgi_request(app, http_scope(method, path, headers), body)
+    return response.status, response.body
+
+
+async def test_request_body_is_streamed():
+    backend = Backend()
+    async with UpstreamServer(backend.app) as server:
+        app = gateway(server.url)
+        received: asyncio.Queue = asyncio.Queue()
+        sent: list[dict] = []
+
+        async def send(message):
+            sent.append(message)
+
+        exchange = asyncio.create_task(app(http_scope("POST", "/upload", {"transfer-encoding": "chunked"}), received.get, send))
+
+        # Each chunk reaches the upstream before the client sends the next one.
+        for index in range(3):
+            chunk = b"chunk %d" % index
+            await received.put({"type": "http.request", "body": chunk, "more_body": True})
+            assert await asyncio.wait_for(backend.uploaded.get(), 5) == chunk
+        await received.put({"type": "http.request", "body": b"", "more_body": False})
+        await asyncio.wait_for(exchange, 5)
+
+        assert sent[0]["status"] == 200
+        assert b"".join(message.get("body", b"") for message in sent[1:]) == b'{"size":21}'
+
+
+async def test_response_body_is_streamed():
+    backend = Backend()
+    async with UpstreamServer(backend.app) as server:
+        app = gateway(server.url)
+        received: asyncio.Queue = asyncio.Queue()
+        sent: asyncio.Queue = asyncio.Queue()
+        await received.put({"type": "http.request", "body": b"", "more_body": False})
+        exchange = asyncio.create_task(app(http_scope("GET", "/download"), received.get, sent.put))
+
+        # The client gets the first chunk while the upstream holds back the rest.
+        assert (await asyncio.wait_for(sent.get(), 5))["status"] == 200
+        assert (await asyncio.wait_for(sent.get(), 5))["body"] == b"first"
+        backend.release_download.set()
+        body = b""
+        while True:
+            message = await asyncio.wait_for(sent.get(), 5)
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        await asyncio.wait_for(exchange, 5)
+
+        assert body == b"rest"
+
+
+async def test_connections_are_reused():
+    backend = Backend()
+    async with UpstreamServer(backend.app) as server:
+        app = gateway(server.url)
+        for _ in range(5):
+            assert await call(app, "GET", "/hello") == (200, b'{"hello":"world"}')
+
+        proxy = app.gateway._generation.policies[next(iter(app.gateway._generation.policies))][0]
+        stats = proxy.client.pool(Origin.from_url(server.url)).stats
+        assert (server.connections, server.requests) == (1, 5)
+        assert (stats.connects, stats.reuses) == (1, 4)
+
+
+async def test_upstream_reads_empty_bodies():
+    backend = Backend()
+    async with UpstreamServer(backend.app) as server:
+        app = gateway(server.url)
+
+        status, body = await asyncio.wait_for(call(app, "GET", "/body-size"), 5)
+
+        assert (status, body) == (200, b'{"size":0}')
+
+
+async def test_retries_replay_the_request_body():
+    backend = Backend()
+    async with UpstreamServer(backend.app) as server:
+        app = gateway(server.url, backend=[{"retry": {"max_attempts": 2, "backoff_seconds": 0.0}}])
+
+        assert await call(app, "POST", "/flaky", b"payload") == (200, b"payload")
+        assert backend.flaky_bodies == [b"payload", b"payload"]
+
+
+async def test_unreachable_upstream_is_a_bad_gateway():
+    server = await UpstreamServer(Backend().app).start()
+    await server.stop()
+    app = gateway(server.url)
+
+    status, _ = await call(app, "GET", "/hello")
+
+    assert status == 502
@@ -0,0 +1,113 @@
+import pytest
+
+from fastapigate.ratelimit import GCRA, MemoryStore, RateLimiter, SlidingWindowCounter, SlidingWindowLog, create_algorithm
+
+
+class Clock:
+    """A clock moved by hand."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def admitted(limiter: RateLimiter, hits: int, key: str = "key") -> int:
+    return sum(limiter.hit(key).allowed for _ in range(hits))
+
+
+def test_gcra_admits_the_burst_then_spaces_requests():
+    clock = Clock(1000.0)
+    limiter = RateLimiter(GCRA(4, 60.0), clock=clock)
+
+    assert admitted(limiter, 4) == 4
+    decision = limiter.hit("key")
+    assert not decision.allowed
+    assert decision.retry_after == pytest.approx(15.0)
+
+    # One emission interval later, exactly one more request fits.
+    clock.now += 15.0
+    assert admitted(limiter, 2) == 1
+    assert limiter.hit("key").retry_after == pytest.approx(15.0)
+
+    # A full window refills the whole burst.
+    clock.now += 60.0
+    assert admitted(limiter, 5) == 4
+
+
+def test_gcra_burst_is_configurable():
+    clock = Clock(1000.0)
+    limiter = RateLimiter(GCRA(4, 60.0, burst=1), clock=clock)
+
+    assert limiter.hit("key").allowed
+    assert limiter.hit("key").retry_after == pytest.approx(15.0)
+    clock.now += 14.0
+    assert limiter.hit("key").retry_after == pytest.approx(1.0)
+    clock.now += 1.0
+    assert limiter.hit("key").allowed
+
+
+def test_sliding_window_counter_weights_the_previous_window():
+    clock = Clock(1200.0)  # The start of a window.
+    limiter = RateLimiter(SlidingWindowCounter(4, 60.0), clock=clock)
+
+    assert admitted(limiter, 4) == 4
+    assert limiter.hit("key").retry_after == pytest.approx(60.0)
+    clock.now += 30.0
+    assert limiter.hit("key").retry_after == pytest.approx(30.0)
+
+    # Half-way through the next window the previous one still counts for half: 4 * 0.5 + 2 = 4.
+    clock.now += 60.0
+    assert admitted(limiter, 3) == 2
+    # Its weight has dropped to 0.25 (one request) 15 seconds later.
+    assert limiter.hit("key").retry_after == pytest.approx(15.0)
+    clock.now += 15.0
+    assert admitted(limiter, 2) == 1
+
+
+def test_sliding_window_log_is_exact():
+    clock = Clock(0.0)
+    limiter = RateLimiter(SlidingWindowLog(3, 10.0), clock=clock)
+
+    for now in (0.0, 1.0, 2.0):
+        clock.now = now
+        assert limiter.hit("key").allowed
+    clock.now = 3.0
+    assert limiter.hit("key").retry_after == pytest.approx(7.0)
+
+    # The request of t=0 leaves the window at t=10, the one of t=1 at t=11.
+    clock.now = 10.0
+    assert limiter.hit("key").allowed
+    clock.now = 10.5
+    assert limiter.hit("key").retry_after == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("algorithm", [GCRA(2, 60.0), SlidingWindowCounter(2, 60.0), SlidingWindowLog(2, 60.0)])
+def test_keys_are_limited_independently(algorithm):
+    limiter = RateLimiter(algorithm, clock=Clock(1200.0))
+
+    assert admitted(limiter, 3, "a") == 2
+    assert admitted(limiter, 3, "b") == 2
+
+
+def test_memory_store_is_bounded_and_drops_expired_keys():
+    clock = Clock(1000.0)
+    store = MemoryStore(max_keys=3)
+    limiter = RateLimiter(GCRA(1, 1.0), store, clock=clock)
+
+    for key in "abcd":
+        limiter.hit(key)
+    assert len(store) == 3
+    # The least recently used key was evicted: it starts afresh.
+    assert limiter.hit("a").allowed
+
+    # Once their state expires, idle keys are swept as other keys are hit.
+    clock.now += 10.0
+    limiter.hit("e")
+    assert len(store) == 1
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        create_algorithm("leaky_bucket", 10, 60.0)
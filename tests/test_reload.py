@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.core.reload import ConfigReloader
+from fastapigate.core.types import BasePolicy
+from fastapigate.default_policy_registry import default_policy_registry
+
+pytestmark = pytest.mark.anyio
+
+
+class ProbeConfig(BaseModel):
+    name: str = ""
+
+
+@dataclass
+class ProbePolicy(BasePolicy[ProbeConfig]):
+    """An inbound policy recording the thread each instance was built on."""
+    built_on = []
+
+    def __post_init__(self):
+        self.built_on.append(threading.current_thread())
+
+    async def inbound(self, request: Request) -> Optional[Response]:
+        return None
+
+
+def reloader(tmp_path, interval: Optional[float] = None) -> ConfigReloader:
+    path = tmp_path / "gateway.yaml"
+    path.write_text("globalPolicies:\n  inbound:\n    - probe: {name: first}\n")
+    registry = default_policy_registry()
+    registry.register("probe", ProbePolicy)
+    gateway = Gateway(GatewayConfig.from_file(str(path)), registry)
+    return ConfigReloader(gateway, str(path), interval=interval, reload_signal=None)
+
+
+async def test_config_is_built_off_the_event_loop(tmp_path):
+    config_reloader = reloader(tmp_path)
+    ProbePolicy.built_on.clear()
+    (tmp_path / "gateway.yaml").write_text("globalPolicies:\n  inbound:\n    - probe: {name: second}\n")
+
+    assert await config_reloader.reload()
+
+    assert len(ProbePolicy.built_on) == 1
+    assert ProbePolicy.built_on[0] is not threading.current_thread()
+    policies = config_reloader.gateway._generation.policies
+    assert [key[2] for key in policies] == ['{"name": "second"}']
+
+
+async def test_unchanged_or_invalid_config_is_not_installed(tmp_path):
+    config_reloader = reloader(tmp_path)
+    generation = config_reloader.gateway._generation
+
+    assert not await config_reloader.reload()
+    (tmp_path / "gateway.yaml").write_text("globalPolicies:\n  inbound:\n    - unknown_policy: {}\n")
+    assert not await config_reloader.reload()
+
+    assert config_reloader.gateway._generation is generation
+
+
+async def test_reloader_stops_on_lifespan_shutdown(tmp_path):
+    config_reloader = reloader(tmp_path, interval=0.01)
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            await send({"type": f"{message['type']}.complete"})
+            if message["type"] == "lifespan.shutdown":
+                return
+
+    middleware = GatewayMiddleware(app, config_reloader.gateway, config_reloader)
+    received = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        message = received.pop(0)
+        if message["type"] == "lifespan.shutdown":
+            assert config_reloader.started
+        return message
+
+    async def send(message):
+        sent.append(message["type"])
+
+    await asyncio.wait_for(middleware({"type": "lifespan"}, receive, send), 5)
+
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert not config_reloader.started
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from fastapigate.ratelimit import LeasingRateLimiter, MemoryStore, RateLimiter, RespConnection, SlidingWindowCounter
+from fastapigate.testing import FakeRespServer
+
+pytestmark = pytest.mark.anyio
+
+
+class CountingConnection(RespConnection):
+    """Counts pipelines (round trips), optionally delaying the first `slow` of them."""
+
+    def __init__(self, url: str, slow: int = 0, delay: float = 0.05):
+        super().__init__(url, timeout=1.0)
+        self.pipelines: list[list[tuple]] = []
+        self.slow = slow
+        self.delay = delay
+
+    async def pipeline(self, commands: list[tuple]) -> list:
+        self.pipelines.append(commands)
+        if len(self.pipelines) <= self.slow:
+            await asyncio.sleep(self.delay)
+        return await super().pipeline(commands)
+
+
+def leasing_limiter(connection: RespConnection, limit: int = 100, lease_tokens: int = 10, fallback_limit: int = 3) -> LeasingRateLimiter:
+    fallback = RateLimiter(SlidingWindowCounter(fallback_limit, 60.0), MemoryStore())
+    return LeasingRateLimiter(connection, limit, 60.0, fallback, lease_tokens=lease_tokens, retry_interval=60.0)
+
+
+async def test_tokens_are_spent_from_a_local_lease():
+    async with FakeRespServer() as server:
+        connection = CountingConnection(server.url)
+        limiter = leasing_limiter(connection, lease_tokens=10)
+        decisions = [await limiter.acquire("a") for _ in range(10)]
+        assert all(decision.allowed for decision in decisions)
+        assert len(connection.pipelines) == 1
+        await limiter.acquire("a")
+        assert len(connection.pipelines) == 2
+        connection.close()
+
+
+async def test_keys_running_dry_together_share_one_pipeline():
+    async with FakeRespServer() as server:
+        connection = CountingConnection(server.url)
+        limiter = leasing_limiter(connection)
+        decisions = await asyncio.gather(*(limiter.acquire(key) for key in "abcde" for _ in range(3)))
+        assert all(decision.allowed for decision in decisions)
+        assert len(connection.pipelines) == 1
+        assert len(connection.pipelines[0]) == 3 * 5
+        connection.close()
+
+
+async def test_key_running_dry_during_a_flush_is_refilled():
+    async with FakeRespServer() as server:
+        connection = CountingConnection(server.url, slow=1)
+        limiter = leasing_limiter(connection)
+        first = asyncio.create_task(limiter.acquire("a"))
+        await asyncio.sleep(0.01)  # "a"'s refill is in flight now
+        assert len(connection.pipelines) == 1
+        decision = await asyncio.wait_for(limiter.acquire("b"), timeout=1.0)
+        assert decision.allowed
+        assert (await first).allowed
+        assert len(connection.pipelines) == 2
+        connection.close()
+
+
+async def test_limit_is_shared_between_nodes():
+    async with FakeRespServer() as server:
+        connections = [RespConnection(server.url, timeout=1.0) for _ in range(2)]
+        limiters = [leasing_limiter(connection, limit=20, lease_tokens=5) for connection in connections]
+        admitted = 0
+        for _ in range(30):
+            for limiter in limiters:
+                admitted += (await limiter.acquire("k")).allowed
+        assert admitted == 20
+        for connection in connections:
+            connection.close()
+
+
+async def test_falls_back_to_local_limits_while_the_store_is_down():
+    server = await FakeRespServer().start()
+    connection = RespConnection(server.url, timeout=0.2)
+    limiter = leasing_limiter(connection, lease_tokens=1, fallback_limit=3)
+    assert (await limiter.acquire("a")).allowed
+    await server.stop()
+    decisions = [await limiter.acquire("a") for _ in range(5)]
+    # The first refill fails, then the local limiter decides: 3 per window.
+    assert [decision.allowed for decision in decisions] == [True, True, True, False, False]
+    connection.close()
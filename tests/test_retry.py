@@ -0,0 +1,92 @@
+import pytest
+
+from fastapigate import Gateway, GatewayConfig, GatewayMiddleware
+from fastapigate.default_policy_registry import default_policy_registry
+from fastapigate.testing import asgi_request, http_scope
+
+pytestmark = pytest.mark.anyio
+
+
+class FailingApp:
+    """An ASGI app failing (with `status`, or raising if None) while `failing`, counting its calls."""
+
+    def __init__(self, status=None):
+        self.status = status
+        self.failing = True
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        if self.failing and self.status is None:
+            raise RuntimeError("Backend failure")
+        status = self.status if self.failing else 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def policy(gateway: Gateway, policy_id: str):
+    return next(policies[0] for key, policies in gateway._generation.policies.items() if key[1] == policy_id)
+
+
+async def get(app: GatewayMiddleware) -> int:
+    try:
+        return (await asgi_request(app, http_scope())).status
+    except RuntimeError:
+        return 500
+
+
+@pytest.mark.parametrize(
+    "backend, calls, breaker_calls",
+    [
+        # The circuit breaker sees the request once, the retried calls happen inside it.
+        (["circuit_breaker", "retry"], 3, 1),
+        # The circuit breaker sees each retried call.
+        (["retry", "circuit_breaker"], 3, 3),
+    ],
+)
+async def test_backend_policies_wrap_the_ones_listed_after_them(backend, calls, breaker_calls):
+    configs = {"retry": {"max_attempts": 3, "backoff_seconds": 0.0}, "circuit_breaker": {"minimum_calls": 100}}
+    config = GatewayConfig(globalPolicies={"backend": [{policy_id: configs[policy_id]} for policy_id in backend]})
+    backend_app = FailingApp(status=503)
+    gateway = Gateway(config, default_policy_registry())
+
+    assert await get(GatewayMiddleware(backend_app, gateway)) == 503
+
+    assert backend_app.calls == calls
+    assert policy(gateway, "circuit_breaker").stats()["default"]["calls"] == breaker_calls
+
+
+async def test_on_error_retries_go_through_the_backend_policies():
+    config = GatewayConfig(globalPolicies={
+        "backend": [{"circuit_breaker": {"minimum_calls": 100}}],
+        "onError": [{"retry": {"max_attempts": 3, "backoff_seconds": 0.0}}],
+    })
+    backend_app = FailingApp()
+    gateway = Gateway(config, default_policy_registry())
+
+    assert await get(GatewayMiddleware(backend_app, gateway)) == 500
+
+    assert backend_app.calls == 3
+    assert policy(gateway, "circuit_breaker").stats()["default"]["calls"] == 3
+
+
+async def test_on_error_retries_earn_budget_from_every_request():
+    retry = {"max_attempts": 2, "backoff_seconds": 0.0, "budget_ratio": 0.5, "budget_capacity": 1.0,
+             "budget_min_retries_per_second": 0.0}
+    config = GatewayConfig(globalPolicies={"inbound": [{"retry": retry}], "onError": [{"retry": retry}]})
+    backend_app = FailingApp()
+    app = GatewayMiddleware(backend_app, Gateway(config, default_policy_registry()))
+
+    # The initial budget covers one retry, then it is spent.
+    await get(app)
+    await get(app)
+    assert backend_app.calls == 3
+
+    # Two successful requests earn another one.
+    backend_app.failing = False
+    await get(app)
+    await get(app)
+    backend_app.failing = True
+    backend_app.calls = 0
+    await get(app)
+    assert backend_app.calls == 2
@@ -0,0 +1,79 @@
+import pytest
+
+from fastapigate import Gateway, GatewayConfig
+from fastapigate.core.routing import Pipeline, RouteIndex
+from fastapigate.default_policy_registry import default_policy_registry
+
+
+def routes(*paths: str, exact: bool = True) -> tuple[RouteIndex, dict[str, Pipeline]]:
+    """An index with one distinct pipeline per path, and those pipelines by path."""
+    pipelines = {path: Pipeline(inbound=(object(),)) for path in paths}
+    index = RouteIndex()
+    for path, pipeline in pipelines.items():
+        index.add(path, pipeline, exact=exact)
+    return index, pipelines
+
+
+@pytest.mark.parametrize(
+    "path, route",
+    [
+        ("/users/me/settings", "/users/me/settings"),
+        # The literal branch dead-ends, the parameter one matches.
+        ("/users/me/posts", "/users/{id}/posts"),
+        ("/users/5/posts", "/users/{id}/posts"),
+        ("/users/me", "/users/me"),
+        ("/users/5", "/users/{id}"),
+    ],
+)
+def test_literal_segments_fall_back_to_parameters(path, route):
+    index, pipelines = routes("/users/me/settings", "/users/{id}/posts", "/users/me", "/users/{id}")
+
+    assert index.resolve(path) is pipelines[route]
+
+
+def test_exact_routes_do_not_match_as_prefixes():
+    index, pipelines = routes("/items/{id}")
+
+    assert index.resolve("/items/5") is pipelines["/items/{id}"]
+    assert index.resolve("/items/5/x") is index.default
+    assert index.resolve("/items") is index.default
+
+
+def test_longest_prefix_wins_and_exact_routes_win_over_prefixes():
+    index, pipelines = routes("/api", "/api/users/{id}", exact=False)
+    users = Pipeline(inbound=(object(),))
+    index.add("/api/users/me", users, exact=True)
+
+    assert index.resolve("/api/users/me") is users
+    assert index.resolve("/api/users/me/x") is pipelines["/api/users/{id}"]
+    assert index.resolve("/api/orders") is pipelines["/api"]
+    assert index.resolve("/other") is index.default
+
+
+def test_host_and_method_specific_routes_win_over_wildcards():
+    index = RouteIndex()
+    any_route, get_route, host_route = (Pipeline(inbound=(object(),)) for _ in range(3))
+    index.add("/items", any_route, exact=True)
+    index.add("/items", get_route, method="get", exact=True)
+    index.add("/items", host_route, host="API.test", method="get", exact=True)
+
+    assert index.resolve("/items", "api.test", "GET") is host_route
+    assert index.resolve("/items", "other.test", "GET") is get_route
+    assert index.resolve("/items", "other.test", "POST") is any_route
+
+
+def test_operations_resolve_to_their_own_pipeline():
+    limit = {"rate_limit": {"requests_per_minute": 10}}
+    config = GatewayConfig(apis=[{
+        "pathPrefix": "/users",
+        "operations": [
+            {"path": "/me/settings", "inheritPolicies": False},
+            {"path": "/{id}/posts", "policies": {"inbound": [limit]}},
+        ],
+    }], metrics={"enabled": False})
+    routes = Gateway(config, default_policy_registry())._routes
+
+    pipeline = routes.resolve("/users/me/posts")
+    assert [type(policy).__name__ for policy in pipeline.inbound] == ["RateLimitPolicy"]
+    assert routes.resolve("/users/me/settings").inbound == ()
+    assert routes.resolve("/users/5/posts/x") is routes.resolve("/users/5")
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+
+import pytest
+
+from fastapigate.policies.rate_limit import RateLimitPolicy, RateLimitPolicyConfig
+from fastapigate.ratelimit import GCRA, RateLimiter, SharedMemoryStore, SlidingWindowCounter, SlidingWindowLog
+
+
+def hit_from_worker(path: str, limit: int, hits: int, start, results) -> None:
+    algorithm = SlidingWindowCounter(limit, 3600.0)
+    limiter = RateLimiter(algorithm, SharedMemoryStore(path, algorithm, slots=64))
+    start.wait()
+    results.put(sum(limiter.hit(f"key:{i % 2}").allowed for i in range(hits)))
+
+
+def test_processes_share_the_limit(tmp_path):
+    path = str(tmp_path / "table")
+    context = multiprocessing.get_context("fork")
+    start, results = context.Event(), context.Queue()
+    workers = [context.Process(target=hit_from_worker, args=(path, 100, 200, start, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    admitted = sum(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    assert admitted == 2 * 100
+
+
+def test_table_is_kept_for_the_same_algorithm_and_limit(tmp_path):
+    path = str(tmp_path / "table")
+    algorithm = GCRA(2, 60.0)
+    first = RateLimiter(algorithm, SharedMemoryStore(path, algorithm, slots=64), clock=lambda: 1000.0)
+    assert first.hit("key").allowed and first.hit("key").allowed
+
+    second = RateLimiter(algorithm, SharedMemoryStore(path, GCRA(2, 60.0), slots=64), clock=lambda: 1000.0)
+
+    assert not second.hit("key").allowed
+
+
+@pytest.mark.parametrize("algorithm", [GCRA(5, 60.0), GCRA(2, 30.0), SlidingWindowCounter(2, 60.0)])
+def test_incompatible_table_is_replaced_not_truncated(tmp_path, algorithm):
+    path = str(tmp_path / "table")
+    previous = GCRA(2, 60.0)
+    live = RateLimiter(previous, SharedMemoryStore(path, previous, slots=64), clock=lambda: 1000.0)
+    live.hit("key")
+    inode = os.stat(path).st_ino
+
+    replacement = RateLimiter(algorithm, SharedMemoryStore(path, algorithm, slots=64), clock=lambda: 1000.0)
+
+    assert os.stat(path).st_ino != inode
+    assert replacement.hit("key").allowed
+    # The process still mapping the old table carries on with it.
+    assert live.hit("key").allowed
+    assert not live.hit("key").allowed
+    assert os.listdir(tmp_path) == ["table"]
+
+
+def test_algorithms_without_fixed_size_state_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        SharedMemoryStore(str(tmp_path / "table"), SlidingWindowLog(2, 60.0))
+
+
+def test_policies_share_tables_only_when_configured_identically(tmp_path):
+    def config(limit: int) -> RateLimitPolicyConfig:
+        return RateLimitPolicyConfig(
+            requests_per_minute=limit, backend="shared_memory", shared_memory_path=str(tmp_path / "ratelimit")
+        )
+
+    policies = [RateLimitPolicy(config=config(1)), RateLimitPolicy(config=config(1)), RateLimitPolicy(config=config(2))]
+    try:
+        paths = [policy._limiters[0][1].store.path for policy in policies]
+    finally:
+        for policy in policies:
+            policy.close()
+
+    assert paths[0] == paths[1]
+    assert paths[0] != paths[2]